@@ -1,4 +1,5 @@
 import abc
+import copy
 import logging
 import os
 
@@ -119,6 +120,10 @@ class Module(object, metaclass=abc.ABCMeta):
         # Example: Module that determines how many lines are in a file
         pass
 
+    def processes_cmd_output(self):
+        # Return whether the module overrides process_cmd_output, so it needs the complete output of its command
+        return type(self).process_cmd_output is not Module.process_cmd_output
+
     def generate_unique_file_name(self, extension=".dat", output_dir=None):
 
         # Generate file basename
@@ -150,6 +155,22 @@ class Module(object, metaclass=abc.ABCMeta):
         else:
             return [self.convert_to_gapfile(_key, _file, **_kwargs) for _file in _value]
 
+    def clone(self):
+        # Return a lightweight copy of the module
+        # Module metadata (input/output keys, config args) is shared with the original module
+        # Only the per-module state (argument values, output) is copied
+        module_clone = copy.copy(self)
+
+        # Copy arguments so that values set on the clone don't change the original module
+        module_clone.arguments = self.arguments.__class__()
+        for key, arg in self.arguments.items():
+            module_clone.arguments[key] = arg.clone()
+
+        # Copy output without copying output files
+        module_clone.output = self.output.__class__(self.output)
+
+        return module_clone
+
     ############### Getters and setters
     def get_ID(self):
         return self.module_id
@@ -239,6 +260,13 @@ class Argument(object):
     def set(self, value):
         self.__value = value
 
+    def clone(self):
+        # Argument definition is shared, only the value container is copied
+        arg_clone = copy.copy(self)
+        if isinstance(self.__value, list):
+            arg_clone.__value = list(self.__value)
+        return arg_clone
+
     def get_name(self):
         return self.__name
 
@@ -0,0 +1,151 @@
+import ast
+import glob
+import importlib.util
+import logging
+import os
+import sys
+import threading
+
+from Modules.Module import Module
+
+
+class ModuleRegistry(object):
+    # Registry of the module classes available to tasks
+    # Module files are indexed once by parsing their source, without importing them
+    # Each file is only imported the first time one of its classes is requested
+
+    # Directories holding module files (relative to the Modules directory), in the order they are searched
+    MODULE_DIRS = ["Mergers", "Splitters", "Tools"]
+
+    # Base classes that can't be used as modules
+    BASE_CLASSES = ["Module", "Splitter", "Merger"]
+
+    # Registry shared by all tasks
+    __registry      = None
+    __registry_lock = threading.Lock()
+
+    def __init__(self, modules_dir=None):
+
+        # Directory containing the module directories
+        self.modules_dir = os.path.dirname(os.path.abspath(__file__)) if modules_dir is None else modules_dir
+
+        # Manifest listing path of each module file and classes defined in it, indexed by module name
+        self.manifest = self.__generate_manifest()
+
+        # Imported module files and requested classes
+        self.lock       = threading.Lock()
+        self.modules    = {}
+        self.classes    = {}
+
+    @staticmethod
+    def get_registry():
+        # Return registry shared by all tasks, created on first use
+        with ModuleRegistry.__registry_lock:
+            if ModuleRegistry.__registry is None:
+                ModuleRegistry.__registry = ModuleRegistry()
+            return ModuleRegistry.__registry
+
+    def get_manifest(self):
+        return self.manifest
+
+    def get_class(self, module_name, submodule=None):
+        # Return class of a submodule, importing its module file if needed
+        submodule = module_name if submodule is None else submodule
+
+        with self.lock:
+            if (module_name, submodule) in self.classes:
+                return self.classes[(module_name, submodule)]
+
+            # Check to see if module exists
+            if module_name not in self.manifest:
+                logging.error("Module %s could not be imported! "
+                              "Check the module name spelling and ensure the module exists." % module_name)
+                raise IOError("Invalid module '%s' specified in graph config!" % module_name)
+
+            _module = self.__import_module(module_name)
+
+            # Check to see if submodule actually exists
+            if submodule not in _module.__dict__:
+                logging.error("Module '%s' was successfully imported, but does not contain submodule '%s'! "
+                              "Check the submodule spelling and ensure the submodule exists in the module." % (module_name, submodule))
+
+                # Show available submodules in error message
+                available_modules = self.__get_available_submodules(module_name)
+                if len(available_modules) > 1:
+                    available_modules = ",".join(available_modules)
+                elif len(available_modules) == 1:
+                    available_modules = available_modules[0]
+                else:
+                    available_modules = "None"
+                logging.error("Available submodules in module '%s':\n\t%s" % (module_name, available_modules))
+                raise IOError("Invalid submodule '%s' specified for module '%s' in graph config!" % (submodule, module_name))
+
+            self.classes[(module_name, submodule)] = _module.__dict__[submodule]
+            return self.classes[(module_name, submodule)]
+
+    def __import_module(self, module_name):
+        # Must be called while holding the registry lock
+        if module_name in self.modules:
+            return self.modules[module_name]
+
+        # Reuse module file if it was already imported by name (e.g. when unpickling tasks)
+        if module_name in sys.modules:
+            self.modules[module_name] = sys.modules[module_name]
+            return self.modules[module_name]
+
+        # Module is registered under its bare name, as when it is imported from the module directories
+        module_path = self.manifest[module_name]["path"]
+        try:
+            spec = importlib.util.spec_from_file_location(module_name, module_path)
+            _module = importlib.util.module_from_spec(spec)
+            sys.modules[module_name] = _module
+            spec.loader.exec_module(_module)
+        except:
+            sys.modules.pop(module_name, None)
+            logging.error("Module %s could not be imported from '%s'! "
+                          "Check the module name spelling and ensure the module exists." % (module_name, module_path))
+            raise
+
+        logging.debug("Imported module '%s' from '%s'." % (module_name, module_path))
+        self.modules[module_name] = _module
+        return _module
+
+    def __get_available_submodules(self, module_name):
+        # Return classes of a module file that can be used as submodules
+        _module = self.modules[module_name]
+        available_modules = []
+        for class_name in self.manifest[module_name]["classes"]:
+            _class = _module.__dict__.get(class_name, None)
+            if class_name.startswith("_") or class_name in self.BASE_CLASSES:
+                continue
+            if isinstance(_class, type) and issubclass(_class, Module):
+                available_modules.append(class_name)
+        return available_modules
+
+    def __generate_manifest(self):
+        # Index classes defined at the top level of each module file
+        manifest = {}
+        for module_dir in self.MODULE_DIRS:
+            for module_path in sorted(glob.glob(os.path.join(self.modules_dir, module_dir, "*.py"))):
+                module_name = os.path.splitext(os.path.basename(module_path))[0]
+                if module_name.startswith("_"):
+                    continue
+
+                try:
+                    with open(module_path) as inp:
+                        tree = ast.parse(inp.read(), filename=module_path)
+                except SyntaxError as e:
+                    # Errors are reported when the module is imported, in case a task actually uses it
+                    logging.warning("Unable to parse module file '%s'!" % module_path)
+                    if str(e) != "":
+                        logging.warning("Received the following message:\n%s" % e)
+                    classes = []
+                else:
+                    classes = [node.name for node in tree.body if isinstance(node, ast.ClassDef)]
+
+                # Module directories are searched in the same order as when importing by name
+                if module_name in manifest:
+                    continue
+                manifest[module_name] = {"path": module_path, "classes": classes}
+
+        return manifest
@@ -13,6 +13,9 @@ class Splitter(Module):
         super(Splitter, self).__init__(module_id, is_docker)
         self.output = OrderedDict()
 
+        # Planner choosing the number of splits (None = number of splits is given by the module arguments)
+        self.split_planner = None
+
     def define_input(self):
         raise NotImplementedError(
             "Splitter module %s must implement 'define_input()' function!" % self.__class__.__name__)
@@ -25,6 +28,24 @@ class Splitter(Module):
         raise NotImplementedError(
             "Splitter module %s must implement 'define_command()' function!" % self.__class__.__name__)
 
+    def set_split_planner(self, split_planner):
+        self.split_planner = split_planner
+
+    def plan_nr_splits(self, work, default, nr_cpus=None, throughput=None, max_splits=None):
+        # Return number of splits to divide the work of the splitter into
+        # work: total amount of work to split, in units chosen by the splitter (e.g. bases to align)
+        # default: number of splits used without a planner or when the runtime of the splits cannot be estimated
+        # nr_cpus: CPUs of each split (None = CPUs requested by the downstream tasks)
+        # throughput: expected work done per CPU per second, until the planner has measured it
+        # max_splits: maximum number of splits the work can be divided into
+        if self.split_planner is None:
+            return default
+
+        return self.split_planner.plan(self.module_id, work, default,
+                                       nr_cpus=nr_cpus,
+                                       throughput=throughput,
+                                       max_splits=max_splits)
+
     def make_split(self, split_id, visible_samples=None):
         # Create new split with id and the samples visible (None=all samples)
         if split_id in self.output:
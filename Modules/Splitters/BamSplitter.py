@@ -18,7 +18,9 @@ class BamSplitter(Splitter):
     def define_output(self):
         # Obtaining the arguments
         chrom_list  = self.get_argument("chrom_list")
-        nr_splits   = self.get_argument("nr_splits")
+        nr_splits   = self.plan_nr_splits(work=1,
+                                          default=self.get_argument("nr_splits"),
+                                          max_splits=len(chrom_list) + 1)
 
         chroms, remains = self.__get_chrom_splits(chrom_list, nr_splits)
 
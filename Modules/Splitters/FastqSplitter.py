@@ -39,6 +39,15 @@ class FastqSplitter(Splitter):
         nr_reads_per_split  = self.ALIGN_SPEED / read_len / 2 * max_nr_cpus
         nr_splits           = int(math.ceil(nr_reads * 1.0 / nr_reads_per_split))
 
+        # Let the split planner resize the splits based on the platform (aligning speed is per 10 mins)
+        planned_nr_splits   = self.plan_nr_splits(work=nr_reads * read_len * 2,
+                                                  default=nr_splits,
+                                                  nr_cpus=max_nr_cpus,
+                                                  throughput=self.ALIGN_SPEED / 600.0)
+        if planned_nr_splits != nr_splits:
+            nr_splits           = planned_nr_splits
+            nr_reads_per_split  = int(math.ceil(nr_reads * 1.0 / nr_splits))
+
         # Set number of lines per split to be access in get_command()
         self.nr_lines_per_split = nr_reads_per_split * 4
 
@@ -66,8 +75,9 @@ class FastqSplitter(Splitter):
 
         # Create final split using remaining CPUs
         # Determine number of CPUs available for last split
-        nr_cpus_needed      = int(math.ceil(nr_reads * read_len * 2 * 1.0 / self.ALIGN_SPEED))
-        nr_cpus_remaining   = nr_cpus_needed % max_nr_cpus if nr_cpus_needed % max_nr_cpus else max_nr_cpus
+        nr_reads_remaining  = nr_reads - nr_reads_per_split * (nr_splits - 1)
+        nr_cpus_remaining   = int(math.ceil(nr_reads_remaining * 1.0 / nr_reads_per_split * max_nr_cpus))
+        nr_cpus_remaining   = min(nr_cpus_remaining, max_nr_cpus)
         nr_cpus_remaining   += nr_cpus_remaining % 2
         nr_cpus_remaining   = max(nr_cpus_remaining, 4)
 
@@ -26,7 +26,9 @@ class IntervalSplitter(Splitter):
 
     def define_output(self):
         # Obtain number of splits
-        nr_splits       = int(self.get_argument("nr_splits"))
+        # The planner measures how long the interval list takes to process, so the work is the whole list
+        nr_splits       = self.plan_nr_splits(work=1, default=int(self.get_argument("nr_splits")))
+        self.nr_splits  = nr_splits
 
         # Add split for each split_interval
         for split_id in range(nr_splits):
@@ -37,7 +39,7 @@ class IntervalSplitter(Splitter):
     def define_command(self):
         # Obtain necessary arguments
         interval_list = self.get_argument("interval_list")
-        nr_splits = int(self.get_argument("nr_splits"))
+        nr_splits = self.nr_splits
         gatk = self.get_argument("gatk")
         mem = self.get_argument("mem")
         java = self.get_argument("java")
@@ -16,7 +16,9 @@ class RefSplitter(Splitter):
     def define_output(self):
         # Obtain arguments
         chr_list        = self.get_argument("chrom_list")
-        nr_splits       = int(self.get_argument("nr_splits"))
+        nr_splits       = self.plan_nr_splits(work=1,
+                                              default=int(self.get_argument("nr_splits")),
+                                              max_splits=len(chr_list) + 1)
         include_remains = self.get_argument("include_remains")
 
         # First nr_splits-1 chromosomes get put into own split
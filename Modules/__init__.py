@@ -1,3 +1,4 @@
 from .Module import Module
 from .Splitter import Splitter
-from .Merger import Merger, PseudoMerger
\ No newline at end of file
+from .Merger import Merger, PseudoMerger
+from .ModuleRegistry import ModuleRegistry
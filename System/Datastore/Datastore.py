@@ -21,15 +21,16 @@ class Datastore(object):
         self.__base_wrk_dir = self.platform.wrk_dir
         self.__base_output_dir = self.platform.final_output_dir
 
-    def set_task_input_args(self, task_id):
+    def set_task_input_args(self, task_id, module=None):
         # Set input arguments for a task module
+        # Arguments can be set on a copy of the task module instead (e.g. for a speculative copy of the task)
 
         # Throw error if task inputs aren't ready to be set
         if not self.graph.parents_complete(task_id):
             logging.error("Cannot set arguments for task '%s' before upstream tasks have completed!" % task_id)
             raise PrematureTaskInputSetError("Cannot set task arguments before a task dependencies have completed!")
 
-        task_module = self.graph.get_tasks(task_id).module
+        task_module = self.graph.get_tasks(task_id).module if module is None else module
         for input_type, input_arg in task_module.get_arguments().items():
             logging.debug("(%s) Setting arg: %s" % (task_id, input_type))
             val = self.__get_task_arg(task_id, input_type, is_resource=input_arg.is_resource())
@@ -48,8 +49,10 @@ class Datastore(object):
         task_module.set_argument("nr_cpus", nr_cpus)
         task_module.set_argument("mem", mem)
 
-    def get_task_workspace(self, task_id=None):
+    def get_task_workspace(self, task_id=None, backup=False):
         # Use task information to generate unique directories for input/output files
+        # Backup copies of a task get their own working, temporary output and log directories, as both copies may run
+        # on the same host at the same time. Final outputs are only saved by the copy finalizing the task.
 
         if task_id is None:
             wrk_dir = self.__base_wrk_dir
@@ -77,6 +80,11 @@ class Datastore(object):
                 task_id = task_id.replace(sample_name+"/", "")
                 final_output_dir = os.path.join(self.__base_output_dir, sample_name, task_id)
 
+            if backup:
+                wrk_dir = "%s_backup" % wrk_dir
+                tmp_output_dir = "%s_backup" % tmp_output_dir
+                wrk_output_dir = os.path.join(wrk_dir, "output")
+
         # Standardize directories
         wrk_dir             = self.platform.standardize_dir(wrk_dir)
         tmp_output_dir      = self.platform.standardize_dir(tmp_output_dir)
@@ -84,16 +92,17 @@ class Datastore(object):
         final_output_dir    = self.platform.standardize_dir(final_output_dir)
 
         # Create and return TaskWorkspace
-        return TaskWorkspace(wrk_dir, tmp_output_dir, wrk_output_dir, final_output_dir)
+        final_log_dir = os.path.join(final_output_dir, "log", "backup") if backup else None
+        return TaskWorkspace(wrk_dir, tmp_output_dir, wrk_output_dir, final_output_dir, final_log_dir=final_log_dir)
 
     def get_docker_image(self, docker_id):
         return self.resource_kit.get_docker_images(docker_id)
 
-    def get_task_input_files(self, task_id):
+    def get_task_input_files(self, task_id, module=None):
         # Return list of input files that need to be loaded for in order for task to run
 
         # Get nested list of module arguments
-        module = self.graph.get_tasks(task_id).get_module()
+        module = self.graph.get_tasks(task_id).get_module() if module is None else module
         inputs = module.get_input_values()
 
         # Flatten nested list into a single list
@@ -108,9 +117,9 @@ class Datastore(object):
 
         return input_files
 
-    def get_task_output_files(self, task_id):
+    def get_task_output_files(self, task_id, module=None):
         # Return list of output files produced by task
-        module = self.graph.get_tasks(task_id).get_module()
+        module = self.graph.get_tasks(task_id).get_module() if module is None else module
         outputs = module.get_output_values()
 
         # Flatten nested list into a single list
@@ -323,11 +332,12 @@ class Datastore(object):
 
 class TaskWorkspace(object):
     # Defines folder structure where task will execute/files generated
-    def __init__(self, wrk_dir, tmp_output_dir, wrk_output, final_output_dir):
+    def __init__(self, wrk_dir, tmp_output_dir, wrk_output, final_output_dir, final_log_dir=None):
         # wrk_dir: Folder where input files will be generated by task
         # tmp_output_dir: Folder where temporary final output will be saved until all tasks are finished
         # wrk_output dir: Folder where output files will be generated by task
         # final_output_dir: Folder where final output files will be saved
+        # final_log_dir: Folder where logs will be saved (default: log folder of final_output_dir)
         self.workspace = {"wrk" : wrk_dir,
                           "wrk_output": wrk_output,
                           "tmp_output" : tmp_output_dir,
@@ -335,7 +345,7 @@ class TaskWorkspace(object):
 
         # Define wrk/final log directories
         self.workspace["wrk_log"] = os.path.join(wrk_dir, "log/")
-        self.workspace["final_log"] = os.path.join(final_output_dir, "log/")
+        self.workspace["final_log"] = os.path.join(final_output_dir, "log/") if final_log_dir is None else final_log_dir
 
         # Standardize directory paths
         for dir_type, dir_path in self.workspace.items():
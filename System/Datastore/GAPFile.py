@@ -146,6 +146,29 @@ class GAPFile(object):
             self.path = os.path.join(new_dir, self.filename)
         self.__standardize()
 
+    def to_dict(self):
+        # Return dictionary from which the file can be recreated with GAPFile.from_dict()
+        return {"file_id"           : self.file_id,
+                "file_type"         : self.type,
+                "path"              : self.path + "*" if self.__is_prefix else self.path,
+                "containing_dir"    : self.containing_dir,
+                "file_size"         : self.size,
+                "sample_name"       : self.sample_name,
+                "metadata"          : self.metadata,
+                "flags"             : self.flags}
+
+    @staticmethod
+    def from_dict(file_data):
+        # Recreate file from dictionary produced by GAPFile.to_dict()
+        gap_file = GAPFile(file_data["file_id"], file_data["file_type"], file_data["path"],
+                           containing_dir=file_data["containing_dir"],
+                           file_size=file_data["file_size"],
+                           sample_name=file_data["sample_name"],
+                           **file_data["metadata"])
+        for flag_type in file_data["flags"]:
+            gap_file.flag(flag_type)
+        return gap_file
+
     def __update_containing_dir(self, dest_dir):
         # Updates path assuming entire containing directory has been moved to a new directory
         new_path = os.path.join(dest_dir, self.containing_dir_name)
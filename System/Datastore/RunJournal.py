@@ -0,0 +1,182 @@
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+
+from System.Datastore.GAPFile import GAPFile
+from System.Platform import StorageHelper
+
+
+class RunJournal(object):
+    # Append-only journal of the tasks completed during a pipeline run
+    # Each line of the journal is a JSON record describing one completed task and its output files
+    # Records are written as soon as tasks complete, so the journal survives crashes of the current process
+    # Journals of remote final output directories are published there regularly, so any host can resume the run
+
+    # Minimum seconds between two uploads of the journal to its published location
+    PUBLISH_INTERVAL = 300
+
+    def __init__(self, journal_path, resume=False, published_path=None):
+
+        # Path to the local journal file
+        self.journal_path = journal_path
+
+        # Remote path where the journal is published (None = local journal is the only copy)
+        self.published_path = published_path
+        self.storage_helper = StorageHelper(None)
+        self.last_publish   = 0
+
+        journal_dir = os.path.dirname(self.journal_path)
+        if journal_dir != "":
+            os.makedirs(journal_dir, exist_ok=True)
+
+        if resume:
+            # Published journal may hold records of runs launched from other hosts
+            self.__fetch_published()
+        else:
+            # Keep journals of previous runs with the same pipeline name instead of overwriting them
+            self.__rotate()
+
+        # Records of tasks completed in previous runs (only loaded when resuming)
+        self.records = self.__load_records() if resume else []
+
+        # Keep records of previous runs when resuming, otherwise start a new journal
+        self.journal = open(self.journal_path, "a" if resume else "w")
+
+        # Start on a new line if the last record was partially written
+        if resume and not self.__ends_with_newline():
+            self.journal.write("\n")
+
+    def record_task(self, task):
+        # Add record of a completed task to the journal
+        module = task.get_module()
+        record = OrderedDict()
+        record["task_id"]           = task.get_ID()
+        record["split_id"]          = task.get_split_id()
+        record["visible_samples"]   = task.get_visible_samples()
+        record["args"]              = {name: self.encode(arg.get_value()) for name, arg in module.get_arguments().items()}
+        record["output"]            = self.encode(module.get_output())
+        record["completion_time"]   = time.time()
+
+        # Write record to disk right away
+        self.journal.write(json.dumps(record, default=str) + "\n")
+        self.journal.flush()
+        os.fsync(self.journal.fileno())
+
+        if time.time() - self.last_publish >= self.PUBLISH_INTERVAL:
+            self.publish()
+
+    def publish(self):
+        # Upload journal to its published location, failing to do so doesn't fail the pipeline
+        if self.published_path is None:
+            return
+
+        self.last_publish = time.time()
+        try:
+            self.storage_helper.upload(self.journal_path, self.published_path)
+        except BaseException as e:
+            logging.warning("Unable to publish run journal to '%s'!" % self.published_path)
+            if str(e) != "":
+                logging.warning("Received the following message:\n%s" % e)
+
+    def get_path(self):
+        # Return path of the reference copy of the journal
+        return self.journal_path if self.published_path is None else self.published_path
+
+    def get_records(self):
+        # Return records of tasks completed in previous runs, in order of completion
+        return [record for record in self.records]
+
+    @staticmethod
+    def get_output(record):
+        # Return task output recreated from its journal record
+        return RunJournal.decode(record["output"])
+
+    def close(self):
+        if not self.journal.closed:
+            self.journal.close()
+            self.publish()
+
+    @staticmethod
+    def encode(value):
+        # Convert value to an object that can be written as JSON (GAPFiles are converted to dictionaries)
+        if isinstance(value, GAPFile):
+            return {"__gap_file__": value.to_dict()}
+        elif isinstance(value, dict):
+            return {"__dict__": [[key, RunJournal.encode(val)] for key, val in value.items()]}
+        elif isinstance(value, (list, tuple)):
+            return [RunJournal.encode(val) for val in value]
+        return value
+
+    @staticmethod
+    def decode(value):
+        # Recreate value encoded by RunJournal.encode()
+        if isinstance(value, dict) and "__gap_file__" in value:
+            return GAPFile.from_dict(value["__gap_file__"])
+        elif isinstance(value, dict) and "__dict__" in value:
+            return OrderedDict((key, RunJournal.decode(val)) for key, val in value["__dict__"])
+        elif isinstance(value, list):
+            return [RunJournal.decode(val) for val in value]
+        return value
+
+    def __fetch_published(self):
+        # Replace local journal with the published one, unless the local one has more records (e.g. not published yet)
+        if self.published_path is None or not self.storage_helper.path_exists(self.published_path):
+            return
+
+        published_copy = "%s.published" % self.journal_path
+        self.storage_helper.download(self.published_path, published_copy)
+        if self.__count_lines(published_copy) >= self.__count_lines(self.journal_path):
+            os.replace(published_copy, self.journal_path)
+        else:
+            os.remove(published_copy)
+
+    def __rotate(self):
+        # Rename journals of a previous run by adding the time they were rotated
+        suffix = time.strftime("%Y%m%d-%H%M%S")
+        if os.path.exists(self.journal_path):
+            os.replace(self.journal_path, "%s.%s" % (self.journal_path, suffix))
+            logging.info("Run journal of a previous run saved as '%s.%s'." % (self.journal_path, suffix))
+
+        if self.published_path is not None and self.storage_helper.path_exists(self.published_path):
+            rotated_copy = "%s.rotated" % self.journal_path
+            self.storage_helper.download(self.published_path, rotated_copy)
+            self.storage_helper.upload(rotated_copy, "%s.%s" % (self.published_path, suffix))
+            os.remove(rotated_copy)
+            logging.info("Run journal of a previous run saved as '%s.%s'." % (self.published_path, suffix))
+
+    @staticmethod
+    def __count_lines(path):
+        if not os.path.exists(path):
+            return 0
+        with open(path, "rb") as inp:
+            return sum(1 for line in inp if line.strip() != b"")
+
+    def __ends_with_newline(self):
+        with open(self.journal_path, "rb") as inp:
+            inp.seek(0, os.SEEK_END)
+            if inp.tell() == 0:
+                return True
+            inp.seek(-1, os.SEEK_END)
+            return inp.read(1) == b"\n"
+
+    def __load_records(self):
+        records = []
+        if not os.path.exists(self.journal_path):
+            logging.warning("No run journal found at '%s'! All tasks will be run." % self.journal_path)
+            return records
+
+        with open(self.journal_path) as inp:
+            for line_nr, line in enumerate(inp, 1):
+                if line.strip() == "":
+                    continue
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    # Last record may have been partially written when the previous run was killed
+                    logging.warning("Unable to read record on line %d of run journal '%s'! It will be ignored." %
+                                    (line_nr, self.journal_path))
+
+        logging.info("Loaded %d completed tasks from run journal '%s'." % (len(records), self.journal_path))
+        return records
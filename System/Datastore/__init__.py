@@ -1,4 +1,5 @@
 from .GAPFile import GAPFile
 from .Datastore import Datastore
 from .ResourceKit import ResourceKit
-from .SampleSet import SampleSet
\ No newline at end of file
+from .SampleSet import SampleSet
+from .RunJournal import RunJournal
\ No newline at end of file
@@ -5,8 +5,8 @@ import os
 import time
 from collections import OrderedDict
 
-from System.Graph import Graph, Scheduler
-from System.Datastore import ResourceKit, SampleSet, Datastore
+from System.Graph import Graph, Scheduler, PlanCache
+from System.Datastore import ResourceKit, SampleSet, Datastore, RunJournal
 from System.Validators import GraphValidator, InputValidator, SampleValidator
 from System.Platform import StorageHelper, DockerHelper
 from System import CC_MAIN_DIR
@@ -20,7 +20,9 @@ class GAPipeline(object):
                  sample_data_config,
                  platform_config,
                  platform_module,
-                 final_output_dir):
+                 final_output_dir,
+                 resume=False,
+                 use_plan_cache=True):
 
         # GAP run id
         self.pipeline_id    = pipeline_id
@@ -37,6 +39,16 @@ class GAPipeline(object):
         # Final output directory where output is saved
         self.__final_output_dir     = final_output_dir
 
+        # Whether tasks completed by a previous run of the pipeline should be skipped
+        self.__resume               = resume
+
+        # Validated graphs of earlier launches with the same configs (None = graph is always loaded and validated)
+        self.plan_cache     = PlanCache(f"{CC_MAIN_DIR}/plans") if use_plan_cache else None
+        self.plan_key       = None
+
+        # Input source of every task argument, as decided when validating the graph (None = graph not validated yet)
+        self.argument_sources = None
+
         # Obtain pipeline name and append to final output dir
 
         self.graph          = None
@@ -50,6 +62,9 @@ class GAPipeline(object):
         # Task scheduler for running jobs
         self.scheduler = None
 
+        # Journal of completed tasks used for resuming the pipeline, kept with the final output (set once loaded)
+        self.journal        = None
+
         # Helper classes for handling platform operations
         self.storage_helper     = None
         self.docker_helper      = None
@@ -62,8 +77,15 @@ class GAPipeline(object):
         # Load the sample data
         self.sample_data = SampleSet(self.__sample_set_config)
 
-        # Load the graph
-        self.graph = Graph(self.__graph_config)
+        # Load the graph, reusing the validated graph of an earlier launch with the same configs if possible
+        if self.plan_cache is not None:
+            self.plan_key = self.plan_cache.get_key(self.__graph_config, self.__res_kit_config, self.sample_data)
+            plan = self.plan_cache.load(self.plan_key)
+            if plan is not None:
+                self.graph = plan["graph"]
+                self.argument_sources = plan["argument_sources"]
+        if self.graph is None:
+            self.graph = Graph(self.__graph_config)
 
         # Load platform
         plat_module     = importlib.import_module(self.__plat_module)
@@ -73,9 +95,19 @@ class GAPipeline(object):
         # Initialize the platform
         self.platform.init_platform()
 
+        # Open journal of completed tasks in the final output directory
+        # Remote final output directories get the journal published there, while records are written to a local copy
+        final_output_dir = self.platform.get_final_output_dir()
+        journal_name = f"{self.pipeline_id}_journal.jsonl"
+        if ":" in final_output_dir:
+            self.journal = RunJournal(f"{CC_MAIN_DIR}/journals/{journal_name}", resume=self.__resume,
+                                      published_path=os.path.join(final_output_dir, journal_name))
+        else:
+            self.journal = RunJournal(os.path.join(final_output_dir, journal_name), resume=self.__resume)
+
         # Create datastore and scheduler
         self.datastore = Datastore(self.graph, self.resource_kit, self.sample_data, self.platform)
-        self.scheduler = Scheduler(self.graph, self.datastore, self.platform)
+        self.scheduler = Scheduler(self.graph, self.datastore, self.platform, journal=self.journal)
 
     def validate(self):
 
@@ -88,11 +120,20 @@ class GAPipeline(object):
         if not has_errors:
             logging.debug("Sample sheet validated!")
 
-        # Validate the graph
-        graph_validator = GraphValidator(self.graph, self.resource_kit, self.sample_data)
-        has_errors = graph_validator.validate() or has_errors
-        if not has_errors:
-            logging.debug("Graph validated!")
+        # Validate the graph, unless it was validated by an earlier launch with the same configs
+        if self.argument_sources is not None:
+            logging.debug("Graph validated by an earlier launch with the same configs!")
+        else:
+            graph_validator = GraphValidator(self.graph, self.resource_kit, self.sample_data)
+            graph_has_errors = graph_validator.validate()
+            has_errors = graph_has_errors or has_errors
+            if not graph_has_errors:
+                logging.debug("Graph validated!")
+                self.argument_sources = graph_validator.get_argument_sources()
+
+                # Save validated graph for later launches
+                if self.plan_cache is not None:
+                    self.plan_cache.save(self.plan_key, self.graph, self.argument_sources)
 
         # Validate the platform
         self.platform.validate()
@@ -118,6 +159,10 @@ class GAPipeline(object):
         logging.info("CloudCounductor run validated! Beginning pipeline execution.")
 
     def run(self, rm_tmp_output_on_success=True):
+        # Skip tasks completed by a previous run
+        if self.__resume:
+            self.__resume_from_journal()
+
         # Run until all tasks are complete
         self.scheduler.run()
 
@@ -127,7 +172,11 @@ class GAPipeline(object):
             self.storage_helper.rm(path=workspace.get_tmp_output_dir(), job_name="rm_tmp_output", wait=True)
 
     def save_progress(self):
-        pass
+        # Make sure every completed task has been written to the journal
+        if self.journal is not None:
+            self.journal.close()
+            logging.info("Completed tasks saved in run journal '%s'. "
+                         "Run the pipeline again with '--resume' to skip them." % self.journal.get_path())
 
     def publish_report(self, err=False, err_msg=None, git_version=None):
         # Create and publish GAP pipeline report
@@ -157,11 +206,65 @@ class GAPipeline(object):
         if self.platform is not None:
             self.platform.clean_up()
 
+    def __resume_from_journal(self):
+        # Mark tasks completed by a previous run as complete, re-splitting the graph along the way
+        nr_resumed = 0
+        for record in self.journal.get_records():
+            task_id = record["task_id"]
+
+            # Tasks appear in the graph only once the splitters that created them have been resumed
+            if task_id not in self.graph.get_tasks():
+                logging.warning("Task '%s' from run journal is not in the pipeline graph! It will be run again." % task_id)
+                continue
+
+            task = self.graph.get_tasks(task_id)
+            if task.is_complete() or task.is_deprecated():
+                continue
+
+            # Task can only be skipped if the tasks it depends on have been skipped as well
+            if not self.graph.parents_complete(task_id):
+                logging.debug("Parents of task '%s' will be run again, so the task will be run again." % task_id)
+                continue
+
+            # Restore task output and make sure its output files are still available
+            empty_output = task.module.output
+            task.module.output = RunJournal.get_output(record)
+            if not self.__output_available(task_id):
+                logging.warning("Output files of task '%s' are missing! The task will be run again." % task_id)
+                task.module.output = empty_output
+                continue
+
+            # Split subgraph the same way it was split when the task completed
+            if task.is_splitter_task():
+                self.graph.split_graph(task_id)
+
+            task.set_complete(True)
+            nr_resumed += 1
+
+        logging.info("Resumed %d tasks completed by a previous run." % nr_resumed)
+
+    def __output_available(self, task_id):
+        # Determine whether output files of a task can still be found
+        for output_file in self.datastore.get_task_output_files(task_id):
+
+            # Files left on the instance of a fused task disappeared with the instance
+            if output_file.is_flagged("fused"):
+                return False
+
+            if not self.storage_helper.path_exists(output_file.get_transferrable_path()):
+                return False
+
+        return True
+
     def __make_pipeline_report(self, err, err_msg, git_version):
 
         # Create a pipeline report that summarizes features of pipeline
         report = GAPReport(self.pipeline_id, err, err_msg, git_version)
 
+        # Report is timed on the clock of the platform, which is virtual on simulated platforms
+        if self.platform is not None:
+            report.set_report_time(self.platform.clock.now())
+
         # Register runtime data for pipeline tasks
         if self.scheduler is not None:
             task_workers = self.scheduler.get_task_workers()
@@ -175,6 +278,12 @@ class GAPipeline(object):
                 end_time    = task_worker.get_stop_time()
                 cmd         = task_worker.get_cmd()
                 task_data   = {"parent_task" : task_name.split(".")[0]}
+
+                # Backup copy of a speculated task is paid for as part of the task
+                backup_worker = self.scheduler.get_backup_workers().get(task_name, None)
+                if backup_worker is not None:
+                    cost += backup_worker.get_cost()
+                    task_data["speculated"] = True
                 report.register_task(task_name=task_name,
                                      start_time=start_time,
                                      end_time=end_time,
@@ -196,6 +305,11 @@ class GAPipeline(object):
                             # OR file is temporary output file but pipeline failed
                             report.register_output_file(task_name, file_type, file_path, file_size, is_final_output)
 
+        # Register time and cost of instances kept idle between tasks, which isn't part of any task
+        if self.platform is not None:
+            idle_time, idle_cost = self.platform.get_idle_usage()
+            report.set_idle_usage(idle_time, idle_cost)
+
         return report
 
 
@@ -218,12 +332,19 @@ class GAPReport(object):
         # Time of pipeline start
         self.start_time = None
 
+        # Time when the report was made, which ends the tasks still running
+        self.report_time = time.time()
+
         # Output files produced by successful modules
         self.output_files = []
 
         # Processors used by modules
         self.tasks = []
 
+        # Time and cost of instances kept idle between tasks (recycling, pooled or held for their files)
+        self.idle_time = 0
+        self.idle_cost = 0
+
     @property
     def total_processing_time(self):
         proc_time = 0
@@ -233,15 +354,15 @@ class GAPReport(object):
 
     @property
     def total_cost(self):
-        cost = 0
+        cost = self.idle_cost
         for task in self.tasks:
             cost += float(task["cost"])
         return cost
 
     @property
     def total_runtime(self):
-        start_time = time.time()
-        end_time = time.time()
+        start_time = self.report_time
+        end_time = self.report_time
         for task in self.tasks:
             if task["start_time"] and task["start_time"] < start_time:
                 start_time = task["start_time"]
@@ -264,9 +385,16 @@ class GAPReport(object):
         self.err = False
         self.err_msg = None
 
+    def set_idle_usage(self, idle_time, idle_cost):
+        self.idle_time = idle_time
+        self.idle_cost = idle_cost
+
     def set_start_time(self, start_time):
         self.start_time = start_time
 
+    def set_report_time(self, report_time):
+        self.report_time = report_time
+
     def register_task(self, task_name, start_time, end_time, run_time, cost, cmd=None, task_data=None):
         # Register information about a specific processor in the report
 
@@ -305,6 +433,8 @@ class GAPReport(object):
         report["status"] = "Complete" if not self.err else "Failed"
         report["error"] = "" if self.err_msg is None else self.err_msg
         report["total_cost"] = self.total_cost
+        report["idle_cost"] = self.idle_cost
+        report["idle_time(sec)"] = self.idle_time
         report["total_runtime"] = self.total_runtime
         report["total_proc_time"] = self.total_processing_time
         report["total_output_size"] = self.total_output_size
@@ -13,12 +13,21 @@ class Graph(object):
         config_parser           = ConfigParser(pipeline_config_file, pipeline_config_spec)
         self.config             = config_parser.get_config()
 
+        # Function estimating the runtime of a task (default: every task takes the same time)
+        self.__runtime_estimator = lambda task: 1
+
+        # Critical path priority of every task (None = needs to be recomputed)
+        self.__priorities = None
+
         # Generate graph
         self.tasks, self.adj_list = self.__generate_graph()
 
         # Check validity of adjacency list
         self.__check_adjacency_list()
 
+        # Index children and unfinished parents of every task
+        self.__index_graph()
+
         # Check for cycles
         self.__check_cycles()
 
@@ -32,6 +41,10 @@ class Graph(object):
         self.tasks[task.get_ID()] = task
         self.adj_list[task.get_ID()] = []
 
+        # Index new node
+        self.__index_task(task)
+        self.__priorities = None
+
     def remove_task(self, task_id):
         # Remove node and all edges from Graph
         if task_id not in self.tasks:
@@ -39,13 +52,27 @@ class Graph(object):
             raise RuntimeError("Graph Error: Attempt to remove non-existant task from graph!")
 
         # Remove node from vertice list
-        self.tasks.pop(task_id)
-        self.adj_list.pop(task_id)
+        task = self.tasks.pop(task_id)
+        parents = self.adj_list.pop(task_id)
+        children = self.child_list.pop(task_id)
+
+        # Stop listening to the removed task
+        task.set_complete_listener(None)
+        self.__unfinished.pop(task_id, None)
+        self.__ready.pop(task_id, None)
+        self.__pending_parents.pop(task_id)
+        self.__priorities = None
 
         # Remove all references to node in adjacency list
-        for adj_list in self.adj_list.values():
-            if task_id in adj_list:
-                adj_list.remove(task_id)
+        for parent_id in parents:
+            if parent_id in self.child_list:
+                self.child_list[parent_id].remove(task_id)
+
+        for child_id in children:
+            self.adj_list[child_id].remove(task_id)
+            # Removed task no longer holds back its children
+            if not task.is_complete():
+                self.__release_child(child_id)
 
     def add_dependency(self, child_task_id, parent_task_id):
         # Adds dependency where dep_nod_id must wait until ind_node_id is finished
@@ -58,6 +85,28 @@ class Graph(object):
 
         # Add dependency
         self.adj_list[child_task_id].append(parent_task_id)
+        self.child_list[parent_task_id].append(child_task_id)
+        self.__priorities = None
+
+        # Child now has to wait for parent as well
+        if not self.tasks[parent_task_id].is_complete():
+            self.__pending_parents[child_task_id] += 1
+            self.__ready.pop(child_task_id, None)
+
+    def __getstate__(self):
+        # Runtime estimator is only known at runtime and can't always be saved, so the default estimator is restored
+        state = self.__dict__.copy()
+        state["_Graph__runtime_estimator"] = None
+        state["_Graph__priorities"] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.__runtime_estimator = lambda task: 1
+
+        # Tasks never keep their listener when saved
+        for task in self.tasks.values():
+            task.set_complete_listener(self.__on_task_complete)
 
     def get_tasks(self, task_id=None):
         if task_id is None:
@@ -65,17 +114,17 @@ class Graph(object):
         return self.tasks[task_id]
 
     def get_unfinished_tasks(self):
-        return [task for task in list(self.tasks.values()) if not task.is_complete()]
+        return [self.tasks[task_id] for task_id in self.__unfinished]
+
+    def get_ready_tasks(self):
+        # Return unfinished tasks whose parents have all completed
+        return [self.tasks[task_id] for task_id in self.__ready]
 
     def get_children(self, task_id):
         if task_id not in self.tasks:
             logging.error("Cannot list children for non-existant task: %s" % task_id)
             raise RuntimeError("Graph Error: Attempt to get children from nonexistant task!")
-        dependents = []
-        for task, edges in self.adj_list.items():
-            if task_id in edges:
-                dependents.append(task)
-        return dependents
+        return [x for x in self.child_list[task_id]]
 
     def get_parents(self, task_id):
         if task_id not in self.tasks:
@@ -84,17 +133,53 @@ class Graph(object):
         return [x for x in self.adj_list[task_id]]
 
     def is_complete(self):
-        return len(self.get_unfinished_tasks()) < 1
+        return len(self.__unfinished) < 1
+
+    def set_runtime_estimator(self, runtime_estimator):
+        # Set function returning the estimated runtime of a task
+        self.__runtime_estimator = runtime_estimator
+        self.__priorities = None
+
+    def get_priority(self, task_id):
+        # Return the estimated runtime of the longest path from a task to the end of the graph
+        # Tasks with higher priority are on longer paths and should be started first
+        if task_id not in self.tasks:
+            logging.error("Cannot get priority of non-existant task: %s" % task_id)
+            raise RuntimeError("Graph Error: Attempt to get priority of nonexistant task!")
+        if self.__priorities is None:
+            self.__priorities = self.__compute_priorities()
+        return self.__priorities[task_id]
+
+    def get_fused_child(self, task_id):
+        # Return the task that will run on the same instance right after a task (None if task isn't fused)
+        children = self.get_children(task_id)
+        if len(children) == 1 and self.__can_fuse(task_id, children[0]):
+            return children[0]
+        return None
+
+    def get_fused_parent(self, task_id):
+        # Return the task whose instance will be reused by a task (None if task isn't fused)
+        parents = self.get_parents(task_id)
+        if len(parents) == 1 and self.__can_fuse(parents[0], task_id):
+            return parents[0]
+        return None
 
     def parents_complete(self, task_id):
         # Determine if all task parents have completed
-        parents = self.get_parents(task_id)
-        return len(parents) == len([x for x in parents if self.get_tasks(x).is_complete()])
+        if task_id not in self.tasks:
+            logging.error("Cannot check parents for non-existant task: %s" % task_id)
+            raise RuntimeError("Graph Error: Attempt to check parents of nonexistant task!")
+        return self.__pending_parents[task_id] == 0
 
     def split_graph(self, splitter_task_id):
         # Recursively split tasks downstream of 'head_task' until a closing merge is reached
         child_tasks = self.get_children(splitter_task_id)
         splitter_task = self.tasks[splitter_task_id]
+
+        # Tasks created and tasks deprecated by the current split
+        split_task_ids = set()
+        deprecated_task_ids = OrderedDict()
+
         for split_id in splitter_task.module.get_output():
             # Create new graph partition for each new split
             split = splitter_task.module.get_output(split_id=split_id)
@@ -102,11 +187,12 @@ class Graph(object):
             # If no visible samples declared, split nodes inherit visible samples from splitter task
             visible_samples = split["visible_samples"] if split["visible_samples"] is not None else splitter_task.get_visible_samples()
             for child_task in child_tasks:
-                child_split = self.__split_subgraph(child_task, splitter_task_id, split_id, visible_samples)
+                child_split = self.__split_subgraph(child_task, splitter_task_id, split_id, visible_samples,
+                                                    split_task_ids, deprecated_task_ids)
                 self.add_dependency(child_split, splitter_task_id)
 
         # Loop through deprecated tasks and give upstream dependencies for parent tasks that weren't in splitter's subtree
-        for task in self.__deprecated_tasks:
+        for task in deprecated_task_ids:
             # Get parents of deprecated task
             parents = self.get_parents(task)
             for parent in parents:
@@ -123,13 +209,13 @@ class Graph(object):
             # Set deprecated task to complete so it doesn't get run
             self.tasks[task].set_complete(is_complete=True)
 
-            # Make sure graph structure is still valid
-            self.__check_adjacency_list()
-            self.__check_cycles()
-
-    @property
-    def __deprecated_tasks(self):
-        return [task.get_ID() for task in list(self.tasks.values()) if task.is_deprecated()]
+        # Make sure the part of the graph altered by the split is still valid
+        # Every new edge ends in a newly created task, so the splitter and the new tasks cover all new cycles
+        altered_task_ids = set(split_task_ids)
+        for task_id in split_task_ids:
+            altered_task_ids.update(self.child_list[task_id])
+        self.__check_adjacency_list(task_ids=altered_task_ids, runtime=True)
+        self.__check_cycles(task_ids=[splitter_task_id] + list(split_task_ids), runtime=True)
 
     def __generate_graph(self):
 
@@ -143,9 +229,71 @@ class Graph(object):
 
         return tasks, adj_list
 
-    def __check_adjacency_list(self, runtime=False):
+    def __index_graph(self):
+        # Build reverse adjacency list and counters of unfinished parents from the adjacency list
+
+        # Tasks receiving input from each task
+        self.child_list = OrderedDict()
+
+        # Number of unfinished parents of each task
+        self.__pending_parents = {}
+
+        # Ordered sets of unfinished tasks and of unfinished tasks that are ready to run
+        self.__unfinished = OrderedDict()
+        self.__ready = OrderedDict()
+
+        for task in self.tasks.values():
+            self.__index_task(task)
+
+        for task_id, parents in self.adj_list.items():
+            for parent_id in parents:
+                self.child_list[parent_id].append(task_id)
+                if not self.tasks[parent_id].is_complete():
+                    self.__pending_parents[task_id] += 1
+                    self.__ready.pop(task_id, None)
+
+    def __index_task(self, task):
+        # Index a task that doesn't have any dependencies yet
+        task_id = task.get_ID()
+        self.child_list[task_id] = []
+        self.__pending_parents[task_id] = 0
+
+        if not task.is_complete():
+            self.__unfinished[task_id] = None
+            self.__ready[task_id] = None
+
+        # Keep counters up to date when the task completes
+        task.set_complete_listener(self.__on_task_complete)
+
+    def __on_task_complete(self, task_id, is_complete):
+        # Update counters after a task changed its completion status
+        if is_complete:
+            self.__unfinished.pop(task_id, None)
+            self.__ready.pop(task_id, None)
+            for child_id in self.child_list[task_id]:
+                self.__release_child(child_id)
+
+        else:
+            self.__unfinished[task_id] = None
+            if self.__pending_parents[task_id] == 0:
+                self.__ready[task_id] = None
+            for child_id in self.child_list[task_id]:
+                self.__pending_parents[child_id] += 1
+                self.__ready.pop(child_id, None)
+
+    def __release_child(self, child_id):
+        # Mark that one of the unfinished parents of a task is no longer holding it back
+        self.__pending_parents[child_id] -= 1
+        if self.__pending_parents[child_id] == 0 and child_id in self.__unfinished:
+            self.__ready[child_id] = None
+
+    def __check_adjacency_list(self, task_ids=None, runtime=False):
+        # Check the input tasks of the given tasks (default: all tasks)
+        task_ids = self.adj_list.keys() if task_ids is None else task_ids
+
         errors = False
-        for task, adj_tasks in self.adj_list.items():
+        for task in task_ids:
+            adj_tasks = self.adj_list[task]
 
             # Enforce uniqueness of task inputs. Duplicate entries are probably a mistake so better to just throw error
             if len(adj_tasks) != len(set(adj_tasks)):
@@ -168,7 +316,7 @@ class Graph(object):
             else:
                 raise RuntimeError("Runtime graph alteration resulted in invalid graph!")
 
-    def __split_subgraph(self, task_id, splitter_task_id, split_id, visible_samples, level=1, split_task_ids=[]):
+    def __split_subgraph(self, task_id, splitter_task_id, split_id, visible_samples, split_task_ids, deprecated_task_ids, level=1):
         # Recursively split subgraph that depends on 'task'
 
         task = self.tasks[task_id]
@@ -192,6 +340,7 @@ class Graph(object):
         # Can happen if two tasks in split subtree have same child
         if split_task.get_ID() in split_task_ids:
             task.deprecate()
+            deprecated_task_ids[task_id] = None
             return split_task.get_ID()
 
         # Add newly created task to existing graph and clone parental dependencies
@@ -199,55 +348,120 @@ class Graph(object):
 
         # Mark original task as deprecated so it can be discarded
         task.deprecate()
+        deprecated_task_ids[task_id] = None
 
         # Add new task ID to list of ids in current split
-        split_task_ids.append(split_task.get_ID())
+        split_task_ids.add(split_task.get_ID())
 
         # Create dependencies between current task and splits created for each child task
         child_tasks = self.get_children(task_id)
         for child_task in child_tasks:
             # Split each child subgraph
-            child_split = self.__split_subgraph(child_task, splitter_task_id, split_id, visible_samples, level, split_task_ids)
+            child_split = self.__split_subgraph(child_task, splitter_task_id, split_id, visible_samples,
+                                                split_task_ids, deprecated_task_ids, level)
             # Connect task to split child subgraph
             self.add_dependency(child_split, split_task.get_ID())
 
         # Return split task
         return split_task.get_ID()
 
-    def __check_cycles(self, runtime=False):
-        # Taken with modification from https://www.geeksforgeeks.org/detect-cycle-in-a-graph/
+    def __can_fuse(self, parent_id, child_id):
+        # Determine whether a child task can run on the instance of its parent task
+        # Only single-parent/single-child links between tasks that opted in for fusion can be fused
+        parent, child = self.tasks[parent_id], self.tasks[child_id]
+        if not parent.is_fusable() or not child.is_fusable():
+            return False
+
+        if len(self.child_list[parent_id]) != 1 or len(self.adj_list[child_id]) != 1:
+            return False
+
+        # Splitters change the graph downstream, so their children are only known after they finish
+        if parent.is_splitter_task() or child.is_splitter_task():
+            return False
+
+        if parent.is_deprecated() or child.is_deprecated():
+            return False
+
+        # Instance disk is sized for the docker image of the parent
+        if parent.get_docker_image_id() != child.get_docker_image_id():
+            return False
+
+        # Child cannot ask for more resources than the parent, when both of them declare them
+        parent_args, child_args = parent.get_graph_config_args(), child.get_graph_config_args()
+        for resource in ["nr_cpus", "mem"]:
+            if resource in parent_args and resource in child_args:
+                if float(child_args[resource]) > float(parent_args[resource]):
+                    return False
+
+        return True
+
+    def __compute_priorities(self):
+        # Compute priorities of all tasks with children always computed before their parents
+        priorities = {}
+        for task_id in self.tasks:
+            stack = [task_id]
+            while stack:
+                curr_id = stack[-1]
+
+                # Skip tasks reached through multiple paths
+                if curr_id in priorities:
+                    stack.pop()
+                    continue
+
+                # Compute the priorities of the children first
+                pending_children = [child_id for child_id in self.child_list[curr_id] if child_id not in priorities]
+                if pending_children:
+                    stack.extend(pending_children)
+                    continue
+
+                stack.pop()
+                longest_child_path = max([priorities[child_id] for child_id in self.child_list[curr_id]], default=0)
+                priorities[curr_id] = self.__runtime_estimator(self.tasks[curr_id]) + longest_child_path
+
+        return priorities
+
+    def __check_cycles(self, task_ids=None, runtime=False):
+        # Search for cycles reachable from the given tasks (default: all tasks)
+        task_ids = list(self.tasks.keys()) if task_ids is None else task_ids
+
         cycle = False
-        visited = []
-        recStack = []
-        for task_id in list(self.tasks.keys()):
+        visited = set()
+        for task_id in task_ids:
             if task_id not in visited:
-                if self.__is_cycle(task_id, visited, recStack):
+                if self.__is_cycle(task_id, visited):
                     cycle = True
+                    break
         if cycle:
             if not runtime:
                 raise IOError("Incorrect pipeline graph: Cycle detected!")
             else:
                 raise RuntimeError("Runtime graph alteration resulted in invalid graph: Cycle detected!")
 
-    def __is_cycle(self, task_id, visited, recStack):
+    def __is_cycle(self, task_id, visited):
+        # Iterative depth-first search from 'task_id' looking for an edge back into the current path
 
-        # Mark current task as visited
-        visited.append(task_id)
-        # Add current task to current recursion stack
-        recStack.append(task_id)
+        # Tasks on the current path and iterators over the children left to visit for each of them
+        rec_stack = {task_id}
+        stack = [(task_id, iter(self.child_list[task_id]))]
+        visited.add(task_id)
 
-        # Check if any subgraph of current task contains a cycle
-        neighbors = self.get_children(task_id)
-        for neighbor_id in neighbors:
-            if neighbor_id not in visited:
-                if self.__is_cycle(neighbor_id, visited, recStack):
+        while stack:
+            curr_id, children = stack[-1]
+            for child_id in children:
+                if child_id in rec_stack:
+                    logging.error("Incorrect pipeline graph: Cycle detected that includes task '%s'!" % child_id)
                     return True
-            elif neighbor_id in recStack:
-                logging.error("Incorrect pipeline graph: Cycle detected that includes task '%s'!" % task_id)
-                return True
+                if child_id not in visited:
+                    # Descend into child
+                    visited.add(child_id)
+                    rec_stack.add(child_id)
+                    stack.append((child_id, iter(self.child_list[child_id])))
+                    break
+            else:
+                # All children of current task have been visited
+                stack.pop()
+                rec_stack.remove(curr_id)
 
-        # Pop current task from recursion stack
-        recStack.remove(task_id)
         return False
 
     def __str__(self):
@@ -1,12 +1,16 @@
 import logging
 import os
 
-from System.Platform import CloudPlatform, StorageHelper, DockerHelper
+from System.Platform import CloudPlatform, StorageHelper, DockerHelper, Clock
+from System.Platform.BootstrapScript import BootstrapScript
 
 
 class ModuleExecutor(object):
 
-    def __init__(self, task_id, processor, workspace, docker_image=None):
+    # Seconds to wait between two checks of the running input transfers
+    TRANSFER_POLL_INTERVAL = 1
+
+    def __init__(self, task_id, processor, workspace, docker_image=None, transfer_window=5, bootstrap=False, clock=None):
         self.task_id        = task_id
         self.processor      = processor
         self.workspace      = workspace
@@ -14,31 +18,79 @@ class ModuleExecutor(object):
         self.docker_helper  = DockerHelper(self.processor)
         self.docker_image   = docker_image
 
+        # Clock used to wait for transfers
+        self.clock          = clock if clock is not None else Clock()
+
+        # Maximum number of input transfers running at the same time
+        # The window shrinks by half whenever a transfer has to be retried and grows back by one after each clean transfer
+        self.max_transfer_window    = max(int(transfer_window), 1)
+        self.transfer_window        = self.max_transfer_window
+
+        # Whether the processor is prepared by a single bootstrap script creating the workspace, pulling the docker image
+        # and loading the inputs, instead of one SSH command per directory, permission update, pull and transfer
+        self.bootstrap          = bootstrap and processor is not None
+        self.workspace_created  = False
+
+        # Exit code and runtime of each command of the bootstrap script, indexed by command (None = no script was run)
+        self.bootstrap_timings  = None
+
         # Create workspace directory structure
-        self.__create_workspace()
+        # Without a processor the task runs in the current process and only touches remote storage,
+        # which doesn't need any directories to be created
+        # Bootstrap scripts create the workspace together with the inputs
+        if self.processor is not None and not self.bootstrap:
+            self.__create_workspace()
+        elif self.bootstrap:
+            self.__set_processor_workspace()
+
+    def get_bootstrap_timings(self):
+        return self.bootstrap_timings
 
     def load_input(self, inputs):
 
         # List of jobs that have been started in process of loading input
         job_names = []
 
+        # Script preparing the processor in a single SSH command (None = one command per job)
+        script = self.__get_bootstrap_script() if self.bootstrap else None
+
         # Pull docker image if necessary
         if self.docker_image is not None:
             docker_image_name = self.docker_image.get_image_name().split("/")[0]
             docker_image_name = docker_image_name.replace(":","_")
             job_name = "docker_pull_%s" % docker_image_name
-            self.docker_helper.pull(self.docker_image.get_image_name(), job_name=job_name)
-            job_names.append(job_name)
+            if script is not None:
+                script.add_command("load_input", job_name, DockerHelper.get_pull_cmd(self.docker_image.get_image_name()))
+            else:
+                self.docker_helper.pull(self.docker_image.get_image_name(), job_name=job_name)
+                job_names.append(job_name)
 
         # Load input files
         # Inputs: list containing remote files, local files, and docker images
-        src_seen = []
-        dest_seen = []
+        # Largest files are transferred first, as they take the longest to transfer
+        inputs = sorted(inputs, key=lambda _input: _input.get_size() if _input.size_known() else 0, reverse=True)
+        src_seen = set()
+        dest_seen = set()
         count = 1
-        batch_size = 5
-        loading_counter = 0
+
+        # Input transfers currently running
+        transfers = []
         for task_input in inputs:
 
+            # Link files left on the processor by the fused parent task into the working directory
+            if task_input.is_flagged("fused"):
+                if task_input.get_transferrable_path() not in src_seen:
+                    src_seen.add(task_input.get_transferrable_path())
+                    job_name = "link_input_%s_%s_%s" % (self.task_id, task_input.get_type(), count)
+                    self.__link_local_file(task_input, job_name=job_name, script=script)
+                    if script is None:
+                        job_names.append(job_name)
+                    count += 1
+                else:
+                    task_input.update_path(new_dir=self.workspace.get_wrk_dir())
+                task_input.unflag("fused")
+                continue
+
             # Don't transfer local files
             if ":" not in task_input.get_path():
                 continue
@@ -76,32 +128,46 @@ class ModuleExecutor(object):
                 # Show the final log file
                 logging.debug("Destination: {0}".format(dest_path))
 
-                # Move file to dest_path
-                self.storage_helper.mv(src_path=src_path,
-                                       dest_path=dest_path,
-                                       job_name=job_name)
-                loading_counter += 1
+                # Link local copy of the file if the processor already holds one, otherwise move file to dest_path
+                # Bootstrap scripts only list the transfers, which are run by the script within the transfer window
+                cached_path = self.processor.get_cached_file(src_path)
+                if cached_path is not None:
+                    logging.debug("Input '%s' is already on the processor at '%s'. Skipping transfer!" % (src_path, cached_path))
+                if script is not None:
+                    if cached_path is not None:
+                        # Script can be rerun, so existing links are replaced
+                        script.add_command("load_input", job_name, "sudo cp -alf %s %s" % (cached_path, dest_path))
+                    else:
+                        script.add_command("load_input", job_name, StorageHelper.get_mv_cmd(src_path, dest_path))
+                else:
+                    # Wait for a running transfer to finish if the transfer window is full
+                    self.__wait_for_transfers(transfers, max_running=self.transfer_window - 1)
+                    if cached_path is not None:
+                        self.processor.run(job_name=job_name, cmd="sudo cp -al %s %s" % (cached_path, dest_path))
+                    else:
+                        self.storage_helper.mv(src_path=src_path,
+                                               dest_path=dest_path,
+                                               job_name=job_name)
+                    transfers.append((job_name, self.processor.processes[job_name]))
 
                 # Add transfer path to list of remote paths that have been transferred to local workspace
-                src_seen.append(src_path)
+                src_seen.add(src_path)
                 count += 1
-                job_names.append(job_name)
-
-                # If loading_counter is batch_size, clear out queue
-                if loading_counter >= batch_size:
-                    logging.debug("Batch size reached on task {0}".format(
-                        self.task_id))
-                    # Wait for all processes to finish
-                    while len(job_names):
-                        self.processor.wait_process(job_names.pop())
-                    loading_counter = 0
 
             # Update path after transferring to wrk directory and add to list of files in working directory
             task_input.update_path(new_dir=dest_dir, new_filename=dest_filename)
-            dest_seen.append(task_input.get_path())
+            dest_seen.add(task_input.get_path())
             logging.debug("Updated path: %s" % task_input.get_path())
 
+        # Run all the steps at once, giving permissions only on the loaded inputs as directories got them when created
+        if script is not None:
+            if len(dest_seen) > 0:
+                script.add_command("grant_input_perms", "chmod", "sudo chmod -R 777 %s" % " ".join(sorted(dest_seen)))
+            self.__run_bootstrap_script(script)
+            return
+
         # Wait for all processes to finish
+        self.__wait_for_transfers(transfers, max_running=0)
         for job_name in job_names:
             self.processor.wait_process(job_name)
 
@@ -109,7 +175,12 @@ class ModuleExecutor(object):
         logging.info("(%s) Final workspace perm. update for task '%s'..." % (self.processor.name, self.task_id))
         self.__grant_workspace_perms(job_name="grant_final_wrkspace_perms")
 
-    def run(self, cmd, job_name=None):
+    def run(self, cmd, job_name=None, full_output=False):
+        # Run command and return its output once it has finished
+        # With full_output, commands whose output was truncated (see process_output_limit) fail instead
+
+        # Create workspace if no bootstrap script created it yet
+        self.__create_bootstrapped_workspace()
 
         # Check or create job name
         if job_name is None:
@@ -120,10 +191,21 @@ class ModuleExecutor(object):
 
         # Begin running job and return stdout, stderr after job has finished running
         self.processor.run(job_name, cmd, docker_image=docker_image_name)
-        return self.processor.wait_process(job_name)
+        out, err = self.processor.wait_process(job_name)
 
-    def save_output(self, outputs, final_output_types):
+        if full_output and self.processor.processes[job_name].is_truncated():
+            logging.error("(%s) Output of job '%s' was truncated to process_output_limit bytes, but the module processes it! "
+                          "Set process_output_limit to 0 (unbounded) or above the size of the output." % (self.task_id, job_name))
+            raise RuntimeError("(%s) Module cannot process truncated output of job '%s'!" % (self.task_id, job_name))
+
+        return out, err
+
+    def save_output(self, outputs, final_output_types, keep_local=False):
         # Return output files to workspace output dir
+        # With keep_local, non-final files are left on the processor for the fused task that runs next on it
+
+        # Create workspace if no bootstrap script created it yet
+        self.__create_bootstrapped_workspace()
 
         # Get workspace places for output files
         final_output_dir = self.workspace.get_output_dir()
@@ -145,6 +227,16 @@ class ModuleExecutor(object):
             file_size = self.storage_helper.get_file_size(output_file.get_path(), job_name=job_name)
             output_file.set_size(file_size)
 
+            # Without a processor, non-final files are left where they are as they already are in remote storage
+            if self.processor is None and output_file.get_type() not in final_output_types:
+                count += 1
+                continue
+
+            if keep_local and output_file.get_type() not in final_output_types:
+                output_file.flag("fused")
+                count += 1
+                continue
+
             # Check if there already exists a file with the same name on the bucket
             destination_path = "{0}/{1}/".format(dest_dir.rstrip("/"), output_file.get_filename())
             if destination_path in output_filepaths:
@@ -165,11 +257,19 @@ class ModuleExecutor(object):
             # Transfer to correct output directory
             job_name = "save_output_%s_%s_%s" % (self.task_id, output_file.get_type(), count)
             curr_path = output_file.get_transferrable_path()
-            self.storage_helper.mv(curr_path, dest_dir, job_name=job_name)
+            if self.processor is None:
+                # Copy between storage locations from the current process
+                self.storage_helper.copy(curr_path, dest_dir)
+            else:
+                self.storage_helper.mv(curr_path, dest_dir, job_name=job_name)
+                job_names.append(job_name)
 
             # Update path of output file to reflect new location
-            job_names.append(job_name)
             output_file.update_path(new_dir=dest_dir)
+
+            # Remote transfers leave the local file in place, so tasks placed later on the processor can reuse it
+            if self.processor is not None and ":" not in curr_path and ":" in dest_dir:
+                self.processor.cache_file(output_file.get_transferrable_path(), curr_path)
             logging.debug("(%s) Transferring file '%s' from old path '%s' to new path '%s' ('%s')" % (
                 self.task_id, output_file.get_type(), curr_path, output_file.get_path(), output_file.get_transferrable_path()))
 
@@ -189,15 +289,16 @@ class ModuleExecutor(object):
         # Create all directories specified in task workspace
 
         logging.info("(%s) Creating workspace for task '%s'..." % (self.processor.name, self.task_id))
-        for dir_type, dir_obj in self.workspace.get_workspace().items():
-            self.storage_helper.mkdir(dir_obj, job_name="mkdir_%s" % dir_type, wait=True)
+        # Directories are created at once, through a single submission when the processor runs an agent
+        mkdir_jobs = [("mkdir_%s" % dir_type, StorageHelper.get_mkdir_cmd(dir_obj))
+                      for dir_type, dir_obj in self.workspace.get_workspace().items()
+                      if StorageHelper.get_mkdir_cmd(dir_obj) is not None]
+        self.processor.run_batch(mkdir_jobs)
+        for job_name, _ in mkdir_jobs:
+            self.processor.wait_process(job_name)
 
         # Set processor wrk, log directories
-        self.processor.set_workspace(
-            wrk_dir=self.workspace.get_wrk_dir(),
-            wrk_out_dir=self.workspace.get_wrk_out_dir(),
-            wrk_log_dir=self.workspace.get_wrk_log_dir()
-        )
+        self.__set_processor_workspace()
 
         # Give everyone all the permissions on working directory
         logging.info("(%s) Updating workspace permissions..." % self.processor.name)
@@ -206,7 +307,89 @@ class ModuleExecutor(object):
         # Wait for all the above commands to complete
         logging.info("(%s) Successfully created workspace for task '%s'!" % (self.processor.name, self.task_id))
 
+    def __set_processor_workspace(self):
+        self.processor.set_workspace(
+            wrk_dir=self.workspace.get_wrk_dir(),
+            wrk_out_dir=self.workspace.get_wrk_out_dir(),
+            wrk_log_dir=self.workspace.get_wrk_log_dir()
+        )
+
+    def __get_bootstrap_script(self):
+        # Return bootstrap script creating the workspace directories with all permissions at once
+        script = BootstrapScript("bootstrap_%s" % self.task_id)
+        script.add_step("create_workspace")
+        local_dirs = [dir_obj for dir_obj in self.workspace.get_workspace().values()
+                      if StorageHelper.get_mkdir_cmd(dir_obj) is not None]
+        if len(local_dirs) > 0:
+            script.add_command("create_workspace", "mkdir", "sudo install -d -m 777 %s" % " ".join(local_dirs))
+
+        # Docker image and inputs are loaded in parallel, logging to the workspace created in the previous step
+        log_path = os.path.join(self.workspace.get_wrk_log_dir(), "load_input_%s_bootstrap.log" % self.task_id)
+        script.add_step("load_input", parallelism=self.transfer_window, log_path=log_path)
+        script.add_step("grant_input_perms", log_path=log_path)
+        return script
+
+    def __run_bootstrap_script(self, script):
+        # Prepare processor through a single SSH command and record how long each step took
+        job_name = "load_input_%s_bootstrap" % self.task_id
+        logging.info("(%s) Running bootstrap script for task '%s'..." % (self.processor.name, self.task_id))
+        self.processor.run(job_name=job_name, cmd=script.get_command())
+        out, err = self.processor.wait_process(job_name)
+        self.workspace_created = True
+
+        self.bootstrap_timings = BootstrapScript.parse_timings(out)
+        for cmd_name, timing in self.bootstrap_timings.items():
+            logging.debug("(%s) Bootstrap '%s' took %.2f seconds (exit code: %s)." %
+                          (self.task_id, cmd_name, timing["runtime"], timing["exit_code"]))
+        logging.info("(%s) Bootstrap script complete! Steps: %s" %
+                     (self.task_id, ", ".join("%s=%.1fs" % (step_name, timing["runtime"])
+                                              for step_name, timing in self.bootstrap_timings.items() if "." not in step_name)))
+
+    def __create_bootstrapped_workspace(self):
+        # Tasks not loading any input still need their workspace before running commands or saving outputs
+        if self.bootstrap and not self.workspace_created:
+            self.__run_bootstrap_script(self.__get_bootstrap_script())
+
     def __grant_workspace_perms(self, job_name):
         cmd = "sudo chmod -R 777 %s" % self.workspace.get_wrk_dir()
         self.processor.run(job_name=job_name, cmd=cmd)
         self.processor.wait_process(job_name)
+
+    def __wait_for_transfers(self, transfers, max_running):
+        # Wait until at most max_running transfers are still running, adapting the transfer window to failed transfers
+        while len(transfers) > max(max_running, 0):
+
+            # Find transfers that have finished
+            finished = [transfer for transfer in transfers if transfer[1].poll() is not None]
+            if len(finished) == 0:
+                self.clock.sleep(self.TRANSFER_POLL_INTERVAL)
+                continue
+
+            for transfer in finished:
+                transfers.remove(transfer)
+                job_name, proc_obj = transfer
+
+                # Processor replaces the process of a transfer whenever it has to retry it
+                self.processor.wait_process(job_name)
+                if self.processor.processes[job_name] is not proc_obj:
+                    self.transfer_window = max(self.transfer_window // 2, 1)
+                    logging.debug("(%s) Transfer '%s' had to be retried. Transfer window reduced to %d." %
+                                  (self.task_id, job_name, self.transfer_window))
+                else:
+                    self.transfer_window = min(self.transfer_window + 1, self.max_transfer_window)
+
+            # Window may have shrunk, so fewer transfers may be allowed to keep running
+            max_running = min(max_running, self.transfer_window - 1)
+
+    def __link_local_file(self, task_input, job_name, script=None):
+        # Hard link local file into the working directory, which is the only directory visible to docker containers
+        dest_dir = self.workspace.get_wrk_dir()
+        if script is not None:
+            # Script can be rerun, so existing links are replaced
+            script.add_command("load_input", job_name, "sudo cp -alf %s %s" % (task_input.get_transferrable_path(), dest_dir))
+        else:
+            cmd = "sudo cp -al %s %s" % (task_input.get_transferrable_path(), dest_dir)
+            self.processor.run(job_name=job_name, cmd=cmd)
+        task_input.update_path(new_dir=dest_dir)
+        logging.debug("(%s) Linked file '%s' left by fused task into working directory ('%s')" % (
+            self.task_id, task_input.get_type(), task_input.get_path()))
@@ -0,0 +1,93 @@
+import glob
+import hashlib
+import logging
+import os
+import pickle
+import sys
+
+from System import CC_MAIN_DIR
+
+
+class PlanCache(object):
+    # Cache of validated task graphs (plans) shared across pipeline launches
+    # A plan holds the task graph with its module instances, together with the input source chosen for every argument
+    # Plans are keyed on everything the validated graph depends on: graph and resource kit configs,
+    # types of sample data and the CloudConductor code itself, so changing any of them invalidates the plan
+
+    # Version of the plan file format
+    PLAN_VERSION = 1
+
+    # Code that plans depend on (relative to the CloudConductor directory)
+    CODE_PATHS = ["Modules/**/*.py", "System/Graph/*.py", "System/Graph/*.validate", "System/Validators/*.py"]
+
+    def __init__(self, plan_dir):
+
+        # Local directory where plans are stored
+        self.plan_dir = plan_dir
+
+    def get_key(self, graph_config, resource_kit_config, sample_data):
+        # Return key identifying the plan of a pipeline
+        key_hash = hashlib.sha256()
+        key_hash.update(("%s:%s" % (self.PLAN_VERSION, sys.version)).encode("utf8"))
+
+        # Sample values don't change the plan, so every batch of samples with the same data types shares the plan
+        key_hash.update(",".join(sorted(str(data_type) for data_type in sample_data.get_data())).encode("utf8"))
+
+        for path in [graph_config, resource_kit_config] + self.__get_code_files():
+            with open(path, "rb") as inp:
+                key_hash.update(path.encode("utf8"))
+                key_hash.update(inp.read())
+
+        return key_hash.hexdigest()
+
+    def load(self, key):
+        # Return plan with the given key (None if no valid plan is found)
+        plan_path = self.__get_plan_path(key)
+        if not os.path.exists(plan_path):
+            logging.debug("No plan found for current configs. Graph will be loaded and validated.")
+            return None
+
+        try:
+            with open(plan_path, "rb") as inp:
+                plan = pickle.load(inp)
+        except BaseException as e:
+            # Plan is only a shortcut, so the graph can always be loaded again from the configs
+            logging.warning("Unable to read plan '%s'! Graph will be loaded and validated." % plan_path)
+            if str(e) != "":
+                logging.warning("Received the following message:\n%s" % e)
+            return None
+
+        logging.info("Loaded validated graph from plan '%s'." % plan_path)
+        return plan
+
+    def save(self, key, graph, argument_sources):
+        # Save validated graph and the input sources of its arguments as plan with the given key
+        plan = {"graph": graph, "argument_sources": argument_sources}
+
+        try:
+            if not os.path.exists(self.plan_dir):
+                os.makedirs(self.plan_dir)
+
+            # Plan is replaced at once so that it is never left partially written
+            plan_path = self.__get_plan_path(key)
+            tmp_plan_path = "%s.tmp" % plan_path
+            with open(tmp_plan_path, "wb") as out:
+                pickle.dump(plan, out, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_plan_path, plan_path)
+
+        except BaseException as e:
+            logging.warning("Unable to save plan of validated graph! Graph will be validated again on next launch.")
+            if str(e) != "":
+                logging.warning("Received the following message:\n%s" % e)
+            return
+
+        logging.debug("Validated graph saved to plan '%s'." % plan_path)
+
+    def __get_plan_path(self, key):
+        return os.path.join(self.plan_dir, "%s.plan" % key)
+
+    def __get_code_files(self):
+        code_files = []
+        for code_path in self.CODE_PATHS:
+            code_files.extend(glob.glob(os.path.join(CC_MAIN_DIR, code_path), recursive=True))
+        return sorted(code_files)
@@ -0,0 +1,254 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from System.Datastore import GAPFile, RunJournal
+from System.Platform import StorageHelper
+from System.Platform.DockerImage import DockerImage
+
+
+class ResultCache(object):
+    # Cache of task outputs shared across pipeline runs
+    # Entries are keyed on everything that determines the output of a task: module class, non-path arguments,
+    # docker image digest and identity (path, size) of the input files
+    # Output files of cached tasks are copied to the cache directory, while entries are listed in an index
+    # The index is kept in the cache directory so that it is shared by all runs, the local index is a working copy of it
+
+    # Arguments that only describe the resources given to a task and don't change its output
+    RESOURCE_ARGS = ["nr_cpus", "mem"]
+
+    def __init__(self, cache_dir, index_path, max_size=0, max_age=0):
+
+        # Remote directory where output files of cached tasks are stored
+        self.cache_dir = cache_dir.rstrip("/") + "/"
+
+        # Local file listing the cache entries and index shared through the cache directory
+        self.index_path         = index_path
+        self.shared_index_path  = self.cache_dir + "index.json"
+
+        # Maximum size (GB) of all cached files and maximum number of days an entry is kept unused (0 = no limit)
+        self.max_size   = max_size
+        self.max_age    = max_age
+
+        # Helper for transferring files between storage locations from the current process
+        self.storage_helper = StorageHelper(None)
+
+        # Cache entries indexed by key, from least to most recently used
+        # Keys removed by the current run are remembered so that they aren't merged back from the shared index
+        self.index_lock     = threading.Lock()
+        self.removed_keys   = set()
+        self.entries        = self.__merge_shared_index(self.__load_index())
+
+        # Digests of docker images indexed by image name
+        self.docker_digests = {}
+
+        # Remove entries that have expired since the last run
+        self.evict()
+
+    def get_key(self, task, input_files, docker_image=None):
+        # Return key identifying the output of a task (None if the output cannot be identified)
+        module = task.get_module()
+
+        # Non-path arguments
+        args = OrderedDict()
+        for arg_name, arg in sorted(module.get_arguments().items()):
+            value = arg.get_value()
+            if arg_name in self.RESOURCE_ARGS or len(self.__get_files(value)) > 0:
+                continue
+            args[arg_name] = value
+
+        # Input files are identified by their path and size
+        inputs = []
+        for input_file in input_files:
+            if not input_file.size_known():
+                logging.debug("(%s) Size of input '%s' is unknown. Task output cannot be cached!" %
+                              (task.get_ID(), input_file.get_path()))
+                return None
+            inputs.append([input_file.get_type(), input_file.get_transferrable_path(), input_file.get_size()])
+
+        key_data = OrderedDict()
+        key_data["module"]  = "%s.%s" % (module.__class__.__module__, module.__class__.__name__)
+        key_data["args"]    = args
+        key_data["docker"]  = None if docker_image is None else self.__get_docker_digest(docker_image.get_image_name())
+        key_data["inputs"]  = sorted(inputs)
+
+        key_string = json.dumps(key_data, default=str, sort_keys=True)
+        return hashlib.sha256(key_string.encode("utf8")).hexdigest()
+
+    def lookup(self, key):
+        # Return output of a cached task (None if output isn't cached)
+        with self.index_lock:
+            entry = self.entries.get(key, None)
+        if entry is None:
+            return None
+
+        # Make sure cached files haven't been removed from the cache directory
+        output = RunJournal.decode(entry["output"])
+        for output_file in self.__get_files(output):
+            if not self.storage_helper.path_exists(output_file.get_transferrable_path()):
+                logging.warning("Cached file '%s' is missing! Cache entry will be removed." % output_file.get_path())
+                self.__remove_entries([key])
+                return None
+
+        # Mark entry as most recently used
+        with self.index_lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.entries[key]["last_used"] = time.time()
+                self.__save_index()
+
+        return output
+
+    def store(self, key, task):
+        # Copy output files of a completed task to the cache directory and add them to the cache
+        output = RunJournal.decode(RunJournal.encode(task.get_module().get_output()))
+        output_files = self.__get_files(output)
+
+        # Only files and directories in remote storage can be copied to the cache
+        for output_file in output_files:
+            if not output_file.is_remote() or output_file.is_prefix():
+                logging.debug("(%s) Output '%s' cannot be copied to the result cache. Task output will not be cached!" %
+                              (task.get_ID(), output_file.get_path()))
+                return
+
+        # Each file gets its own directory so that files with the same name don't overwrite each other
+        entry_dir = os.path.join(self.cache_dir, key)
+        size = 0
+        for file_nr, output_file in enumerate(output_files):
+            file_dir = os.path.join(entry_dir, str(file_nr))
+            self.storage_helper.copy(output_file.get_transferrable_path(), file_dir)
+            output_file.update_path(new_dir=file_dir)
+            size += output_file.get_size() if output_file.size_known() else 0
+
+        with self.index_lock:
+            self.entries[key] = {"task_id"  : task.get_ID(),
+                                 "output"   : RunJournal.encode(output),
+                                 "size"     : size,
+                                 "last_used": time.time()}
+            self.__save_index()
+
+        logging.info("(%s) Task output added to the result cache (%s GB)." % (task.get_ID(), round(size, 2)))
+
+        # Make room for the new entry
+        self.evict()
+
+    def evict(self):
+        # Remove entries unused for too long, then least recently used entries until the cache is small enough
+        expired = []
+        with self.index_lock:
+            now = time.time()
+            total_size = sum(entry["size"] for entry in self.entries.values())
+            for key, entry in self.entries.items():
+                if self.max_age > 0 and now - entry["last_used"] > self.max_age * 24 * 3600:
+                    expired.append(key)
+                    total_size -= entry["size"]
+                elif self.max_size > 0 and total_size > self.max_size:
+                    expired.append(key)
+                    total_size -= entry["size"]
+
+        if len(expired) > 0:
+            logging.debug("Removing %d entries from the result cache." % len(expired))
+            self.__remove_entries(expired)
+
+    def __remove_entries(self, keys):
+        with self.index_lock:
+            for key in keys:
+                self.entries.pop(key, None)
+                self.removed_keys.add(key)
+            self.__save_index()
+
+        for key in keys:
+            try:
+                self.storage_helper.rm(os.path.join(self.cache_dir, key))
+            except BaseException as e:
+                logging.warning("Unable to remove files of result cache entry '%s'!" % key)
+                if str(e) != "":
+                    logging.warning("Received the following message:\n%s" % e)
+
+    def __get_docker_digest(self, image_name):
+        # Identify docker image by its digest, as tags can be moved to new images
+        if image_name not in self.docker_digests:
+            try:
+                self.docker_digests[image_name] = DockerImage(image_name).digest
+            except BaseException as e:
+                logging.warning("Unable to get digest of docker image '%s'! Image will be identified by its name." % image_name)
+                if str(e) != "":
+                    logging.warning("Received the following message:\n%s" % e)
+                self.docker_digests[image_name] = image_name
+        return self.docker_digests[image_name]
+
+    def __load_index(self):
+        if not os.path.exists(self.index_path):
+            return OrderedDict()
+
+        try:
+            with open(self.index_path) as inp:
+                entries = json.load(inp, object_pairs_hook=OrderedDict)
+        except BaseException as e:
+            logging.warning("Unable to read result cache index '%s'! Cache will start empty." % self.index_path)
+            if str(e) != "":
+                logging.warning("Received the following message:\n%s" % e)
+            return OrderedDict()
+
+        logging.debug("Loaded %d result cache entries from '%s'." % (len(entries), self.index_path))
+        return OrderedDict(sorted(entries.items(), key=lambda item: item[1]["last_used"]))
+
+    def __merge_shared_index(self, entries):
+        # Add entries of the shared index, keeping the most recently used version of entries found in both
+        try:
+            if not self.storage_helper.path_exists(self.shared_index_path):
+                return entries
+
+            shared_index_copy = "%s.shared" % self.index_path
+            self.storage_helper.download(self.shared_index_path, shared_index_copy)
+            with open(shared_index_copy) as inp:
+                shared_entries = json.load(inp)
+            os.remove(shared_index_copy)
+
+        except BaseException as e:
+            logging.warning("Unable to read shared result cache index '%s'! Only the local index will be used." %
+                            self.shared_index_path)
+            if str(e) != "":
+                logging.warning("Received the following message:\n%s" % e)
+            return entries
+
+        for key, entry in shared_entries.items():
+            if key in self.removed_keys:
+                continue
+            if key not in entries or entry["last_used"] > entries[key]["last_used"]:
+                entries[key] = entry
+        return OrderedDict(sorted(entries.items(), key=lambda item: item[1]["last_used"]))
+
+    def __save_index(self):
+        # Must be called while holding the index lock
+        # Entries added by other runs since the index was last read are merged before saving
+        self.entries = self.__merge_shared_index(self.entries)
+
+        # Index is replaced at once so that it is never left partially written
+        tmp_index_path = "%s.tmp" % self.index_path
+        with open(tmp_index_path, "w") as out:
+            json.dump(self.entries, out, default=str)
+        os.replace(tmp_index_path, self.index_path)
+
+        # Publish index in the cache directory, failing to do so doesn't fail the task
+        try:
+            self.storage_helper.upload(self.index_path, self.shared_index_path)
+        except BaseException as e:
+            logging.warning("Unable to update shared result cache index '%s'!" % self.shared_index_path)
+            if str(e) != "":
+                logging.warning("Received the following message:\n%s" % e)
+
+    @staticmethod
+    def __get_files(value):
+        # Return all files found in an argument/output value
+        if isinstance(value, GAPFile):
+            return [value]
+        elif isinstance(value, dict):
+            return [gap_file for val in value.values() for gap_file in ResultCache.__get_files(val)]
+        elif isinstance(value, (list, tuple)):
+            return [gap_file for val in value for gap_file in ResultCache.__get_files(val)]
+        return []
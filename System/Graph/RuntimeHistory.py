@@ -0,0 +1,72 @@
+import glob
+import json
+import logging
+import os
+import statistics
+
+
+class RuntimeHistory(object):
+    # Class for estimating task runtimes from the reports of previous pipeline runs
+
+    # Runtime assumed for every task when no history is available
+    DEFAULT_RUNTIME = 1
+
+    def __init__(self, history_path=None):
+
+        # Path to a report file or directory containing report files (*.json) of previous runs
+        self.history_path = history_path
+
+        # Runtimes (sec) of previous runs indexed by the task that was run (split tasks are indexed by their original task)
+        self.runtimes = self.__load_runtimes()
+
+        # Median runtime of each task
+        self.median_runtimes = {task_id: statistics.median(runtimes) for task_id, runtimes in self.runtimes.items()}
+
+        # Runtime estimate for tasks that don't appear in the history
+        if len(self.median_runtimes) > 0:
+            self.default_runtime = statistics.median(self.median_runtimes.values())
+        else:
+            self.default_runtime = self.DEFAULT_RUNTIME
+
+    def estimate_runtime(self, task):
+        # Return estimated runtime of a task
+        return self.estimate_task_runtime(task.get_ID())
+
+    def estimate_task_runtime(self, task_id):
+        # Return estimated runtime of the task with the given id (split tasks are estimated from their original task)
+        return self.median_runtimes.get(task_id.split(".")[0], self.default_runtime)
+
+    def has_history(self):
+        return len(self.runtimes) > 0
+
+    def __load_runtimes(self):
+        runtimes = {}
+        if self.history_path is None:
+            return runtimes
+
+        # Get the report files
+        if os.path.isdir(self.history_path):
+            report_files = sorted(glob.glob(os.path.join(self.history_path, "*.json")))
+        else:
+            report_files = [self.history_path]
+
+        for report_file in report_files:
+            try:
+                with open(report_file) as inp:
+                    report = json.load(inp)
+
+                for task_data in report.get("tasks", []):
+                    run_time = task_data.get("runtime(sec)")
+                    if not run_time:
+                        continue
+                    task_id = task_data.get("parent_task", task_data["name"].split(".")[0])
+                    runtimes.setdefault(task_id, []).append(float(run_time))
+
+            except BaseException as e:
+                # History is only used for estimates, so invalid reports are skipped
+                logging.warning("Unable to read runtime history from report '%s'! It will be ignored." % report_file)
+                if str(e) != "":
+                    logging.warning("Received the following message:\n%s" % e)
+
+        logging.debug("Loaded runtime history for %d tasks from '%s'." % (len(runtimes), self.history_path))
+        return runtimes
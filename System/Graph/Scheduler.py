@@ -1,56 +1,183 @@
 import logging
-import time
+import queue
+import statistics
+from collections import OrderedDict
 
-from System.Graph import TaskWorker
+from System.Graph import TaskWorker, RuntimeHistory, ResultCache, SplitPlanner
+from System import CC_MAIN_DIR
+from System.Platform import MetricsServer
 
 class Scheduler(object):
 
-    def __init__(self, task_graph, datastore, platform):
+    # Maximum number of seconds to wait between two checks of the task graph
+    POLL_INTERVAL = 5
+
+    def __init__(self, task_graph, datastore, platform, journal=None):
 
         # Initialize pipeline definition variables
         self.task_graph     = task_graph
         self.datastore      = datastore
         self.platform       = platform
 
+        # Journal where completed tasks are recorded (None = tasks aren't recorded)
+        self.journal        = journal
+
         # Initialize set of task workers
         self.task_workers = {}
 
+        # Task workers that haven't been finalized yet
+        self.active_workers = OrderedDict()
+
+        # Split tasks running much longer than their completed siblings get a backup copy on another processor
+        # The first copy to finish wins and the other copy is cancelled
+        self.speculation = self.platform.config.get("speculation", False)
+        self.SPECULATION = {
+            "MULTIPLIER"    : float(self.platform.config.get("speculation_multiplier", 2.0)),
+            "MIN_SIBLINGS"  : int(self.platform.config.get("speculation_min_siblings", 3))
+        }
+
+        # Backup copies of tasks, indexed by task (the losing copy once a backup copy wins)
+        self.backup_workers = {}
+
+        # Runtimes of successful split tasks, indexed by the family of splits they belong to
+        self.split_runtimes = {}
+
+        # Determine whether to react to task worker completion or to just poll task workers periodically
+        self.event_driven = self.platform.config.get("scheduler_mode", "event") == "event"
+
+        # Queue where task workers announce that they have completed
+        self.completion_queue = queue.Queue() if self.event_driven else None
+
+        # Maximum number of task workers running at the same time (0 = one per CPU available on the platform)
+        # Ready tasks wait without a task worker until there is room for one
+        self.max_task_workers = int(self.platform.config.get("max_task_workers", 0))
+        if self.max_task_workers < 1:
+            self.max_task_workers = self.platform.get_max_platform_nr_cpus()
+
+        # Prioritize tasks on the longest paths through the graph, with runtimes estimated from previous runs
+        self.runtime_history = RuntimeHistory(self.platform.config.get("runtime_history", None))
+        self.task_graph.set_runtime_estimator(self.runtime_history.estimate_runtime)
+
+        # Cache of task outputs reused across runs (None = outputs are never reused)
+        self.result_cache = None
+        if self.platform.config.get("result_cache", None) is not None:
+            index_path = self.platform.config.get("result_cache_index", None) or f"{CC_MAIN_DIR}/result_cache_index.json"
+            self.result_cache = ResultCache(self.platform.config["result_cache"], index_path,
+                                            max_size=self.platform.config.get("result_cache_max_size", 0),
+                                            max_age=self.platform.config.get("result_cache_max_age", 0))
+
+        # Planner sizing the splits of splitter tasks from the platform quota and measured throughputs
+        # (None = splitters use the number of splits given by their arguments)
+        self.split_planner = None
+        if self.platform.config.get("split_planning", False):
+            history_path = self.platform.config.get("split_planning_history", None) or f"{CC_MAIN_DIR}/split_throughput.json"
+            self.split_planner = SplitPlanner(self.task_graph, self.platform, history_path,
+                                              startup_overhead=self.platform.config.get("split_startup_overhead", 120),
+                                              max_overhead=self.platform.config.get("split_max_overhead", 0.1))
+
+        # Number of ready tasks left waiting without a task worker
+        self.nr_waiting_tasks = 0
+
+        # Local endpoint serving live metrics of the scheduler and the platform (None = metrics aren't served)
+        self.metrics_server = None
+        if self.platform.config.get("metrics_port", 0) > 0:
+            self.metrics_server = MetricsServer(self.platform.config["metrics_port"], [self, self.platform])
+
     def get_task_workers(self):
         return self.task_workers
 
+    def get_backup_workers(self):
+        return self.backup_workers
+
+    def get_metrics(self):
+        # Return metrics describing the tasks and task workers currently managed by the scheduler
+        task_workers = [task_worker for _, task_worker in self.__get_all_task_workers()]
+        statuses = {status: 0 for status in TaskWorker.STATUSES}
+        for task_worker in task_workers:
+            statuses[TaskWorker.STATUSES[task_worker.get_status()]] += 1
+
+        tasks = list(self.task_graph.get_tasks().values())
+        return [
+            MetricsServer.metric("cc_task_workers", "gauge", "Task workers by status.",
+                                 [({"status": status}, count) for status, count in statuses.items()]),
+            MetricsServer.metric("cc_task_workers_blocked", "gauge", "Task workers waiting for the platform to provide a processor.",
+                                 sum(1 for task_worker in task_workers if task_worker.is_waiting_for_processor())),
+            MetricsServer.metric("cc_task_workers_backup", "gauge", "Backup copies of tasks launched by speculation.",
+                                 len(self.backup_workers)),
+            MetricsServer.metric("cc_task_workers_max", "gauge", "Maximum number of task workers running at the same time.",
+                                 self.max_task_workers),
+            MetricsServer.metric("cc_tasks_waiting", "gauge", "Ready tasks waiting for a task worker.",
+                                 self.nr_waiting_tasks),
+            MetricsServer.metric("cc_tasks", "gauge", "Tasks in the task graph by completion.",
+                                 [({"state": "complete"}, sum(1 for task in tasks if task.is_complete())),
+                                  ({"state": "incomplete"}, sum(1 for task in tasks if not task.is_complete()))])
+        ]
+
     def run(self):
+        if self.metrics_server is not None:
+            self.metrics_server.start()
         try:
             self.__run_tasks()
         finally:
             self.__finalize()
+            if self.metrics_server is not None:
+                self.metrics_server.stop()
 
     def __run_tasks(self):
         # Execute tasks until are are completed or until error encountered
         while not self.task_graph.is_complete():
 
-            # Check all tasks to see if they need anything updated
-            unfinished_tasks = self.task_graph.get_unfinished_tasks()
-            for task in unfinished_tasks:
+            # Finalize task workers that have completed
+            for worker_id, task_worker in list(self.active_workers.items()):
+                if task_worker.get_status() == TaskWorker.COMPLETE:
+                    self.active_workers.pop(worker_id)
+                    self.__finalize_task_worker(task_worker)
+
+            # Start running tasks that are ready to run but aren't currently (highest priority first)
+            self.nr_waiting_tasks = 0
+            for task in self.__get_ready_tasks():
 
                 # Task id
                 task_id = task.get_ID()
 
-                # Check if task worker has been created for task
-                task_worker = None if task_id not in self.task_workers else self.task_workers[task_id]
-
-                # Finalize completed tasks
-                if task_worker is not None and task_worker.get_status() == TaskWorker.COMPLETE:
-                    self.__finalize_task_worker(task_worker)
+                # Skip tasks that already have a task worker
+                if task_id in self.task_workers or task.is_deprecated():
                     continue
 
-                # Start running tasks that are ready to run but aren't currently
-                if task_worker is None and self.task_graph.parents_complete(task_id) and not task.is_deprecated():
-                    logging.info("Launching task: '%s'" % task_id)
-                    self.task_workers[task_id] = TaskWorker(task, self.datastore, self.platform)
-                    self.task_workers[task_id].start()
+                # Leave remaining tasks waiting if the maximum number of task workers are running
+                if len(self.active_workers) >= self.max_task_workers:
+                    logging.debug("Maximum number of task workers (%s) reached! Waiting for tasks to complete."
+                                  % self.max_task_workers)
+                    self.nr_waiting_tasks = sum(1 for ready_task in self.__get_ready_tasks()
+                                                if ready_task.get_ID() not in self.task_workers and not ready_task.is_deprecated())
+                    break
+
+                logging.info("Launching task: '%s'" % task_id)
+                self.task_workers[task_id] = TaskWorker(task, self.datastore, self.platform,
+                                                        completion_queue=self.completion_queue,
+                                                        priority=self.task_graph.get_priority(task_id),
+                                                        fused_parent=self.task_graph.get_fused_parent(task_id),
+                                                        fused_child=self.task_graph.get_fused_child(task_id),
+                                                        result_cache=self.result_cache,
+                                                        split_planner=self.split_planner)
+                self.active_workers[task_id] = self.task_workers[task_id]
+                self.task_workers[task_id].start()
+
+            # Launch backup copies of split tasks lagging behind their siblings
+            if self.speculation:
+                self.__launch_backup_workers()
 
-            # Sleeping for 5 seconds before checking again
-            time.sleep(5)
+            # Wait for a task worker to complete before checking again
+            self.__wait_for_completion()
+
+    def __get_ready_tasks(self):
+        # Return ready tasks sorted by decreasing priority
+        # Fused tasks go first as the instance of their parent task is waiting for them
+        ready_tasks = self.task_graph.get_ready_tasks()
+        return sorted(ready_tasks,
+                      key=lambda task: (self.task_graph.get_fused_parent(task.get_ID()) is not None,
+                                        self.task_graph.get_priority(task.get_ID())),
+                      reverse=True)
 
     def __finalize_task_worker(self, task_worker):
 
@@ -61,6 +188,10 @@ class Scheduler(object):
         # Add to list of finalized task workers
         task_worker.set_status(TaskWorker.FINALIZED)
 
+        # Only one copy of a speculated task decides the outcome of the task
+        if task.get_ID() in self.backup_workers and not self.__finalize_task_copy(task_worker):
+            return
+
         # Checks for and raises any runtime errors that occurred while running task
         task_worker.finalize()
 
@@ -71,6 +202,19 @@ class Scheduler(object):
         # Actions on successful task completion
         elif task_worker.is_success():
             logging.info("Task '%s' finished successfully!" % task.get_ID())
+
+            # Output of the task is the output produced by the backup copy if it won
+            if task_worker.is_backup():
+                self.__adopt_backup_worker(task_worker)
+
+            # Record runtime for detecting lagging splits of the same family
+            if task.is_split() and task_worker.get_runtime() > 0:
+                self.split_runtimes.setdefault(self.__get_split_family(task), []).append(task_worker.get_runtime())
+
+            # Measure throughput of the split for planning later splits
+            if task.is_split() and self.split_planner is not None:
+                self.split_planner.record_split(task, task_worker.get_runtime(), task_worker.get_module().get_argument("nr_cpus"))
+
             # Split subgraph if task is a splitter
             if task.is_splitter_task():
                 self.task_graph.split_graph(task.get_ID())
@@ -78,6 +222,10 @@ class Scheduler(object):
             # Set task to complete if task worker completed successfully
             task.set_complete(True)
 
+            # Record task so that it doesn't need to be run again if the pipeline is resumed
+            if self.journal is not None:
+                self.journal.record_task(task)
+
     def __finalize(self):
 
         # Prevent any new processors from being created on platform
@@ -91,7 +239,7 @@ class Scheduler(object):
         while not done:
             # Wait for all task workers to finish up cancelling
             done = True
-            for task_id, task_worker in self.task_workers.items():
+            for task_id, task_worker in self.__get_all_task_workers():
                 if not task_worker.get_status() is TaskWorker.FINALIZED:
                     # Indicate that not all tasks have been finalized
                     done = False
@@ -108,14 +256,124 @@ class Scheduler(object):
                             if str(e) != "":
                                 logging.error("Received the following message:\n%s" % e)
 
-            # Wait for a bit before checking again
-            time.sleep(5)
+            # Wait for a task worker to complete before checking again
+            if not done:
+                self.__wait_for_completion()
+
+    def __wait_for_completion(self):
+        # Block until a task worker completes or until the polling interval passes
+
+        # Polling mode just sleeps for the entire interval
+        if not self.event_driven:
+            self.platform.clock.sleep(self.POLL_INTERVAL)
+            return
+
+        # Wake up as soon as any task worker completes. The timeout keeps polling as a fallback.
+        try:
+            self.platform.clock.get(self.completion_queue, timeout=self.POLL_INTERVAL)
+        except queue.Empty:
+            return
+
+        # Drain any other completions so that they are all handled in the next pass
+        while True:
+            try:
+                self.completion_queue.get_nowait()
+            except queue.Empty:
+                break
 
     def __cancel_unfinished_tasks(self):
         # Cancel any still-running jobs
         # Start destroying processors for still-running jobs
-        for task_id, task_worker in self.task_workers.items():
+        for task_id, task_worker in self.__get_all_task_workers():
             if not task_worker.get_status() in [TaskWorker.COMPLETE, TaskWorker.FINALIZING, TaskWorker.FINALIZED]:
                 # Cancel pipeline if it isn't finalizing or already cancelled
                 logging.debug("Initiated cancellation of '%s'" % task_id)
                 task_worker.cancel()
+
+    def __launch_backup_workers(self):
+        # Launch a backup copy of every split task running much longer than the median of its completed siblings
+        median_runtimes = {}
+        for worker_id, task_worker in list(self.active_workers.items()):
+
+            # Only running split tasks that haven't been copied yet are considered
+            task = task_worker.get_task()
+            task_id = task.get_ID()
+            if not task.is_split() or task_id in self.backup_workers or task_worker.get_status() != TaskWorker.RUNNING:
+                continue
+
+            # Files of fused tasks are left on their processor, so fused tasks cannot be copied
+            if self.task_graph.get_fused_parent(task_id) is not None or self.task_graph.get_fused_child(task_id) is not None:
+                continue
+
+            # Compare task runtime with the median runtime of its completed siblings
+            family = self.__get_split_family(task)
+            if family not in median_runtimes:
+                runtimes = self.split_runtimes.get(family, [])
+                median_runtimes[family] = statistics.median(runtimes) if len(runtimes) >= self.SPECULATION["MIN_SIBLINGS"] else None
+            if median_runtimes[family] is None or task_worker.get_runtime() <= self.SPECULATION["MULTIPLIER"] * median_runtimes[family]:
+                continue
+
+            # Backup copies count towards the maximum number of task workers
+            if len(self.active_workers) >= self.max_task_workers:
+                logging.debug("Maximum number of task workers (%s) reached! Backup copies will wait." % self.max_task_workers)
+                break
+
+            # Copies are linked before the backup starts, unless the task started finalizing in the meantime
+            backup_worker = TaskWorker(task, self.datastore, self.platform,
+                                       completion_queue=self.completion_queue,
+                                       priority=self.task_graph.get_priority(task_id),
+                                       split_planner=self.split_planner,
+                                       backup=True)
+            if not task_worker.add_backup_copy(backup_worker):
+                continue
+
+            logging.info("Task '%s' has been running for %s seconds (median of its siblings: %s seconds). "
+                         "Launching backup copy!" % (task_id, round(task_worker.get_runtime()), round(median_runtimes[family])))
+            self.backup_workers[task_id] = backup_worker
+            self.active_workers["%s (backup)" % task_id] = backup_worker
+            backup_worker.start()
+
+    def __finalize_task_copy(self, task_worker):
+        # Finalize one of the two copies of a speculated task
+        # Return True if the copy decides the outcome of the task, False if the outcome is left to the other copy
+        task_id = task_worker.get_task().get_ID()
+        other_worker = self.backup_workers[task_id] if task_worker is self.task_workers[task_id] else self.task_workers[task_id]
+
+        # Copy is the last one left, so it decides the outcome of the task unless the other copy already won
+        if other_worker.get_status() == TaskWorker.FINALIZED:
+            if not task_worker.get_task().is_complete():
+                return True
+            logging.debug("Task '%s' already completed by its other copy." % task_id)
+
+        # Copy finalized the task first and wins (the other copy was cancelled when the copy started finalizing)
+        elif task_worker.is_success() and not task_worker.is_cancelled():
+            logging.info("Copy of task '%s' completed the task!" % task_id)
+            return True
+
+        # Copy failed, but the other copy can still complete the task
+        elif not task_worker.is_cancelled():
+            logging.warning("Copy of task '%s' failed! Waiting for the other copy to finish..." % task_id)
+
+        try:
+            task_worker.finalize()
+        except BaseException as e:
+            if str(e) != "":
+                logging.debug("Copy of task '%s' received the following message:\n%s" % (task_id, e))
+        return False
+
+    def __adopt_backup_worker(self, backup_worker):
+        # Make the winning backup copy the task worker of its task, keeping the other copy as the backup worker
+        task = backup_worker.get_task()
+        task_id = task.get_ID()
+        task.module = backup_worker.get_module()
+        self.backup_workers[task_id] = self.task_workers[task_id]
+        self.task_workers[task_id] = backup_worker
+
+    def __get_all_task_workers(self):
+        # Return all task workers, including backup copies of tasks
+        return list(self.task_workers.items()) + list(self.backup_workers.items())
+
+    @staticmethod
+    def __get_split_family(task):
+        # Splits of the same task created by the same splitter only differ by their split id
+        return task.get_splitter(), task.get_ID().rsplit(".", 1)[0]
@@ -0,0 +1,143 @@
+import json
+import logging
+import math
+import os
+import statistics
+import threading
+
+
+class SplitPlanner(object):
+    # Class choosing the number of splits created by splitter tasks
+    # Splits are sized so that starting their instances only takes a small fraction of their runtime,
+    # while all splits still fit in the CPU quota left on the platform
+    # Throughput of the tasks running on splits is measured as they complete and kept in a local file for later runs
+
+    # Maximum number of throughput measurements kept for each task
+    MAX_SAMPLES = 20
+
+    def __init__(self, task_graph, platform, history_path, startup_overhead=120, max_overhead=0.1):
+
+        self.task_graph = task_graph
+        self.platform   = platform
+
+        # Local file storing the measured throughputs
+        self.history_path = history_path
+
+        # Seconds needed to get the instance of a split running and maximum fraction of split runtime it can take
+        self.startup_overhead   = startup_overhead
+        self.max_overhead       = max_overhead
+
+        # Throughputs (work per CPU per second) measured for splits of each splitter, indexed by module of the split task
+        self.history_lock   = threading.Lock()
+        self.throughputs    = self.__load_throughputs()
+
+        # Work given to each split by the splitter tasks planned during the current run, indexed by splitter task
+        self.plans = {}
+
+    def plan(self, splitter_id, work, default, nr_cpus=None, throughput=None, max_splits=None):
+        # Return number of splits dividing the work of a splitter task
+        # work: total amount of work to split, in units chosen by the splitter (e.g. bases to align)
+        # default: number of splits used when the runtime of the splits cannot be estimated
+        # nr_cpus: CPUs of each split (None = CPUs requested by the tasks downstream of the splitter)
+        # throughput: expected work done per CPU per second, used until the throughput has been measured
+        # max_splits: maximum number of splits the work can be divided into
+        key = self.__get_key(splitter_id)
+        nr_cpus = self.__get_split_nr_cpus(splitter_id) if nr_cpus is None else nr_cpus
+
+        # Splits are limited by the slowest task running on them
+        measured = self.__get_measured_throughput(key)
+        throughput = measured if measured is not None else throughput
+
+        # Split the work into splits running long enough for the startup overhead to stay small
+        if throughput is not None and throughput > 0 and work > 0:
+            min_split_runtime = self.startup_overhead * (1 - self.max_overhead) / self.max_overhead
+            nr_splits = int(math.ceil(work / (throughput * nr_cpus * max(min_split_runtime, 1))))
+        else:
+            nr_splits = int(default)
+
+        # All splits should be able to run at the same time
+        max_parallel_splits = max(self.platform.get_available_nr_cpus() // nr_cpus, 1)
+        nr_splits = min(nr_splits, max_parallel_splits)
+        if max_splits is not None:
+            nr_splits = min(nr_splits, max_splits)
+        nr_splits = max(nr_splits, 1)
+
+        logging.info("(%s) Planned %d splits (CPUs per split: %s, throughput: %s%s, available CPUs: %s)." %
+                     (splitter_id, nr_splits, nr_cpus, throughput, " measured" if measured is not None else "",
+                      self.platform.get_available_nr_cpus()))
+
+        self.plans[splitter_id] = {"key": key, "work_per_split": float(work) / nr_splits}
+        return nr_splits
+
+    def record_split(self, task, runtime, nr_cpus):
+        # Record throughput of a completed task running on a planned split
+        plan = self.plans.get(task.get_splitter(), None)
+        if plan is None or runtime <= 0 or not nr_cpus:
+            return
+
+        throughput = plan["work_per_split"] / (runtime * nr_cpus)
+        with self.history_lock:
+            samples = self.throughputs.setdefault(plan["key"], {}).setdefault(task.get_module().__class__.__name__, [])
+            samples.append(throughput)
+            del samples[:-self.MAX_SAMPLES]
+
+            try:
+                self.__save_throughputs()
+            except BaseException as e:
+                # Measurements are only used for planning, so failing to save them doesn't fail the task
+                logging.warning("Unable to save split throughputs to '%s'!" % self.history_path)
+                if str(e) != "":
+                    logging.warning("Received the following message:\n%s" % e)
+
+    def __get_key(self, splitter_id):
+        # Splitters are identified by their task (without split ids) and their module
+        splitter = self.task_graph.get_tasks(splitter_id)
+        return "%s:%s" % (splitter_id.split(".")[0], splitter.get_module().__class__.__name__)
+
+    def __get_measured_throughput(self, key):
+        # Return throughput of the slowest task measured on the splits of a splitter (None if never measured)
+        with self.history_lock:
+            samples = self.throughputs.get(key, {})
+            throughputs = [statistics.median(task_samples) for task_samples in samples.values() if len(task_samples) > 0]
+        return min(throughputs) if len(throughputs) > 0 else None
+
+    def __get_split_nr_cpus(self, splitter_id):
+        # Return maximum number of CPUs requested by the tasks downstream of a splitter
+        nr_cpus = 1
+        for child_id in self.task_graph.get_children(splitter_id):
+            child = self.task_graph.get_tasks(child_id)
+            child_nr_cpus = (child.get_graph_config_args() or {}).get("nr_cpus", None)
+            if child_nr_cpus is None and "nr_cpus" in child.get_input_args():
+                child_nr_cpus = child.get_input_args()["nr_cpus"].get_default_value()
+            try:
+                nr_cpus = max(nr_cpus, int(child_nr_cpus))
+            except (TypeError, ValueError):
+                continue
+        return nr_cpus
+
+    def __load_throughputs(self):
+        if self.history_path is None or not os.path.exists(self.history_path):
+            return {}
+
+        try:
+            with open(self.history_path) as inp:
+                throughputs = json.load(inp)
+        except BaseException as e:
+            logging.warning("Unable to read split throughputs from '%s'! Splits will be planned without them." % self.history_path)
+            if str(e) != "":
+                logging.warning("Received the following message:\n%s" % e)
+            return {}
+
+        logging.debug("Loaded split throughputs for %d splitters from '%s'." % (len(throughputs), self.history_path))
+        return throughputs
+
+    def __save_throughputs(self):
+        # Must be called while holding the history lock
+        if self.history_path is None:
+            return
+
+        # File is replaced at once so that it is never left partially written
+        tmp_history_path = "%s.tmp" % self.history_path
+        with open(tmp_history_path, "w") as out:
+            json.dump(self.throughputs, out)
+        os.replace(tmp_history_path, self.history_path)
@@ -1,8 +1,6 @@
-import logging
-import importlib
 import copy
 from inspect import signature
-from Modules import Module, Splitter, Merger, PseudoMerger
+from Modules import Splitter, Merger, PseudoMerger, ModuleRegistry
 
 
 class Task(object):
@@ -26,6 +24,12 @@ class Task(object):
         # Get the config inputs
         self.__module_args          = kwargs.pop("args", [])
 
+        # Whether task can run on the same instance as its parent/child task
+        self.__fuse                 = kwargs.pop("fuse", False)
+
+        # Whether task output can be reused by identical tasks of later runs
+        self.__cache                = kwargs.pop("cache", False)
+
         # Initialize modules
         self.module                 = self.__load_module(self.__module_name,
                                                          is_docker=self.__docker_image is not None,
@@ -52,15 +56,19 @@ class Task(object):
         # Flag for whether task has been split/replaced and shouldn't be executed
         self.__deprecated = False
 
-    def split(self, splitter_id, split_id, visible_samples):
+        # Function notified whenever the task changes its completion status
+        self.__complete_listener = None
+
+    def split(self, splitter_id, split_id, visible_samples, deep_copy=False):
         # Produce clone of current task but restrict visible output and sample info available to task
         # Visible output/sample partition defined by upstream splitting task
         # Splitter is the name of the head task that created the split of current task
         # Split_id is the name of the partition the newly created task will be able to access
         # visible_samples is list of samples visible to new split
+        # deep_copy copies the entire task instead of only its per-split state (much slower for large splits)
 
         # Create copy of current task and give new id
-        split_task = copy.deepcopy(self)
+        split_task = copy.deepcopy(self) if deep_copy else self.__clone()
         new_id = "%s.%s" % (self.__task_id, split_id)
         split_task.__task_id = new_id
 
@@ -121,9 +129,23 @@ class Task(object):
     def get_docker_image_id(self):
         return self.__docker_image
 
+    def is_fusable(self):
+        return self.__fuse
+
+    def is_cacheable(self):
+        return self.__cache
+
     def set_complete(self, is_complete):
+        was_complete = self.complete
         self.complete = is_complete
 
+        # Let the listener (e.g. the task graph) know that the completion status changed
+        if self.__complete_listener is not None and was_complete != is_complete:
+            self.__complete_listener(self.__task_id, is_complete)
+
+    def set_complete_listener(self, listener):
+        self.__complete_listener = listener
+
     def is_complete(self):
         return self.complete
 
@@ -148,47 +170,31 @@ class Task(object):
     def get_clones(self):
         return self.__clones
 
-    def __load_module(self, module_name, is_docker, submodule=None):
+    def __clone(self):
+        # Return a lightweight copy of the task
+        # Task definition (module name, final output keys, graph config args) is shared with the original task
+        task_clone = copy.copy(self)
 
-        # Try importing the module
-        try:
-            _module = importlib.import_module(module_name)
-        except:
-            logging.error("Module %s could not be imported! "
-                          "Check the module name spelling and ensure the module exists." % module_name)
-            raise
+        # Copy the module so that the clone gets its own argument values and output
+        task_clone.module = self.module.clone()
 
-        # Check to see if submodule actually exists
-        submodule = module_name if submodule is None else submodule
-        if submodule not in _module.__dict__:
-            logging.error("Module '%s' was successfully imported, but does not contain submodule '%s'! "
-                          "Check the submodule spelling and ensure the submodule exists in the module." % (module_name, submodule))
-
-            # Get list of available submodules
-            available_modules = []
-            for mod_name, mod in _module.__dict__.items():
-                # Exclude any builtin types (start with _ or __),
-                # Exclude imported modules that aren't classes (e.g. 'os' or 'logging')
-                # Exclude anything that isn't a class (__class__.__name__ is None, e.g. __doc__, __package__)
-                if mod_name.startswith("_") or mod.__class__.__name__ in [None, "module"]:
-                    continue
-
-                # Include anything that inherits from Module (with the exclusion of base classes (Module, Splitter, Merger)
-                if issubclass(mod, Module) and mod_name not in ["Module", "Splitter", "Merger"]:
-                    available_modules.append(mod_name)
-
-            # Show available submodules in error message
-            if len(available_modules) > 1:
-                available_modules = ",".join(available_modules)
-            elif len(available_modules) == 1:
-                available_modules = available_modules[0]
-            else:
-                available_modules = "None"
-            logging.error("Available submodules in module '%s':\n\t%s" % (module_name, available_modules))
-            raise IOError("Invalid submodule '%s' specified for module '%s' in graph config!" % (submodule,module_name))
+        # Never share the clones or the listener of the original task
+        task_clone.__clones = []
+        task_clone.__complete_listener = None
+
+        return task_clone
+
+    def __getstate__(self):
+        # Never copy the listener along with the task, as that would copy whatever object is listening
+        state = self.__dict__.copy()
+        state["_Task__complete_listener"] = None
+        return state
+
+    def __load_module(self, module_name, is_docker, submodule=None):
 
-        # Get the class
-        _class = _module.__dict__[submodule]
+        # Get the class from the registry, which only imports the module file on first use
+        _class = ModuleRegistry.get_registry().get_class(module_name, submodule)
+        submodule = module_name if submodule is None else submodule
 
         # Generate the module ID
         module_id = "%s_%s" % (self.__task_id, module_name)
@@ -216,6 +222,12 @@ class Task(object):
         if self.__docker_image is not None:
             to_ret += "\tdocker_image\t= %s\n" % self.__docker_image
 
+        if self.__fuse:
+            to_ret += "\tfuse\t= %s\n" % self.__fuse
+
+        if self.__cache:
+            to_ret += "\tcache\t= %s\n" % self.__cache
+
         if isinstance(input_from, list) and len(input_from) == 1:
             to_ret += "\tinput_from\t= %s\n" % input_from[0]
 
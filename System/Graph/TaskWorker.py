@@ -1,5 +1,4 @@
 import threading
-import time
 import math
 import logging
 
@@ -19,7 +18,8 @@ class TaskWorker(Thread):
 
     STATUSES        = ["IDLE", "LOADING", "RUNNING", "FINALIZING", "COMPLETE", "CANCELLING", "FINALIZED"]
 
-    def __init__(self, task, datastore, platform):
+    def __init__(self, task, datastore, platform, completion_queue=None, priority=0,
+                 fused_parent=None, fused_child=None, result_cache=None, split_planner=None, backup=False):
         # Class for executing task
 
         # Initialize new thread
@@ -28,7 +28,10 @@ class TaskWorker(Thread):
 
         # Task to be executed
         self.task = task
-        self.module = self.task.get_module()
+
+        # Backup copies of a task run their own copy of the task module, as the original task may still be running
+        self.backup = backup
+        self.module = self.task.get_module().clone() if self.backup else self.task.get_module()
 
         # Datastore for getting/setting task output
         self.datastore = datastore
@@ -40,9 +43,37 @@ class TaskWorker(Thread):
         self.status_lock = threading.Lock()
         self.status = TaskWorker.IDLE
 
+        # Queue where the task worker announces itself once it has completed (None = nobody listening)
+        self.completion_queue = completion_queue
+
+        # Priority of the task when waiting for platform resources
+        self.priority = priority
+
+        # Tasks running on the same processor right before/after the task (None = task has its own processor)
+        self.fused_parent   = fused_parent
+        self.fused_child    = fused_child
+
+        # Cache of task outputs reused across runs (None = outputs are never reused)
+        self.result_cache   = result_cache
+
+        # Planner choosing the number of splits of splitter tasks (None = splits are given by the module arguments)
+        self.split_planner  = split_planner
+
+        # Other copy of a speculated task (None = task isn't speculated)
+        # Both copies share the same lock, so that only the first copy to finish running finalizes the task
+        self.other_copy = None
+        self.copy_lock  = threading.Lock()
+
         # Processor for executing task
         self.proc       = None
 
+        # Whether task worker is blocked waiting for the platform to provide a processor
+        self.waiting_for_processor = False
+
+        # Time window during which the task used the processor (processors can be reused by other tasks)
+        self.lease_start    = None
+        self.lease_end      = None
+
         # Garbage collector for destroying instance on cancellation
         self.garbage_collector = None
 
@@ -66,6 +97,10 @@ class TaskWorker(Thread):
                                                                              self.STATUSES[self.status]))
             self.status = new_status
 
+        # Notify listeners that the task worker has finished running
+        if new_status == TaskWorker.COMPLETE and self.completion_queue is not None:
+            self.completion_queue.put(self)
+
     def get_status(self):
         # Returns instance status with threading.lock() to prevent race conditions
         with self.status_lock:
@@ -74,30 +109,42 @@ class TaskWorker(Thread):
     def get_task(self):
         return self.task
 
+    def get_module(self):
+        return self.module
+
+    def is_backup(self):
+        return self.backup
+
+    def is_waiting_for_processor(self):
+        return self.waiting_for_processor
+
     def get_runtime(self):
         if self.proc is None:
             return 0
         else:
-            return self.proc.get_runtime()
+            return self.get_stop_time() - self.get_start_time()
 
     def get_cost(self):
         if self.proc is None:
             return 0
         else:
-            return self.proc.compute_cost()
+            return self.proc.compute_cost(start_time=self.get_start_time(), end_time=self.get_stop_time())
 
     def get_start_time(self):
         if self.proc is None:
             return None
         else:
-            return self.proc.get_start_time()
+            # Processor may have been created before the task started using it
+            return max(self.proc.get_start_time(), self.lease_start)
 
     def get_stop_time(self):
         if self.proc is None:
             return None
-        else:
+        elif self.lease_end is None:
             return self.proc.get_stop_time()
-
+        else:
+            # Processor may be used by other tasks after the task stopped using it
+            return min(self.proc.get_stop_time(), self.lease_end)
 
     def get_cmd(self):
         return self.cmd
@@ -106,7 +153,11 @@ class TaskWorker(Thread):
         # Run task module command and save outputs
         try:
             # Set the input arguments that will be passed to the task module
-            self.datastore.set_task_input_args(self.task.get_ID())
+            self.datastore.set_task_input_args(self.task.get_ID(), module=self.module)
+
+            # Let splitters size their splits based on the platform
+            if self.task.is_splitter_task():
+                self.module.set_split_planner(self.split_planner)
 
             # Compute task resource requirements
             cpus    = self.module.get_argument("nr_cpus")
@@ -114,7 +165,7 @@ class TaskWorker(Thread):
 
             # Compute disk space requirements
             docker_image    = None
-            input_files     = self.datastore.get_task_input_files(self.task.get_ID())
+            input_files     = self.datastore.get_task_input_files(self.task.get_ID(), module=self.module)
             if self.task.get_docker_image_id() is not None:
                 docker_image    = self.datastore.get_docker_image(docker_id=self.task.get_docker_image_id())
             disk_space      = self.__compute_disk_requirements(input_files, docker_image)
@@ -124,7 +175,7 @@ class TaskWorker(Thread):
             self.__check_cancelled()
 
             # Define unique workspace for task input/output
-            task_workspace = self.datastore.get_task_workspace(task_id=self.task.get_ID())
+            task_workspace = self.datastore.get_task_workspace(task_id=self.task.get_ID(), backup=self.backup)
             logging.debug("(%s) Task workspace:\n%s" % (self.task.get_ID(), task_workspace.debug_string()))
 
             # Specify that module output files should be placed in task's working directory
@@ -136,14 +187,53 @@ class TaskWorker(Thread):
             # Check if there is any command that needs to be run
             has_command = self.module.get_command() is not None
 
+            # Reuse output of an identical task from a previous run instead of running the task
+            cache_key = self.__get_cache_key(has_command, input_files, docker_image, task_workspace)
+            if cache_key is not None and self.__load_cached_output(cache_key, task_workspace):
+                with self.status_lock:
+                    self.__err = False
+                return
+
             # Create the specific processor for the task
-            if has_command:
-                # Get processor capable of running job
-                self.proc = self.platform.get_instance(cpus, mem, disk_space, task_id=self.task.get_ID())
+            self.lease_start = self.platform.clock.now()
+
+            # Reuse processor handed off by the fused parent task, which holds the input files left behind by it
+            # Tasks without command claim it as well, so that their outputs are saved from it and it is released after
+            if self.fused_parent is not None:
+                self.proc = self.platform.claim_instance(self.task.get_ID())
+
+            if self.proc is not None:
+                logging.debug("(%s) Running on processor of fused task '%s'!" % (self.task.get_ID(), self.fused_parent))
+                self.__fit_to_processor(cpus, mem)
+
+            elif any(input_file.is_flagged("fused") for input_file in input_files):
+                logging.error("(%s) Input files left on the processor of fused task '%s' are not available!" %
+                              (self.task.get_ID(), self.fused_parent))
+                raise RuntimeError("(%s) Processor of fused parent task was not handed off!" % self.task.get_ID())
+
+            elif has_command:
+                # Get processor capable of running job, preferably one already holding the input files
+                self.waiting_for_processor = True
+                try:
+                    self.proc = self.platform.get_instance(cpus, mem, disk_space, task_id=self.task.get_ID(),
+                                                          priority=self.priority,
+                                                          avoid_processor=self.__get_other_processor(),
+                                                          input_files=self.__get_remote_input_sizes(input_files))
+                finally:
+                    self.waiting_for_processor = False
                 logging.debug("(%s) Successfully acquired processor!" % self.task.get_ID())
+            elif self.__can_run_without_processor(task_workspace):
+                # Outputs only need to be resolved, which is done from the current process
+                logging.debug("(%s) Task has no command and will be completed without a processor!" % self.task.get_ID())
             else:
                 # Get small processor
-                self.proc = self.platform.get_instance(1, 1, disk_space, task_id=self.task.get_ID())
+                self.waiting_for_processor = True
+                try:
+                    self.proc = self.platform.get_instance(1, 1, disk_space, task_id=self.task.get_ID(),
+                                                          priority=self.priority,
+                                                          avoid_processor=self.__get_other_processor())
+                finally:
+                    self.waiting_for_processor = False
                 logging.debug("(%s) Successfully acquired processor!" % self.task.get_ID())
 
             # Check to see if pipeline has been cancelled
@@ -153,7 +243,10 @@ class TaskWorker(Thread):
             self.module_executor = ModuleExecutor(task_id=self.task.get_ID(),
                                                   processor=self.proc,
                                                   workspace=task_workspace,
-                                                  docker_image=docker_image)
+                                                  docker_image=docker_image,
+                                                  transfer_window=self.platform.config.get("transfer_window", 5),
+                                                  bootstrap=self.platform.config.get("bootstrap_script", False),
+                                                  clock=self.platform.clock)
 
             # Check to see if pipeline has been cancelled
             self.__check_cancelled()
@@ -190,8 +283,9 @@ class TaskWorker(Thread):
                         # Create a unique job_name
                         job_name = "{0}_{1}".format(self.task.get_ID(), cmd_id)
 
-                        # Run the actual command
-                        out, err = self.module_executor.run(cmd, job_name=job_name)
+                        # Run the actual command (only the output of the last command is processed)
+                        full_output = self.module.processes_cmd_output() and cmd_id == len(self.cmd) - 1
+                        out, err = self.module_executor.run(cmd, job_name=job_name, full_output=full_output)
 
                         # Check to see if pipeline has been cancelled
                         self.__check_cancelled()
@@ -205,7 +299,7 @@ class TaskWorker(Thread):
                 else:
 
                     # Run the actual command
-                    out, err = self.module_executor.run(self.cmd)
+                    out, err = self.module_executor.run(self.cmd, full_output=self.module.processes_cmd_output())
 
                     # Check to see if pipeline has been cancelled
                     self.__check_cancelled()
@@ -217,13 +311,17 @@ class TaskWorker(Thread):
                         self.proc.add_checkpoint(False) # mark a checkpoint after the command has been run
 
             # Set the status to finalized
-            self.set_status(self.FINALIZING)
+            self.__start_finalizing()
 
             # Save output files in workspace output dirs (if any)
-            output_files = self.datastore.get_task_output_files(self.task.get_ID())
+            output_files = self.datastore.get_task_output_files(self.task.get_ID(), module=self.module)
             final_output_types = self.task.get_final_output_keys()
             if len(output_files) > 0:
-                self.module_executor.save_output(output_files, final_output_types)
+                self.module_executor.save_output(output_files, final_output_types, keep_local=self.__hands_off_processor())
+
+            # Add output to the result cache for later runs
+            if cache_key is not None:
+                self.__store_cached_output(cache_key)
 
             # Indicate that task finished without any errors
             if not self.__cancelled:
@@ -251,13 +349,15 @@ class TaskWorker(Thread):
         # Cancel pipeline during runtime
 
         # Don't do anything if task has already finished or is finishing
-        if self.get_status() in [self.COMPLETE, self.CANCELLING, self.FINALIZED]:
-            return
+        # Finalizing tasks are left to finish, as their processor may already have been handed to other tasks
+        with self.status_lock:
+            if self.status in [self.FINALIZING, self.COMPLETE, self.CANCELLING, self.FINALIZED]:
+                return
+            self.status = self.CANCELLING
+            self.__cancelled = True
 
-        # Set pipeline to cancelling and stop any currently running jobs
+        # Stop any currently running jobs
         logging.error("Task '%s' cancelled!" % self.task.get_ID())
-        self.set_status(self.CANCELLING)
-        self.__cancelled = True
 
         if self.proc is not None:
             # Prevent further commands from being run on processor
@@ -266,6 +366,16 @@ class TaskWorker(Thread):
             self.garbage_collector = GarbageCollector(proc=self.proc)
             self.garbage_collector.start()
 
+    def add_backup_copy(self, backup_worker):
+        # Link a backup copy to the task worker before it starts. Return False if task worker is already finalizing.
+        with self.copy_lock:
+            if self.get_status() not in [self.IDLE, self.LOADING, self.RUNNING]:
+                return False
+            self.other_copy = backup_worker
+            backup_worker.other_copy = self
+            backup_worker.copy_lock = self.copy_lock
+            return True
+
     def is_success(self):
         return not self.__err
 
@@ -292,14 +402,114 @@ class TaskWorker(Thread):
         # Try to destroy platform if it's not off
         try:
 
-            # Destroy processor
-            self.proc.destroy()
+            # Return processor to the platform for reuse if task succeeded, otherwise destroy processor
+            # Time spent recycling a returned processor is charged to the platform rather than to the task
+            if self.__err or self.__cancelled:
+                self.proc.destroy()
+            elif self.__hands_off_processor():
+                self.lease_end = self.platform.clock.now()
+                self.platform.hand_off_instance(self.fused_child, self.proc)
+            else:
+                self.lease_end = self.platform.clock.now()
+                self.platform.release_instance(self.proc)
 
         except BaseException as e:
             logging.error("Unable to destroy processor '%s' for task '%s'" % (self.proc.get_name(), self.task.get_ID()))
             if str(e) != "":
                 logging.error("Received following error:\n%s" % e)
 
+        finally:
+            if self.lease_end is None:
+                self.lease_end = self.platform.clock.now()
+
+    def __get_cache_key(self, has_command, input_files, docker_image, task_workspace):
+        # Return key of task in the result cache (None if task output cannot be reused)
+        if self.result_cache is None or not self.task.is_cacheable() or not has_command:
+            return None
+
+        # Outputs of fused tasks stay on their processor
+        if self.fused_parent is not None or self.fused_child is not None:
+            return None
+
+        # Cached outputs are copied to the output directories from the current process
+        for output_dir in [task_workspace.get_output_dir(), task_workspace.get_tmp_output_dir()]:
+            if ":" not in output_dir:
+                return None
+
+        try:
+            return self.result_cache.get_key(self.task, input_files, docker_image)
+        except BaseException as e:
+            logging.warning("(%s) Unable to compute result cache key! Task will be run." % self.task.get_ID())
+            if str(e) != "":
+                logging.warning("Received the following message:\n%s" % e)
+            return None
+
+    def __load_cached_output(self, cache_key, task_workspace):
+        # Set task output to the output cached by a previous run. Return False if output isn't cached.
+        output = self.result_cache.lookup(cache_key)
+        if output is None:
+            logging.debug("(%s) Task output not found in the result cache." % self.task.get_ID())
+            return False
+
+        logging.info("(%s) Reusing task output from the result cache!" % self.task.get_ID())
+        self.module.output = output
+
+        # Copy final output files to the final output directory, temporary files are used from the cache directly
+        self.__start_finalizing()
+        self.module_executor = ModuleExecutor(task_id=self.task.get_ID(),
+                                              processor=None,
+                                              workspace=task_workspace)
+        output_files = self.datastore.get_task_output_files(self.task.get_ID(), module=self.module)
+        if len(output_files) > 0:
+            self.module_executor.save_output(output_files, self.task.get_final_output_keys())
+        return True
+
+    def __store_cached_output(self, cache_key):
+        # Failing to cache the output doesn't fail the task
+        try:
+            self.result_cache.store(cache_key, self.task)
+        except BaseException as e:
+            logging.warning("(%s) Unable to add task output to the result cache!" % self.task.get_ID())
+            if str(e) != "":
+                logging.warning("Received the following message:\n%s" % e)
+
+    @staticmethod
+    def __get_remote_input_sizes(input_files):
+        # Return sizes of the remote input files indexed by the path that will be transferred
+        return {input_file.get_transferrable_path(): input_file.get_size() or 0
+                for input_file in input_files if input_file.is_remote()}
+
+    def __hands_off_processor(self):
+        # Determine whether processor is kept for the fused child task
+        # Files left on preemptible processors could be lost when the processor is reset, so they are never kept
+        return self.fused_child is not None and self.proc is not None and not getattr(self.proc, "is_preemptible", False)
+
+    def __fit_to_processor(self, cpus, mem):
+        # Make sure task doesn't use more resources than available on the processor of the fused parent task
+        if cpus > self.proc.nr_cpus:
+            logging.warning("(%s) Task requires %s CPUs, but only %s are available on processor of fused task! "
+                            "Task will use %s CPUs." % (self.task.get_ID(), cpus, self.proc.nr_cpus, self.proc.nr_cpus))
+            self.module.set_argument("nr_cpus", self.proc.nr_cpus)
+
+        if mem > self.proc.mem:
+            logging.warning("(%s) Task requires %s GB of memory, but only %s GB are available on processor of fused task! "
+                            "Task will use %s GB." % (self.task.get_ID(), mem, self.proc.mem, self.proc.mem))
+            self.module.set_argument("mem", self.proc.mem)
+
+    def __can_run_without_processor(self, task_workspace):
+        # Determine whether outputs of a task without command can be saved without a processor
+        # This requires all output files and output directories to be in remote storage
+        for output_dir in [task_workspace.get_output_dir(), task_workspace.get_tmp_output_dir()]:
+            if ":" not in output_dir:
+                return False
+
+        for output_file in self.datastore.get_task_output_files(self.task.get_ID(), module=self.module):
+            # Prefix files can only be transferred by a processor
+            if not output_file.is_remote() or output_file.is_prefix():
+                return False
+
+        return True
+
     def __compute_disk_requirements(self, input_files, docker_image, input_multiplier=None):
         # Compute size of disk needed to store input/output files
         input_size = 0
@@ -343,6 +553,24 @@ class TaskWorker(Thread):
             disk_size = max_disk_size
         return disk_size
 
+    def __start_finalizing(self):
+        # Task can't be cancelled once it starts finalizing, so cancellations landing before then fail the task
+        # The other copy of a speculated task is cancelled at the same time, so that only one copy saves the outputs
+        with self.copy_lock:
+            with self.status_lock:
+                if self.__cancelled:
+                    raise RuntimeError("(%s) Task failed due to cancellation!" % self.task.get_ID())
+                self.status = self.FINALIZING
+            logging.debug("(%s) TaskWorker change of status to FINALIZING!" % self.task.get_ID())
+
+            if self.other_copy is not None:
+                logging.info("Copy of task '%s' finished running first! Cancelling the other copy..." % self.task.get_ID())
+                self.other_copy.cancel()
+
+    def __get_other_processor(self):
+        # Return processor of the other copy of a speculated task (None if there is none)
+        return self.other_copy.proc if self.other_copy is not None else None
+
     def __check_cancelled(self):
         if self.__cancelled:
             raise RuntimeError("(%s) Task failed due to cancellation!")
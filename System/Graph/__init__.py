@@ -2,5 +2,9 @@ from .Task import Task
 from .Graph import Graph
 from .ModuleExecutor import ModuleExecutor
 from .TaskWorker import TaskWorker
+from .RuntimeHistory import RuntimeHistory
+from .ResultCache import ResultCache
+from .SplitPlanner import SplitPlanner
+from .PlanCache import PlanCache
 from .Scheduler import Scheduler
 
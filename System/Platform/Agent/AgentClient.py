@@ -0,0 +1,129 @@
+import json
+import logging
+import os
+import shlex
+import subprocess as sp
+
+from System.Platform.Agent.AgentProcess import AgentProcess
+
+
+class AgentClient(object):
+    # Client of the agent running commands on an instance
+    # Agent commands are sent through a transport prefix (e.g. SSH command reaching the instance)
+    # An empty transport runs the agent on the local machine, which is used as a stand-in for an instance agent
+    # The '{mux_options}' placeholder of the transport is replaced by the options of a session of the SSH master connection
+
+    # Local path of the agent script copied to instances
+    AGENT_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cc_agent.py")
+
+    # Version of the protocol expected from the agent
+    AGENT_VERSION = 3
+
+    def __init__(self, name, transport="", agent_dir="~/.cc_agent", python="python3", env=None, sessions=None):
+
+        # Name of the instance running the agent, used in logs
+        self.name = name
+
+        # Command prefix reaching the agent and environment of the processes running it
+        self.transport  = transport
+        self.env        = env
+
+        # Limiter of the sessions sent through the SSH master connection (None = transport has no master connection)
+        self.sessions   = sessions
+
+        # Directory holding the agent script and the state of its commands
+        self.agent_dir  = agent_dir
+        self.python     = python
+
+    def install(self, timeout=120):
+        # Copy agent script to the instance and check that it runs
+        with open(self.AGENT_SCRIPT, "rb") as inp:
+            script = inp.read()
+
+        agent_dir = self.__quote_path(self.agent_dir)
+        self.__run(f"mkdir -p {agent_dir} && cat > {agent_dir}/cc_agent.py", stdin=script, timeout=timeout)
+
+        version = json.loads(self.__run(self.__get_agent_cmd("version"), timeout=timeout)).get("version", None)
+        if version != self.AGENT_VERSION:
+            logging.error(f"({self.name}) Agent speaks protocol version {version} instead of {self.AGENT_VERSION}!")
+            raise RuntimeError(f"({self.name}) Incompatible agent version!")
+
+    def submit(self, jobs, owner, timeout=120):
+        # Start a batch of commands through a single agent connection and return their processes
+        # Jobs are dictionaries with the keys job_name, cmd, num_retries, docker_image, wrk_dir, nr_cpus and mem
+        # Commands are kept apart from the commands of other owners, and replace the commands of the same owner and name
+        request = [{"owner": owner,
+                    "name": job["job_name"],
+                    "cmd": job["cmd"],
+                    "docker_image": job.get("docker_image", None),
+                    "wrk_dir": job.get("wrk_dir", None),
+                    "nr_cpus": job.get("nr_cpus", None),
+                    "mem": job.get("mem", None)} for job in jobs]
+        self.__run(self.__get_agent_cmd("submit"), stdin=json.dumps(request).encode("utf8"), timeout=timeout)
+
+        return [AgentProcess(self, owner, job["job_name"], job["cmd"],
+                             num_retries=job.get("num_retries", 0),
+                             docker_image=job.get("docker_image", None)) for job in jobs]
+
+    def open_stream(self, owner, job_name, out_offset=0, err_offset=0):
+        # Return process streaming output and exit code of a command, starting from the given offsets
+        # Stream holds its session until it is closed
+        cmd = self.__get_agent_cmd("stream", owner, job_name, out_offset, err_offset)
+        mux_options = self.__acquire_session()
+        try:
+            stream = sp.Popen(self.__wrap(cmd, mux_options), shell=True, stdout=sp.PIPE, stderr=sp.PIPE, close_fds=True, env=self.env)
+        except BaseException:
+            self.__release_session(mux_options)
+            raise
+        stream.mux_options = mux_options
+        return stream
+
+    def close_stream(self, stream):
+        # Give back the session of a stream that has exited
+        self.__release_session(stream.mux_options)
+        stream.mux_options = ""
+
+    def kill(self, owner, job_name, timeout=60):
+        self.__run(self.__get_agent_cmd("kill", owner, job_name), timeout=timeout)
+
+    def remove(self, owner, timeout=60):
+        # Kill and remove every command of an owner that won't submit any more commands, together with their output
+        self.__run(self.__get_agent_cmd("remove", owner), timeout=timeout)
+
+    def __get_agent_cmd(self, *args):
+        agent_dir = self.__quote_path(self.agent_dir)
+        args = " ".join(shlex.quote(str(arg)) for arg in args)
+        return f"{self.python} {agent_dir}/cc_agent.py --root {agent_dir} {args}"
+
+    def __wrap(self, cmd, mux_options=""):
+        # Send command through the transport, quoted once more as SSH passes it to a remote shell
+        if self.transport == "":
+            return cmd
+        return f"{self.transport.replace('{mux_options}', mux_options)} {shlex.quote(cmd)}"
+
+    def __acquire_session(self):
+        return self.sessions.acquire() if self.sessions is not None else ""
+
+    def __release_session(self, mux_options):
+        if self.sessions is not None:
+            self.sessions.release(mux_options)
+
+    def __run(self, cmd, stdin=None, timeout=120):
+        mux_options = self.__acquire_session()
+        try:
+            proc = sp.run(self.__wrap(cmd, mux_options), shell=True, input=stdin, stdout=sp.PIPE, stderr=sp.PIPE,
+                          env=self.env, timeout=timeout)
+        finally:
+            self.__release_session(mux_options)
+        if proc.returncode != 0:
+            logging.error(f"({self.name}) Agent command failed with exit code {proc.returncode}:\n{cmd}")
+            logging.error(f"The following error appeared:\n    {proc.stderr.decode('utf8', errors='replace')}")
+            raise RuntimeError(f"({self.name}) Agent command failed!")
+        return proc.stdout.decode("utf8", errors="replace")
+
+    @staticmethod
+    def __quote_path(path):
+        # Home directory is expanded by the shell running the agent, so it can't be quoted
+        if path.startswith("~/"):
+            return "~/" + shlex.quote(path[2:])
+        return shlex.quote(path)
@@ -0,0 +1,163 @@
+import json
+import logging
+import threading
+import time
+
+
+class AgentProcess(object):
+    # Command run by the agent of an instance, providing the same interface as Process
+    # Output and exit code are streamed from the agent by a background thread
+    # Dropped streams are resumed from the last received offsets, as the command keeps running on the instance
+
+    # Number of times in a row a dropped stream is reopened before giving up on the command
+    MAX_RECONNECTS = 5
+
+    # Maximum seconds between two attempts to reopen a stream
+    MAX_RECONNECT_DELAY = 30
+
+    def __init__(self, client, owner, job_name, cmd, num_retries=0, docker_image=None):
+
+        # Agent client, and owner and name identifying the command on the agent
+        self.client     = client
+        self.owner      = owner
+        self.job_name   = job_name
+
+        # CloudConductor specific values
+        self.command        = cmd
+        self.num_retries    = num_retries
+        self.docker_image   = docker_image
+
+        # Initialize process status
+        self.returncode = None
+        self.complete   = False
+        self.to_rerun   = False
+        self.killed     = False
+
+        # Received output, and byte offsets in the agent output files from which streams are resumed
+        self.out_chunks = []
+        self.err_chunks = []
+        self.offsets    = {"stdout": 0, "stderr": 0}
+
+        # Initialize output and err values
+        self.out = ""
+        self.err = ""
+
+        # Stream output in the background until command finishes
+        self.finished   = threading.Event()
+        self.stream     = None
+        self.thread     = threading.Thread(target=self.__stream_output, daemon=True)
+        self.thread.start()
+
+    def poll(self):
+        return self.returncode
+
+    def kill(self):
+        # Kill command on the instance and stop waiting for it, even if the agent can't be reached
+        # Killed commands finish right away, as local processes do, instead of once the agent reports their exit
+        self.killed = True
+        try:
+            self.client.kill(self.owner, self.job_name)
+        except BaseException as e:
+            logging.debug(f"Unable to kill agent command '{self.job_name}': {e}")
+        self.__finish(-9)
+        if self.stream is not None and self.stream.poll() is None:
+            self.stream.kill()
+
+    def is_complete(self):
+        return self.complete
+
+    def wait_completion(self):
+
+        # Return immediately if process has already been set to complete
+        if self.complete:
+            return
+
+        # Wait for the command to finish
+        self.finished.wait()
+
+        # Save output and error
+        self.out = "".join(self.out_chunks)
+        self.err = "".join(self.err_chunks)
+
+        # Set process to complete
+        self.complete = True
+
+    def has_failed(self):
+
+        # Obtain process return code
+        ret_code = self.poll()
+
+        # Check if failure
+        return ret_code is not None and ret_code != 0
+
+    def get_command(self):
+        return self.command
+
+    def get_num_retries(self):
+        return self.num_retries
+
+    def get_docker_image(self):
+        return self.docker_image
+
+    def get_output(self):
+        return self.out, self.err
+
+    def is_truncated(self):
+        # Output is never truncated
+        return False
+
+    def set_to_rerun(self):
+        self.to_rerun = True
+
+    def needs_rerun(self):
+        return self.to_rerun
+
+    def __stream_output(self):
+        reconnects = 0
+        while not self.finished.is_set():
+
+            # Resume stream from the last received offsets
+            self.stream = self.client.open_stream(self.owner, self.job_name, self.offsets["stdout"], self.offsets["stderr"])
+            for line in self.stream.stdout:
+                try:
+                    record = json.loads(line.decode("utf8"))
+                except ValueError:
+                    continue
+
+                # Stream is healthy again once it sends records
+                reconnects = 0
+
+                if "stream" in record:
+                    chunks = self.out_chunks if record["stream"] == "stdout" else self.err_chunks
+                    chunks.append(record["data"])
+                    self.offsets[record["stream"]] = record["offset"]
+                elif "exit_code" in record:
+                    self.__finish(record["exit_code"])
+                elif "error" in record:
+                    self.err_chunks.append(record["error"] + "\n")
+
+            _, stream_err = self.stream.communicate()
+            self.client.close_stream(self.stream)
+            if self.finished.is_set():
+                return
+
+            # Agent doesn't know the command, so it won't ever finish
+            if self.stream.returncode == 2:
+                self.__finish(self.stream.returncode)
+                return
+
+            # Give up on the command, reporting the exit code and error of the transport (e.g. 255 for SSH)
+            reconnects += 1
+            if reconnects > self.MAX_RECONNECTS:
+                self.err_chunks.append(stream_err.decode("utf8", errors="replace"))
+                self.__finish(self.stream.returncode)
+                return
+
+            logging.debug(f"Output stream of agent command '{self.job_name}' dropped "
+                          f"with exit code {self.stream.returncode}. Reconnecting...")
+            time.sleep(min(2 ** reconnects, self.MAX_RECONNECT_DELAY))
+
+    def __finish(self, returncode):
+        if not self.finished.is_set():
+            self.returncode = returncode
+            self.finished.set()
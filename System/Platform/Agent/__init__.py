@@ -0,0 +1,2 @@
+from .AgentProcess import AgentProcess
+from .AgentClient import AgentClient
@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+# CloudConductor agent running commands on an instance
+# Only depends on the python standard library, as it is copied to instances as a single file
+#
+# Commands are submitted in batches and run detached from the connection that submitted them, so they survive
+# dropped SSH connections. Output and exit status of each command are kept in files, from which they are streamed
+# back to CloudConductor as JSON lines, starting at any offset so that a dropped stream can be resumed.
+#
+# Commands are identified by their owner (e.g. slot of the instance submitting them) and their name, as several
+# owners sharing an instance can submit commands with the same name. A command resubmitted by the same owner under the
+# same name is a retry and replaces the previous run, while commands of other owners are left untouched.
+# Docker commands run in a container named after their owner, name and run, so that killing a command kills its
+# container rather than only the docker client. Commands of an owner done with the instance (e.g. task that returned
+# it) are removed together with their output, so that outputs don't pile up on long-lived instances.
+#
+# Usage:
+#   cc_agent.py [--root DIR] submit                                 Start commands listed as JSON on stdin
+#   cc_agent.py [--root DIR] stream OWNER NAME OUT_OFFSET ERR_OFFSET    Stream output and exit status of a command
+#   cc_agent.py [--root DIR] kill OWNER NAME                        Kill a running command
+#   cc_agent.py [--root DIR] remove OWNER                           Kill and remove every command of an owner
+#   cc_agent.py [--root DIR] run OWNER NAME RUN_ID                  Run a command (started by submit)
+#   cc_agent.py version                                             Print agent protocol version
+
+import json
+import os
+import re
+import shutil
+import signal
+import subprocess
+import sys
+import time
+import uuid
+
+# Version of the protocol spoken by the agent
+VERSION = 3
+
+# Seconds between two checks for new output while streaming
+STREAM_INTERVAL = 0.2
+
+# Maximum number of bytes sent in one output record
+CHUNK_SIZE = 65536
+
+# Exit code recorded for commands killed before finishing
+KILLED_EXIT_CODE = -9
+
+# Owner of commands submitted without any
+DEFAULT_OWNER = "default"
+
+
+def get_job_dir(root, owner, name):
+    # Directory holding the runs of a command, the current one being named in the 'current' file
+    return os.path.join(get_owner_dir(root, owner), name.replace("/", "_"))
+
+
+def get_owner_dir(root, owner):
+    # Directory holding the commands of an owner
+    return os.path.join(root, "jobs", owner.replace("/", "_"))
+
+
+def get_run_dir(root, owner, name):
+    # Return directory of the current run of a command (None if the command is unknown)
+    job_dir = get_job_dir(root, owner, name)
+    current_path = os.path.join(job_dir, "current")
+    if not os.path.exists(current_path):
+        return None
+    with open(current_path) as inp:
+        return os.path.join(job_dir, inp.read().strip())
+
+
+def get_container_name(owner, name, run_id):
+    # Name of the docker container of a run (same prefix as the containers named by CloudConductor for the owner)
+    return re.sub(r"[^a-zA-Z0-9_.-]", "_", "cc-%s-%s-%s" % (owner, name, run_id))
+
+
+def write_atomic(path, data):
+    # File is replaced at once so that it is never read partially written
+    tmp_path = "%s.tmp" % path
+    with open(tmp_path, "w") as out:
+        out.write(data)
+    os.replace(tmp_path, path)
+
+
+def submit(root):
+    # Start every command of the batch read from stdin
+    jobs = json.load(sys.stdin)
+    submitted = []
+    for job in jobs:
+        owner = job.get("owner") or DEFAULT_OWNER
+        job_dir = get_job_dir(root, owner, job["name"])
+        os.makedirs(job_dir, exist_ok=True)
+
+        # Commands resubmitted by the same owner under the same name (e.g. retries) replace the previous run
+        # Runs are never removed while their runner may still be starting, so that the runner sees it was killed
+        kill(root, owner, job["name"])
+        for run_id in os.listdir(job_dir):
+            run_dir = os.path.join(job_dir, run_id)
+            if os.path.isdir(run_dir) and read_exit_code(run_dir) is not None:
+                shutil.rmtree(run_dir, ignore_errors=True)
+
+        run_id = uuid.uuid4().hex[:12]
+        run_dir = os.path.join(job_dir, run_id)
+        os.makedirs(run_dir)
+        write_atomic(os.path.join(run_dir, "job.json"), json.dumps(job))
+        open(os.path.join(run_dir, "stdout"), "w").close()
+        open(os.path.join(run_dir, "stderr"), "w").close()
+        write_atomic(os.path.join(job_dir, "current"), run_id)
+
+        # Runner is detached from the current session so it survives the connection going away
+        subprocess.Popen([sys.executable, os.path.abspath(__file__), "--root", root, "run", owner, job["name"], run_id],
+                         stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                         start_new_session=True, close_fds=True)
+        submitted.append(job["name"])
+
+    print(json.dumps({"submitted": submitted}))
+
+
+def run(root, owner, name, run_id):
+    # Run a submitted command and record its exit code once it finishes
+    run_dir = os.path.join(get_job_dir(root, owner, name), run_id)
+    with open(os.path.join(run_dir, "job.json")) as inp:
+        job = json.load(inp)
+
+    # Command replaced before it even started
+    if os.path.exists(os.path.join(run_dir, "killed")):
+        write_atomic(os.path.join(run_dir, "exit_code"), str(KILLED_EXIT_CODE))
+        return
+
+    if job.get("docker_image") is not None:
+        wrk_dir = job.get("wrk_dir") or "/data"
+        args = ["sudo", "docker", "run", "--rm", "--name", get_container_name(owner, name, run_id), "--user", "root"]
+
+        # Containers are limited to the resources of the slot running them (if any)
+        if job.get("nr_cpus") is not None:
+            args += ["--cpus", str(job["nr_cpus"])]
+        if job.get("mem") is not None:
+            args += ["--memory", "%sg" % job["mem"]]
+
+        args += ["-v", "%s:%s" % (wrk_dir, wrk_dir), "--entrypoint", "/bin/bash", job["docker_image"], "-c", job["cmd"]]
+    else:
+        args = ["/bin/bash", "-c", job["cmd"]]
+
+    with open(os.path.join(run_dir, "stdout"), "ab") as out, open(os.path.join(run_dir, "stderr"), "ab") as err:
+        try:
+            proc = subprocess.Popen(args, stdin=subprocess.DEVNULL, stdout=out, stderr=err, start_new_session=True)
+        except OSError as e:
+            err.write(("Unable to start command: %s\n" % e).encode("utf8"))
+            write_atomic(os.path.join(run_dir, "exit_code"), "127")
+            return
+
+        # Pid is written before checking for a kill, while kills are marked before reading the pid,
+        # so a kill landing while the command starts is never missed
+        write_atomic(os.path.join(run_dir, "pid"), str(proc.pid))
+        if os.path.exists(os.path.join(run_dir, "killed")):
+            kill_run(owner, name, run_id, job, proc.pid)
+        exit_code = proc.wait()
+
+    # Commands killed by a signal report the same exit code as killed local processes
+    # Container is killed once more, in case the docker client was killed before it started the container
+    if os.path.exists(os.path.join(run_dir, "killed")):
+        if job.get("docker_image") is not None:
+            kill_container(get_container_name(owner, name, run_id))
+        exit_code = KILLED_EXIT_CODE
+    write_atomic(os.path.join(run_dir, "exit_code"), str(exit_code))
+
+
+def stream(root, owner, name, out_offset, err_offset):
+    # Stream output of the current run of a command from the given offsets, followed by its exit code once it has finished
+    run_dir = get_run_dir(root, owner, name)
+    if run_dir is None:
+        print(json.dumps({"error": "Unknown command '%s' of '%s'!" % (name, owner)}), flush=True)
+        sys.exit(2)
+
+    offsets = {"stdout": out_offset, "stderr": err_offset}
+    while True:
+        # Exit code is checked before reading, so that all the output is sent before the exit code
+        exit_code = read_exit_code(run_dir)
+
+        sent = False
+        for stream_name in ["stdout", "stderr"]:
+            with open(os.path.join(run_dir, stream_name), "rb") as inp:
+                inp.seek(offsets[stream_name])
+                data = inp.read(CHUNK_SIZE)
+            if len(data) > 0:
+                offsets[stream_name] += len(data)
+                print(json.dumps({"stream": stream_name,
+                                  "data": data.decode("utf8", errors="replace"),
+                                  "offset": offsets[stream_name]}), flush=True)
+                sent = True
+
+        if exit_code is not None and not sent:
+            print(json.dumps({"exit_code": exit_code}), flush=True)
+            return
+
+        if not sent:
+            time.sleep(STREAM_INTERVAL)
+
+
+def read_exit_code(run_dir):
+    exit_code_path = os.path.join(run_dir, "exit_code")
+    if not os.path.exists(exit_code_path):
+        return None
+    with open(exit_code_path) as inp:
+        return int(inp.read().strip())
+
+
+def kill(root, owner, name):
+    # Kill the current run of a command
+    run_dir = get_run_dir(root, owner, name)
+    if run_dir is None or read_exit_code(run_dir) is not None:
+        return
+
+    # Runner checks the mark once it has written the pid, in case the command is still starting
+    open(os.path.join(run_dir, "killed"), "w").close()
+    pid_path = os.path.join(run_dir, "pid")
+    if not os.path.exists(pid_path):
+        return
+    with open(os.path.join(run_dir, "job.json")) as inp:
+        job = json.load(inp)
+    with open(pid_path) as inp:
+        kill_run(owner, name, os.path.basename(run_dir), job, int(inp.read().strip()))
+
+
+def kill_run(owner, name, run_id, job, pid):
+    # Kill the container of a docker command, as killing the docker client leaves the container running
+    if job.get("docker_image") is not None:
+        kill_container(get_container_name(owner, name, run_id))
+    kill_process_group(pid)
+
+
+def kill_container(container_name):
+    subprocess.call(["sudo", "docker", "kill", container_name],
+                    stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def kill_process_group(pid):
+    # Process groups of commands run through sudo belong to root, so they are killed through sudo if needed
+    try:
+        os.killpg(pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+    except PermissionError:
+        subprocess.call(["sudo", "kill", "-9", "--", "-%d" % pid],
+                        stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def remove(root, owner):
+    # Kill and remove every command of an owner, together with their output
+    owner_dir = get_owner_dir(root, owner)
+    if not os.path.isdir(owner_dir):
+        return
+    for job_dir_name in os.listdir(owner_dir):
+        run_dir = get_run_dir(root, owner, job_dir_name)
+        if run_dir is None or not os.path.exists(os.path.join(run_dir, "job.json")):
+            continue
+        with open(os.path.join(run_dir, "job.json")) as inp:
+            kill(root, owner, json.load(inp)["name"])
+    shutil.rmtree(owner_dir, ignore_errors=True)
+
+
+def main(argv):
+    root = os.path.join(os.path.expanduser("~"), ".cc_agent")
+    if len(argv) >= 2 and argv[0] == "--root":
+        root, argv = argv[1], argv[2:]
+
+    if len(argv) == 0:
+        sys.stderr.write("Missing agent command!\n")
+        sys.exit(2)
+
+    action, args = argv[0], argv[1:]
+    if action == "version":
+        print(json.dumps({"version": VERSION}))
+    elif action == "submit":
+        submit(root)
+    elif action == "run":
+        run(root, args[0], args[1], args[2])
+    elif action == "stream":
+        stream(root, args[0], args[1], int(args[2]), int(args[3]))
+    elif action == "kill":
+        kill(root, args[0], args[1])
+    elif action == "remove":
+        remove(root, args[0])
+    else:
+        sys.stderr.write("Unknown agent command '%s'!\n" % action)
+        sys.exit(2)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -1,6 +1,4 @@
 import logging
-import os
-import subprocess as sp
 import boto3
 import json
 import statistics
@@ -121,15 +119,15 @@ class AmazonInstance(CloudInstance):
         if self.google_json is not None:
 
             # Transfer key to instance
-            cmd = f'scp -i {self.ssh_private_key} -o CheckHostIP=no -o StrictHostKeyChecking=no {self.google_json} ' \
+            mux_options = self.ssh_sessions.acquire()
+            cmd = f'scp -i {self.ssh_private_key} -o CheckHostIP=no -o StrictHostKeyChecking=no ' \
+                  f'{mux_options} {self.google_json} ' \
                   f'{self.ssh_connection_user}@{self.external_IP}:GCP.json'
 
-            Process.run_local_cmd(cmd, err_msg="Could not authenticate Google SDK on instance!")
-
-            # Activate service account
-            cmd = f'gcloud auth activate-service-account --key-file /home/{self.ssh_connection_user}/GCP.json'
-            self.run("authenticate_google", cmd)
-            self.wait_process("authenticate_google")
+            try:
+                Process.run_local_cmd(cmd, err_msg="Could not authenticate Google SDK on instance!")
+            finally:
+                self.ssh_sessions.release(mux_options)
 
         else:
             logging.warning("(%s) Google JSON key not provided! "
@@ -140,8 +138,13 @@ class AmazonInstance(CloudInstance):
                 && aws configure set aws_secret_access_key $AWS_SECRET_ACCESS_KEY \
                 && aws configure set default.region {self.region} \
                 && aws configure set default.output json'
-        self.run("aws_configure", cmd)
-        self.wait_process("aws_configure")
+
+        # Activate service account in the same SSH command
+        if self.google_json is not None:
+            cmd = f'gcloud auth activate-service-account --key-file /home/{self.ssh_connection_user}/GCP.json && {cmd}'
+
+        self.run("configure_instance", cmd)
+        self.wait_process("configure_instance")
 
     def destroy_instance(self):
         if self.is_preemptible:
@@ -195,74 +198,21 @@ class AmazonInstance(CloudInstance):
     def stop_instance(self):
         self.__aws_request(self.driver.stop_node, self.node)
 
-    def run(self, job_name, cmd, num_retries=None, docker_image=None):
-        # Checking if logging is required
-        if "!LOG" in cmd:
-
-            # Generate name of log file
-            log_file = f"{job_name}.log"
-            if self.wrk_log_dir is not None:
-                log_file = os.path.join(self.wrk_log_dir, log_file)
-
-            # Generating all the logging pipes
-            log_cmd_null    = " >>/dev/null 2>&1 "
-            log_cmd_stdout  = f" >>{log_file}"
-            log_cmd_stderr  = f" 2>>{log_file}"
-            log_cmd_all     = f" >>{log_file} 2>&1"
-
-            # Replacing the placeholders with the logging pipes
-            cmd = cmd.replace("!LOG0!", log_cmd_null)
-            cmd = cmd.replace("!LOG1!", log_cmd_stdout)
-            cmd = cmd.replace("!LOG2!", log_cmd_stderr)
-            cmd = cmd.replace("!LOG3!", log_cmd_all)
-
-        # Save original command
-        original_cmd = cmd
-
-        # Run in docker image if specified
-        if docker_image is not None:
-            cmd = f"sudo docker run --rm --user root -v {self.wrk_dir}:{self.wrk_dir} --entrypoint '/bin/bash' {docker_image} " \
-                f"-c '{cmd}'"
-
-        # Modify quotation marks to be able to send through SSH
-        cmd = cmd.replace("'", "'\"'\"'")
-
-        # Wrap the command around ssh
-        cmd = f"ssh -i {self.ssh_private_key} " \
-              f"-o CheckHostIP=no -o StrictHostKeyChecking=no " \
-              f"-o SendEnv=AWS_ACCESS_KEY_ID " \
-              f"-o SendEnv=AWS_SECRET_ACCESS_KEY " \
-              f"-o SendEnv=GOOGLE_APPLICATION_CREDENTIALS " \
-              f"-o ServerAliveInterval=30 -o ServerAliveCountMax=10 -o TCPKeepAlive=yes "\
-              f"{self.ssh_connection_user}@{self.external_IP} -- '{cmd}'"
-
-        # Run command using subprocess popen and add Popen object to self.processes
-        logging.info("(%s) Process '%s' started!" % (self.name, job_name))
-        logging.debug("(%s) Process '%s' has the following command:\n    %s" % (self.name, job_name, original_cmd))
-
-        # Generating process arguments
-        kwargs = {
-
-            # Add Popen specific arguments
-            "shell": True,
-            "stdout": sp.PIPE,
-            "stderr": sp.PIPE,
-            "close_fds": True,
-            "env":  {
-                "GOOGLE_APPLICATION_CREDENTIALS": f"/home/{self.ssh_connection_user}/GCP.json",
-                "AWS_ACCESS_KEY_ID": self.identity,
-                "AWS_SECRET_ACCESS_KEY": self.secret
-            },
-
-            # Add CloudConductor specific arguments
-            "original_cmd": original_cmd,
-            "num_retries": self.default_num_cmd_retries if num_retries is None else num_retries,
-            "docker_image": docker_image
+    def get_ssh_options(self):
+        # Send credentials to the instance along with the command
+        return "-o CheckHostIP=no -o StrictHostKeyChecking=no " \
+               "-o SendEnv=AWS_ACCESS_KEY_ID " \
+               "-o SendEnv=AWS_SECRET_ACCESS_KEY " \
+               "-o SendEnv=GOOGLE_APPLICATION_CREDENTIALS " \
+               "-o ServerAliveInterval=30 -o ServerAliveCountMax=10 -o TCPKeepAlive=yes"
+
+    def get_ssh_env(self):
+        return {
+            "GOOGLE_APPLICATION_CREDENTIALS": f"/home/{self.ssh_connection_user}/GCP.json",
+            "AWS_ACCESS_KEY_ID": self.identity,
+            "AWS_SECRET_ACCESS_KEY": self.secret
         }
 
-        # Add process to list of processes
-        self.processes[job_name] = Process(cmd, **kwargs)
-
     def get_status(self, log_status=False):
 
         if self.node is None:
@@ -0,0 +1,90 @@
+import base64
+import logging
+from collections import OrderedDict
+
+
+class BootstrapScript(object):
+    # Bash script running all the commands needed to prepare a processor for a task, sent through a single SSH command
+    # Commands are grouped in steps running one after the other, while commands of a step can run in parallel
+    # Every command and step reports its exit code and runtime on stdout, so timings come back with the script output
+
+    # Tag of the lines reporting timings
+    TIMING_TAG = "CC_BOOTSTRAP_TIMING"
+
+    def __init__(self, name):
+
+        # Name of the script, used in logs
+        self.name = name
+
+        # Commands of each step, indexed by step name
+        self.steps = OrderedDict()
+
+        # Number of commands of each step running at the same time and file where their output is appended (None = discarded)
+        self.parallelism    = {}
+        self.log_paths      = {}
+
+    def add_step(self, step_name, parallelism=1, log_path=None):
+        # Add empty step running up to parallelism commands at the same time
+        self.steps[step_name] = []
+        self.parallelism[step_name] = max(int(parallelism), 1)
+        self.log_paths[step_name] = log_path
+
+    def add_command(self, step_name, cmd_name, cmd):
+        # Add command to an existing step
+        self.steps[step_name].append((cmd_name, cmd))
+
+    def is_empty(self):
+        return all(len(cmds) == 0 for cmds in self.steps.values())
+
+    def render(self):
+        # Return the bash script running all the steps
+        lines = ["set -o pipefail",
+                 "cc_now() { date +%s.%N; }",
+                 "cc_report() { echo \"%s $1 $2 $(awk \"BEGIN {print $(cc_now) - $3}\")\"; }" % self.TIMING_TAG]
+
+        for step_nr, (step_name, cmds) in enumerate(self.steps.items()):
+            if len(cmds) == 0:
+                continue
+
+            # Commands of the step run in the background, with at most parallelism commands running at the same time
+            lines.append("cc_step_%d() {" % step_nr)
+            lines.append("  local pids=() failed=0")
+            log_path = "/dev/null" if self.log_paths[step_name] is None else self.log_paths[step_name]
+            for cmd_name, cmd in cmds:
+                lines.append("  while [ \"$(jobs -rp | wc -l)\" -ge %d ]; do wait -n; done" % self.parallelism[step_name])
+                lines.append("  ( start=$(cc_now); { %s ; } >>%s 2>&1; rc=$?; cc_report %s $rc $start; exit $rc ) &" %
+                             (cmd, log_path, self.__get_label("%s.%s" % (step_name, cmd_name))))
+                lines.append("  pids+=($!)")
+            lines.append("  for pid in \"${pids[@]}\"; do wait $pid || failed=1; done")
+            lines.append("  return $failed")
+            lines.append("}")
+
+            # Stop at the first failed step
+            lines.append("start=$(cc_now); cc_step_%d; rc=$?; cc_report %s $rc $start; [ $rc -eq 0 ] || exit $rc" %
+                         (step_nr, self.__get_label(step_name)))
+
+        return "\n".join(lines) + "\n"
+
+    def get_command(self):
+        # Return single-line command running the script, so it doesn't need to be quoted again when sent through SSH
+        script = base64.b64encode(self.render().encode("utf8")).decode("utf8")
+        return "echo %s | base64 -d | bash" % script
+
+    @staticmethod
+    def parse_timings(stdout):
+        # Return exit code and runtime (seconds) of every command and step reported by the script, indexed by name
+        timings = OrderedDict()
+        for line in (stdout or "").splitlines():
+            fields = line.strip().split()
+            if len(fields) != 4 or fields[0] != BootstrapScript.TIMING_TAG:
+                continue
+            try:
+                timings[fields[1]] = {"exit_code": int(fields[2]), "runtime": float(fields[3])}
+            except ValueError:
+                logging.debug("Unable to parse bootstrap timing: %s" % line)
+        return timings
+
+    @staticmethod
+    def __get_label(name):
+        # Labels are reported as single words
+        return "".join(char if char.isalnum() or char in "._-:" else "_" for char in name)
@@ -0,0 +1,23 @@
+import time
+
+
+class Clock(object):
+    # Clock used by the platform to timestamp events and to wait
+    # Every wait of the scheduler, task workers and instances goes through the clock of their platform,
+    # so that simulated platforms can replace the wall clock by a virtual one
+
+    def now(self):
+        # Return current time in seconds since the epoch
+        return time.time()
+
+    def sleep(self, duration):
+        # Wait for a number of seconds
+        time.sleep(duration)
+
+    def wait(self, event, timeout=None):
+        # Wait until event is set or timeout passes, and return whether event is set
+        return event.wait(timeout=timeout)
+
+    def get(self, _queue, timeout=None):
+        # Remove and return an item from a queue, waiting at most timeout seconds (raises queue.Empty otherwise)
+        return _queue.get(timeout=timeout)
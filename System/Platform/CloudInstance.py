@@ -2,13 +2,18 @@ import os
 import logging
 import abc
 import subprocess as sp
-import time
 import socket
 import re
 import random
+import hashlib
+import tempfile
+import threading
+import uuid
 from collections import OrderedDict
 
 from System.Platform import Process
+from System.Platform.SSHSessionLimiter import SSHSessionLimiter
+from System.Platform.Agent import AgentClient
 
 
 class CloudInstance(object, metaclass=abc.ABCMeta):
@@ -23,6 +28,15 @@ class CloudInstance(object, metaclass=abc.ABCMeta):
 
     STATUSES    = ["OFF", "CREATING", "DESTROYING", "AVAILABLE", "TERMINATED"]
 
+    # Seconds an idle SSH master connection is kept open
+    SSH_CONTROL_PERSIST = 600
+
+    # Minimum seconds between two attempts to open the SSH master connection of an instance
+    SSH_MASTER_RETRY_INTERVAL = 60
+
+    # Directory holding the local copies of remote files kept on the instance for later tasks
+    CACHE_DIR = "/data/.cc_cache"
+
     def __init__(self, name, nr_cpus, mem, disk_space, disk_image, **kwargs):
 
         # Initialize main instance information
@@ -69,13 +83,53 @@ class CloudInstance(object, metaclass=abc.ABCMeta):
         # Initialize the checkpoints of the instance
         self.checkpoints = []
 
+        # Whether instance is preemptible (set by inheriting classes)
+        self.is_preemptible = False
+
+        # Whether instance resources are currently allocated on the platform
+        self.resources_allocated = kwargs.pop("resources_reserved", False)
+
+        # Local copies of remote files left on the instance by its tasks, indexed by remote path
+        self.cached_files = {}
+
+        # Disk space (GB) left on the workspace disk once the instance was last pruned (None = never pruned)
+        self.free_disk_space = None
+
+        # Whether the SSH server of the instance is accessible
+        self.ssh_ready = False
+
+        # Local socket of the SSH master connection shared by all the commands sent to the instance
+        # The connection is opened once the instance accepts SSH connections and closed when the instance stops
+        # Commands open their own connection whenever the master connection isn't available (None = never shared)
+        self.ssh_control_path = None
+        if self.platform.config.get("ssh_multiplexing", True):
+            control_id = hashlib.md5(self.name.encode("utf8")).hexdigest()[:16]
+            self.ssh_control_path = os.path.join(tempfile.gettempdir(), "cc-ssh", control_id)
+        self.ssh_master_lock = threading.Lock()
+        self.ssh_master_attempt = 0
+
+        # Sessions sent through the master connection, beyond which sessions open their own connection
+        self.ssh_sessions = SSHSessionLimiter(self.ssh_control_path, self.platform.config.get("ssh_max_sessions", 8))
+
+        # Client of the agent running commands on the instance (None = commands are sent directly through SSH)
+        # The agent is installed after startup if enabled, so commands keep running when SSH connections drop
+        self.agent = None
+
+        # Owner of the agent commands submitted for the task using the instance, renewed whenever the instance is reused
+        # Slots of the instance submit their commands under their own owner, as their commands may have the same names
+        self.agent_owner = self.generate_agent_owner(self.name)
+
     def create(self):
 
-        # Allocate resources on the platform for current instance
-        self.platform.allocate_resources(self.nr_cpus, self.mem, self.disk_space)
+        # Allocate resources on the platform for current instance (unless already reserved)
+        if not self.resources_allocated:
+            self.platform.allocate_resources(self.nr_cpus, self.mem, self.disk_space)
+            self.resources_allocated = True
 
         # Create the actual instance
+        create_start = self.platform.clock.now()
         self.external_IP = self.create_instance()
+        self.platform.record_instance_latency("create", self.platform.clock.now() - create_start)
 
         # Add creation event to instance history
         self.__add_history_event("CREATE")
@@ -87,16 +141,26 @@ class CloudInstance(object, metaclass=abc.ABCMeta):
                                       f'an IP address! Please check the documentation and method implementation.')
 
         # Wait until instance is ready (aka the SSH server is responsive)
+        ready_start = self.platform.clock.now()
         self.__wait_until_ready()
+        self.platform.record_instance_latency("ready", self.platform.clock.now() - ready_start)
 
         # Run post_startup_tasks
         self.post_startup()
 
+        # Install the agent running commands on the instance
+        self.__install_agent()
+
         # Return an instance of self
         return self
 
     def destroy(self):
 
+        # Close SSH master connection before the instance goes away
+        self.agent = None
+        self.__close_ssh_master()
+
+        destroy_start = self.platform.clock.now()
         while True:
 
             # Get the current instance status
@@ -112,17 +176,83 @@ class CloudInstance(object, metaclass=abc.ABCMeta):
                         logging.debug(f"({self.name}) Failed to destroy instance. ResourceNotFound... moving on.")
                         break
 
-                # Allocate resources on the platform for current instance
-                self.platform.deallocate_resources(self.nr_cpus, self.mem, self.disk_space)
+                # Deallocate resources on the platform for current instance
+                self.release_resources()
 
             # If status is OFF then the instance was destroyed
             if status == CloudInstance.OFF or status == CloudInstance.TERMINATED:
                 self.node = None
                 self.__add_history_event("DESTROY")
+                self.platform.record_instance_latency("destroy", self.platform.clock.now() - destroy_start)
                 break
 
             # Wait for 30 seconds before checking again for status
-            time.sleep(30)
+            self.platform.clock.sleep(30)
+
+    def recycle(self):
+        # Prepare the instance to be used by another task by wiping its workspace and forgetting its processes
+        # Hidden entries are wiped too, e.g. the cache directory filled while the instance was held for its files
+        self.run("wipe_workspace", "sudo find /data -mindepth 1 -delete")
+        self.wait_process("wipe_workspace")
+
+        self.processes = OrderedDict()
+        self.checkpoints = []
+        self.cached_files = {}
+        self.free_disk_space = None
+        self.set_workspace(wrk_dir="/data", wrk_log_dir="/data/log", wrk_out_dir="/data/output")
+        self.remove_agent_owner(self.agent_owner)
+        self.agent_owner = self.generate_agent_owner(self.name)
+
+    def prune_workspace(self):
+        # Prepare the instance to be used by another task by wiping its workspace except the local copies of remote files
+        # Local copies are moved to the cache directory first, as they are in the workspace of the task that created them
+        cached_files = {}
+        cmds = [f"sudo mkdir -p {self.CACHE_DIR}"]
+        for remote_path, local_path in self.cached_files.items():
+            if local_path.startswith(f"{self.CACHE_DIR}/"):
+                cached_files[remote_path] = local_path
+                continue
+            path_id = hashlib.md5(remote_path.encode("utf8")).hexdigest()[:16]
+            cached_files[remote_path] = f"{self.CACHE_DIR}/{path_id}_{os.path.basename(local_path.rstrip('/'))}"
+            cmds.append(f"sudo mv {local_path} {cached_files[remote_path]}")
+
+        # Remove everything else and measure the disk space left for later tasks
+        cmds.append(f"sudo find /data -mindepth 1 -maxdepth 1 ! -path {self.CACHE_DIR} -exec rm -rf {{}} +")
+        cmds.append("df -B1 --output=avail /data | tail -n 1")
+        self.run("prune_workspace", " && ".join(cmds))
+        out, _ = self.wait_process("prune_workspace")
+
+        self.processes = OrderedDict()
+        self.checkpoints = []
+        self.cached_files = cached_files
+        self.free_disk_space = int(out.strip().splitlines()[-1]) / 1024.0 ** 3
+        self.set_workspace(wrk_dir="/data", wrk_log_dir="/data/log", wrk_out_dir="/data/output")
+        self.remove_agent_owner(self.agent_owner)
+        self.agent_owner = self.generate_agent_owner(self.name)
+
+    def get_free_disk_space(self):
+        return self.free_disk_space
+
+    def cache_file(self, remote_path, local_path):
+        # Record that a local copy of a remote file is available on the instance
+        self.cached_files[remote_path] = local_path
+
+    def get_cached_file(self, remote_path):
+        # Return path of the local copy of a remote file (None if the file isn't available on the instance)
+        return self.cached_files.get(remote_path, None)
+
+    def has_cached_files(self):
+        return len(self.cached_files) > 0
+
+    def get_pool_key(self):
+        # Return key identifying the type of the instance for reuse by other tasks
+        return self.nr_cpus, self.mem, self.disk_space, self.platform.disk_image, self.is_preemptible
+
+    def release_resources(self):
+        # Deallocate instance resources on the platform if they haven't been deallocated already
+        if self.resources_allocated:
+            self.resources_allocated = False
+            self.platform.deallocate_resources(self.nr_cpus, self.mem, self.disk_space)
 
     def recreate(self):
         # Check if we recreated too many times already
@@ -161,8 +291,15 @@ class CloudInstance(object, metaclass=abc.ABCMeta):
         # Wait until instance is ready (aka the SSH server is responsive)
         self.__wait_until_ready()
 
+        # Commands of the agent don't survive the instance stopping, so the agent starts again from a fresh state
+        self.__install_agent()
+
     def stop(self):
 
+        # Close SSH master connection, as the instance will get a new IP address once it starts again
+        self.agent = None
+        self.__close_ssh_master()
+
         # Stop instance
         try:
             self.stop_instance()
@@ -192,46 +329,99 @@ class CloudInstance(object, metaclass=abc.ABCMeta):
         self.reset_count += 1
 
     def run(self, job_name, cmd, num_retries=None, docker_image=None):
+        # Run command on instance and add process to self.processes
+        self.processes[job_name] = self.start_process(job_name, cmd,
+                                                      num_retries=num_retries,
+                                                      docker_image=docker_image,
+                                                      wrk_dir=self.wrk_dir,
+                                                      wrk_log_dir=self.wrk_log_dir)
+
+    def run_batch(self, jobs, num_retries=None):
+        # Run several commands (pairs of job name and command) on instance and add their processes to self.processes
+        self.processes.update(self.start_processes(jobs,
+                                                   num_retries=num_retries,
+                                                   wrk_dir=self.wrk_dir,
+                                                   wrk_log_dir=self.wrk_log_dir))
+
+    def start_processes(self, jobs, num_retries=None, docker_image=None, wrk_dir=None, wrk_log_dir=None, log_name=None,
+                        nr_cpus=None, mem=None, owner=None):
+        # Start several commands on instance and return their processes indexed by job name
+        # Commands are submitted to the agent at once when available, otherwise each one gets its own SSH command
+        # Agent commands are submitted under the given owner (default: task currently using the instance)
+        if self.agent is None:
+            return OrderedDict((job_name, self.start_process(job_name, cmd,
+                                                             num_retries=num_retries,
+                                                             docker_image=docker_image,
+                                                             wrk_dir=wrk_dir,
+                                                             wrk_log_dir=wrk_log_dir,
+                                                             log_name=log_name,
+                                                             nr_cpus=nr_cpus,
+                                                             mem=mem)) for job_name, cmd in jobs)
+
+        log_name = self.name if log_name is None else log_name
+        agent_jobs = []
+        for job_name, cmd in jobs:
+            cmd = self.__add_log_pipes(job_name, cmd, wrk_log_dir)
+            logging.info("(%s) Process '%s' started!" % (log_name, job_name))
+            logging.debug("(%s) Process '%s' has the following command:\n    %s" % (log_name, job_name, cmd))
+            agent_jobs.append({"job_name": job_name,
+                               "cmd": cmd,
+                               "num_retries": self.default_num_cmd_retries if num_retries is None else num_retries,
+                               "docker_image": docker_image,
+                               "wrk_dir": wrk_dir,
+                               "nr_cpus": nr_cpus,
+                               "mem": mem})
+
+        self.__open_ssh_master()
+        owner = self.agent_owner if owner is None else owner
+        return OrderedDict(zip([job_name for job_name, _ in jobs], self.agent.submit(agent_jobs, owner)))
+
+    def start_process(self, job_name, cmd, num_retries=None, docker_image=None, wrk_dir=None, wrk_log_dir=None, log_name=None,
+                      nr_cpus=None, mem=None, owner=None):
+        # Start command on instance from the given working/log directories and return the process running it
+        # Docker commands are limited to nr_cpus CPUs and mem GB of memory if given (e.g. when run in a slot of the instance)
+        log_name = self.name if log_name is None else log_name
+
+        # Commands are run by the agent when available
+        if self.agent is not None:
+            return self.start_processes([(job_name, cmd)],
+                                        num_retries=num_retries,
+                                        docker_image=docker_image,
+                                        wrk_dir=wrk_dir,
+                                        wrk_log_dir=wrk_log_dir,
+                                        log_name=log_name,
+                                        nr_cpus=nr_cpus,
+                                        mem=mem,
+                                        owner=owner)[job_name]
 
         # Checking if logging is required
-        if "!LOG" in cmd:
-
-            # Generate name of log file
-            log_file = f"{job_name}.log"
-            if self.wrk_log_dir is not None:
-                log_file = os.path.join(self.wrk_log_dir, log_file)
-
-            # Generating all the logging pipes
-            log_cmd_null    = " >>/dev/null 2>&1 "
-            log_cmd_stdout  = f" >>{log_file}"
-            log_cmd_stderr  = f" 2>>{log_file}"
-            log_cmd_all     = f" >>{log_file} 2>&1"
-
-            # Replacing the placeholders with the logging pipes
-            cmd = cmd.replace("!LOG0!", log_cmd_null)
-            cmd = cmd.replace("!LOG1!", log_cmd_stdout)
-            cmd = cmd.replace("!LOG2!", log_cmd_stderr)
-            cmd = cmd.replace("!LOG3!", log_cmd_all)
+        cmd = self.__add_log_pipes(job_name, cmd, wrk_log_dir)
 
         # Save original command
         original_cmd = cmd
 
         # Run in docker image if specified
+        # Containers are named after their owner, so that the containers of a slot can be killed when it stops
         if docker_image is not None:
-            cmd = f"sudo docker run --rm --user root -v {self.wrk_dir}:{self.wrk_dir} --entrypoint '/bin/bash' {docker_image} " \
+            owner = self.agent_owner if owner is None else owner
+            num_retries = self.default_num_cmd_retries if num_retries is None else num_retries
+            container_name = self.get_container_name(owner, job_name, num_retries)
+            cmd = f"sudo docker run --rm --name {container_name} --user root {self.get_docker_limit_options(nr_cpus, mem)} " \
+                f"-v {wrk_dir}:{wrk_dir} --entrypoint '/bin/bash' {docker_image} " \
                 f"-c '{cmd}'"
 
         # Modify quotation marks to be able to send through SSH
         cmd = cmd.replace("'", "'\"'\"'")
 
-        # Wrap the command around ssh
-        cmd = f"ssh -i {self.ssh_private_key} " \
-            f"-o CheckHostIP=no -o StrictHostKeyChecking=no -o ServerAliveInterval=30 -o ServerAliveCountMax=10 -o TCPKeepAlive=yes " \
+        # Wrap the command around ssh, sending it through the SSH master connection if possible
+        self.__open_ssh_master()
+        mux_options = self.ssh_sessions.acquire()
+        cmd = f"ssh -i {self.ssh_private_key} {self.get_ssh_options()} {mux_options} " \
             f"{self.ssh_connection_user}@{self.external_IP} -- '{cmd}'"
 
         # Run command using subprocess popen and add Popen object to self.processes
-        logging.info("(%s) Process '%s' started!" % (self.name, job_name))
-        logging.debug("(%s) Process '%s' has the following command:\n    %s" % (self.name, job_name, original_cmd))
+        logging.info("(%s) Process '%s' started!" % (log_name, job_name))
+        logging.debug("(%s) Process '%s' has the following command:\n    %s" % (log_name, job_name, original_cmd))
 
         # Generating process arguments
         kwargs = {
@@ -245,11 +435,80 @@ class CloudInstance(object, metaclass=abc.ABCMeta):
             # Add CloudConductor specific arguments
             "original_cmd": original_cmd,
             "num_retries": self.default_num_cmd_retries if num_retries is None else num_retries,
-            "docker_image": docker_image
+            "docker_image": docker_image,
+            "output_limit": self.platform.config.get("process_output_limit", 0)
         }
 
-        # Add process to list of processes
-        self.processes[job_name] = Process(cmd, **kwargs)
+        # Add environment variables sent through SSH (if any)
+        env = self.get_ssh_env()
+        if env is not None:
+            kwargs["env"] = env
+
+        # Session goes back to the master connection once the SSH command exits
+        try:
+            proc = Process(cmd, **kwargs)
+        except BaseException:
+            self.ssh_sessions.release(mux_options)
+            raise
+        proc.get_future().add_done_callback(lambda future: self.ssh_sessions.release(mux_options))
+        return proc
+
+    @staticmethod
+    def generate_agent_owner(name):
+        # Return a new owner of agent commands, unique to the task or slot submitting them
+        return f"{name}-{uuid.uuid4().hex[:8]}"
+
+    def remove_agent_owner(self, owner):
+        # Remove the commands of an owner done with the instance from the agent, so their output doesn't pile up
+        if self.agent is None:
+            return
+        try:
+            self.agent.remove(owner)
+        except BaseException as e:
+            logging.warning(f"({self.name}) Unable to remove the agent commands of '{owner}'!")
+            if str(e) != "":
+                logging.warning(f"Received the following message:\n{e}")
+
+    @staticmethod
+    def get_container_prefix(owner):
+        # Return prefix of the names of the docker containers started for an owner of commands
+        return re.sub(r"[^a-zA-Z0-9_.-]", "_", f"cc-{owner}-")
+
+    @staticmethod
+    def get_container_name(owner, job_name, attempt):
+        # Return name of the docker container of a command, unique to each attempt at running the command
+        return CloudInstance.get_container_prefix(owner) + re.sub(r"[^a-zA-Z0-9_.-]", "_", f"{job_name}-{attempt}")
+
+    def kill_containers(self, owner, log_name=None):
+        # Kill the docker containers still running for an owner of commands
+        # Killing the SSH command running a container leaves the container running on the instance
+        job_name = f"kill_containers_{uuid.uuid4().hex[:8]}"
+        cmd = f"sudo docker ps -q --filter name={self.get_container_prefix(owner)} | xargs -r sudo docker kill"
+        proc = self.start_process(job_name, cmd, num_retries=0, log_name=log_name, owner=owner)
+        proc.wait_completion()
+        if proc.has_failed():
+            _, stderr = proc.get_output()
+            logging.error(f"({self.name if log_name is None else log_name}) Unable to kill docker containers of '{owner}'!")
+            raise RuntimeError(f"Process '{job_name}' failed:\n{stderr}")
+
+    @staticmethod
+    def get_docker_limit_options(nr_cpus=None, mem=None):
+        # Return docker run options limiting the CPUs and memory (GB) available to a container
+        options = []
+        if nr_cpus is not None:
+            options.append(f"--cpus {nr_cpus}")
+        if mem is not None:
+            options.append(f"--memory {mem}g")
+        return " ".join(options)
+
+    def get_ssh_options(self):
+        # Return options used for SSH connections to the instance
+        return "-o CheckHostIP=no -o StrictHostKeyChecking=no " \
+               "-o ServerAliveInterval=30 -o ServerAliveCountMax=10 -o TCPKeepAlive=yes"
+
+    def get_ssh_env(self):
+        # Return environment of the SSH processes (None = inherit environment of the current process)
+        return None
 
     def wait_process(self, proc_name):
 
@@ -277,7 +536,7 @@ class CloudInstance(object, metaclass=abc.ABCMeta):
                     cmd = cmd.replace('aws s3 cp', 'aws s3 cp --recursive')
             if 'ssh' in stderr:
                 # issue with ssh connection, sleep for 10 seconds in case the server was having trouble with connections/commands
-                time.sleep(30)
+                self.platform.clock.sleep(30)
             self.run(job_name=proc_name,
                      cmd=cmd,
                      num_retries=proc_obj.get_num_retries()-1,
@@ -300,8 +559,9 @@ class CloudInstance(object, metaclass=abc.ABCMeta):
     def handle_failure(self, proc_name, proc_obj):
         return self.default_num_cmd_retries != 0 and proc_obj.get_num_retries() > 0
 
-    def compute_cost(self):
+    def compute_cost(self, start_time=None, end_time=None):
         # Compute running cost of current task processor
+        # Optionally, only the cost between start_time and end_time is computed (e.g. while used by one task)
 
         # Copy the instance history
         history = self.history.copy()
@@ -333,7 +593,7 @@ class CloudInstance(object, metaclass=abc.ABCMeta):
             elif event["type"] in ["DESTROY", "STOP"] and instance_is_on is not None:
 
                 # Calculate time delta in hours
-                time_delta = (event["timestamp"] - instance_is_on) / 3600.0
+                time_delta = self.__get_time_delta(instance_is_on, event["timestamp"], start_time, end_time)
 
                 # Add cost since last start-up
                 total_compute_cost += time_delta * compute_cost
@@ -352,7 +612,7 @@ class CloudInstance(object, metaclass=abc.ABCMeta):
             elif event["type"] == "DESTROY" and storage_is_present is not None:
 
                 # Calculate time delta
-                time_delta = (event["timestamp"] - storage_is_present) / 3600.0
+                time_delta = self.__get_time_delta(storage_is_present, event["timestamp"], start_time, end_time)
 
                 # Add cost since last start-up
                 total_storage_cost += time_delta * storage_cost
@@ -361,8 +621,24 @@ class CloudInstance(object, metaclass=abc.ABCMeta):
                 storage_is_present = None
                 storage_cost = 0
 
+        # Add cost of instance still running at the end of the requested time window
+        if end_time is not None:
+            if instance_is_on is not None:
+                total_compute_cost += self.__get_time_delta(instance_is_on, end_time, start_time, end_time) * compute_cost
+            if storage_is_present is not None:
+                total_storage_cost += self.__get_time_delta(storage_is_present, end_time, start_time, end_time) * storage_cost
+
         return total_compute_cost + total_storage_cost
 
+    @staticmethod
+    def __get_time_delta(from_time, to_time, start_time=None, end_time=None):
+        # Return number of hours between from_time and to_time that are within start_time and end_time
+        if start_time is not None:
+            from_time = max(from_time, start_time)
+        if end_time is not None:
+            to_time = min(to_time, end_time)
+        return max(to_time - from_time, 0) / 3600.0
+
     def __wait_until_ready(self):
         # Wait until instance can be SSHed
 
@@ -380,7 +656,7 @@ class CloudInstance(object, metaclass=abc.ABCMeta):
             cycle_count += 1
 
             # Wait for 30 seconds before checking the SSH server and status again
-            time.sleep(30)
+            self.platform.clock.sleep(30)
 
             status = self.get_status(log_status=True)
 
@@ -403,6 +679,9 @@ class CloudInstance(object, metaclass=abc.ABCMeta):
             self.ssh_ready = True
             logging.debug(f'({self.name}) Instance can be accessed through SSH!')
 
+            # Open the connection shared by the commands sent to the instance
+            self.__open_ssh_master()
+
     def get_api_sleep(self, attempt):
         temp = min(CloudInstance.API_SLEEP_CAP, 4 * 2 ** attempt)
         return temp / 2 + random.randrange(0, temp/2)
@@ -431,12 +710,109 @@ class CloudInstance(object, metaclass=abc.ABCMeta):
         # Otherwise, return only if there is ssh in the received header
         return "ssh" in out.lower()
 
+    def __open_ssh_master(self):
+        # Open SSH master connection to the instance, unless it's already open or was attempted too recently
+        if self.ssh_control_path is None or not self.ssh_ready or self.external_IP is None:
+            return
+
+        with self.ssh_master_lock:
+            if os.path.exists(self.ssh_control_path) \
+                    or self.platform.clock.now() - self.ssh_master_attempt < self.SSH_MASTER_RETRY_INTERVAL:
+                return
+            self.ssh_master_attempt = self.platform.clock.now()
+
+            # Master connection goes to the background once connected, so its output must not be captured
+            cmd = f"ssh -i {self.ssh_private_key} {self.get_ssh_options()} -o ControlMaster=yes " \
+                  f"-o ControlPath={self.ssh_control_path} -o ControlPersist={self.SSH_CONTROL_PERSIST} -N -f " \
+                  f"{self.ssh_connection_user}@{self.external_IP}"
+            try:
+                os.makedirs(os.path.dirname(self.ssh_control_path), mode=0o700, exist_ok=True)
+                proc = sp.run(cmd, shell=True, stdout=sp.DEVNULL, stderr=sp.DEVNULL, env=self.get_ssh_env(), timeout=60)
+                if proc.returncode != 0:
+                    raise RuntimeError(f"SSH exited with code {proc.returncode}")
+            except BaseException as e:
+                # Commands still run through their own connections without the master connection
+                logging.warning(f"({self.name}) Unable to open SSH master connection! Commands will open their own connections.")
+                if str(e) != "":
+                    logging.warning("Received the following message:\n%s" % e)
+                return
+
+            logging.debug(f"({self.name}) SSH master connection opened!")
+
+    def __close_ssh_master(self):
+        # Close SSH master connection to the instance (if any)
+        if self.ssh_control_path is None:
+            return
+
+        with self.ssh_master_lock:
+            self.ssh_master_attempt = 0
+            if not os.path.exists(self.ssh_control_path):
+                return
+
+            cmd = f"ssh -o ControlPath={self.ssh_control_path} -O exit " \
+                  f"{self.ssh_connection_user}@{self.external_IP or 'localhost'}"
+            try:
+                sp.run(cmd, shell=True, stdout=sp.DEVNULL, stderr=sp.DEVNULL, timeout=30)
+                if os.path.exists(self.ssh_control_path):
+                    os.remove(self.ssh_control_path)
+            except BaseException as e:
+                logging.debug(f"({self.name}) Unable to close SSH master connection: {e}")
+                return
+
+            logging.debug(f"({self.name}) SSH master connection closed!")
+
+    def __install_agent(self):
+        # Install the agent running commands on the instance, if enabled
+        self.agent = None
+        if not self.platform.config.get("instance_agent", False) or self.external_IP is None:
+            return
+
+        self.__open_ssh_master()
+        transport = f"ssh -i {self.ssh_private_key} {self.get_ssh_options()} {{mux_options}} " \
+                    f"{self.ssh_connection_user}@{self.external_IP} --"
+        agent = AgentClient(self.name, transport=transport, env=self.get_ssh_env(), sessions=self.ssh_sessions)
+        try:
+            agent.install()
+        except BaseException as e:
+            # Commands are still sent directly through SSH without the agent
+            logging.warning(f"({self.name}) Unable to install the instance agent! Commands will be sent directly through SSH.")
+            if str(e) != "":
+                logging.warning("Received the following message:\n%s" % e)
+            return
+
+        logging.debug(f"({self.name}) Instance agent installed!")
+        self.agent = agent
+
+    @staticmethod
+    def __add_log_pipes(job_name, cmd, wrk_log_dir):
+        # Replace the logging placeholders of a command with the pipes to its log file
+        if "!LOG" not in cmd:
+            return cmd
+
+        # Generate name of log file
+        log_file = f"{job_name}.log"
+        if wrk_log_dir is not None:
+            log_file = os.path.join(wrk_log_dir, log_file)
+
+        # Generating all the logging pipes
+        log_cmd_null    = " >>/dev/null 2>&1 "
+        log_cmd_stdout  = f" >>{log_file}"
+        log_cmd_stderr  = f" 2>>{log_file}"
+        log_cmd_all     = f" >>{log_file} 2>&1"
+
+        # Replacing the placeholders with the logging pipes
+        cmd = cmd.replace("!LOG0!", log_cmd_null)
+        cmd = cmd.replace("!LOG1!", log_cmd_stdout)
+        cmd = cmd.replace("!LOG2!", log_cmd_stderr)
+        cmd = cmd.replace("!LOG3!", log_cmd_all)
+        return cmd
+
     def __add_history_event(self, _type, _timestamp=None):
         # make sure not to add duplicate events
         if len(self.history) == 0:
             self.history.append({
                 "type": _type,
-                "timestamp": time.time() if _timestamp is None else _timestamp,
+                "timestamp": self.platform.clock.now() if _timestamp is None else _timestamp,
                 "price": {
                     "compute": self.get_compute_price(),
                     "storage": self.get_storage_price()
@@ -445,7 +821,7 @@ class CloudInstance(object, metaclass=abc.ABCMeta):
         elif len(self.history) > 0 and self.history[len(self.history)-1]['type'] != _type:
             self.history.append({
                 "type": _type,
-                "timestamp": time.time() if _timestamp is None else _timestamp,
+                "timestamp": self.platform.clock.now() if _timestamp is None else _timestamp,
                 "price": {
                     "compute": self.get_compute_price(),
                     "storage": self.get_storage_price()
@@ -471,7 +847,7 @@ class CloudInstance(object, metaclass=abc.ABCMeta):
             if event["type"] == "DESTROY":
                 return event["timestamp"]
 
-        return time.time()
+        return self.platform.clock.now()
 
     def get_runtime(self):
         return self.get_stop_time() - self.get_start_time()
@@ -3,7 +3,6 @@ import abc
 import uuid
 import threading
 import os
-import time
 import random
 from pathlib import Path
 
@@ -13,6 +12,11 @@ from cryptography.hazmat.backends import default_backend
 
 from Config import ConfigParser
 from System import CC_MAIN_DIR
+from System.Platform.Clock import Clock
+from System.Platform.ResourceQueue import ResourceQueue, ResourceRequest
+from System.Platform.InstancePool import InstancePool
+from System.Platform.InstanceSlot import PackedHost, InstanceSlot
+from System.Platform.MetricsServer import MetricsServer
 
 
 class CloudPlatform(object, metaclass=abc.ABCMeta):
@@ -75,12 +79,51 @@ class CloudPlatform(object, metaclass=abc.ABCMeta):
         # Save extra variables
         self.extra = self.config.get("extra", {})
 
+        # Clock used to timestamp events and to wait
+        self.clock = self.get_clock()
+
         # Dictionary to hold instances currently managed by the platform
         self.instances = {}
 
         # Platform resource threading lock
         self.platform_lock = threading.Lock()
 
+        # Condition notified whenever resources are released or the platform is locked
+        self.resources_released = threading.Condition(self.platform_lock)
+
+        # Queue of instance requests waiting for resources to become available
+        self.resource_queue = ResourceQueue(self.config.get("resource_queue_policy", "priority"))
+
+        # Pool of idle instances that can be reused by later tasks (None = instances are never reused)
+        self.instance_pool = None
+        if self.config.get("instance_pool", False):
+            self.instance_pool = InstancePool(ttl=self.config.get("instance_pool_ttl", 300), clock=self.clock)
+
+        # Instances kept alive for a while after their task finished, as they hold local copies of the task outputs
+        # Tasks needing those outputs are placed on them to avoid downloading the outputs again (None = never kept)
+        self.held_instances = None
+        if self.config.get("data_locality", False):
+            self.held_instances = InstancePool(ttl=self.config.get("data_locality_ttl", 120),
+                                               on_expire=self.__recycle_instance,
+                                               clock=self.clock)
+
+        # Small tasks can be packed together on larger shared instances (hosts), each task in its own slot
+        self.packing = self.config.get("packing", False)
+        self.PACKING = {
+            "TASK_MAX_NR_CPUS"  : self.config.get("packing_max_nr_cpus", 2),
+            "HOST_NR_CPUS"      : self.config.get("packing_host_nr_cpus", 16),
+            "HOST_MEM"          : self.config.get("packing_host_mem", 64),
+            "HOST_DISK_SPACE"   : self.config.get("packing_host_disk_space", 500)
+        }
+        self.packed_hosts = []
+        self.packing_lock = threading.Condition()
+
+        # Instances handed off by finished tasks to the fused tasks running right after them, indexed by fused task
+        self.handed_off_instances = {}
+
+        # Resources of idle instances currently being destroyed to make room for new instances
+        self.__evicting = {"cpu": 0, "mem": 0, "disk_space": 0}
+
         # Boolean flag to lock instance creation upon cleanup
         self.__locked = False
 
@@ -92,6 +135,19 @@ class CloudPlatform(object, metaclass=abc.ABCMeta):
         self.mem = 0
         self.disk_space = 0
 
+        # Number of instance requests that had to wait for resources and total seconds they waited
+        self.capacity_waits = 0
+        self.capacity_wait_time = 0
+
+        # Number of instances that went through each stage of their life and total seconds the stage took
+        # create: creating the instance on the cloud, ready: waiting for SSH after creation, destroy: destroying the instance
+        self.metrics_lock = threading.Lock()
+        self.instance_latencies = {stage: {"count": 0, "sum": 0} for stage in ["create", "ready", "destroy"]}
+
+        # Periods during which instances were idle between tasks (recycling, pooled or held), as [instance, start, end]
+        # Their cost isn't charged to any task, so it is reported separately (end is None while the instance is idle)
+        self.idle_periods = []
+
         # TODO: figure out the ssh_connection_user from platform_config
 
         # Initialize the location of the CloudConductor ssh_key
@@ -135,6 +191,21 @@ class CloudPlatform(object, metaclass=abc.ABCMeta):
         # Obtain task_id that will be used
         task_id = kwargs.pop("task_id", "NONAME")
 
+        # Obtain whether instance can be a slot on a shared host and whether instance should be preemptible
+        packable = kwargs.pop("packable", True)
+        preemptible = kwargs.pop("preemptible", None)
+
+        # Obtain sizes of remote input files that will be loaded on the instance, indexed by path
+        input_files = kwargs.pop("input_files", None)
+
+        # Obtain processor whose host must not be shared with the instance (e.g. processor of the original copy of a task)
+        avoid_processor = kwargs.pop("avoid_processor", None)
+
+        # Run small tasks in a slot on a shared host
+        if packable and self.__is_packable(nr_cpus, mem, disk_space):
+            return self.__get_slot(task_id, nr_cpus, mem, disk_space, priority=kwargs.get("priority", 0),
+                                   avoid_processor=avoid_processor)
+
         # Generate a unique instance name and associate it to the current request
         while True:
 
@@ -163,33 +234,30 @@ class CloudPlatform(object, metaclass=abc.ABCMeta):
             logging.error(f'{inst_name} Could not create instance!')
             raise RuntimeError(err_msg)
 
-        # Check if the current resource pool is full to allocate the current instance
-        allocated = False
-        while not allocated:
-            with self.platform_lock:
-
-                # Identify any overload
-                cpu_overload = self.cpu + nr_cpus > self.NR_CPUS["TOTAL"]
-                mem_overload = self.mem + mem > self.MEM["TOTAL"]
-                disk_overload = self.disk_space + disk_space > self.DISK_SPACE["TOTAL"]
-
-                # Check if not overloaded
-                if not cpu_overload and not mem_overload and not disk_overload:
-
-                    # Mark as allocated and start creating
-                    allocated = True
-                    if task_id is not None:
-                        logging.debug(f'({inst_name}) Creating instance for task "{task_id}"!')
-                    else:
-                        logging.debug(f'({inst_name}) Creating instance!')
-
-            if self.__locked:
-                logging.error(f'({inst_name}) Platform failed to initialize instance! Platform is currently locked!')
-                raise RuntimeError("Cannot create instance while platform is locked!")
+        # Reuse instance holding local copies of the input files if one is available
+        instance = self.__acquire_held_instance(inst_name, nr_cpus, mem, disk_space, input_files)
+        if instance is not None:
+            logging.info(f'({instance.get_name()}) Reusing instance holding input files of task "{task_id}"!')
+            return instance
+
+        # Reuse idle instance of the same type if one is available
+        if preemptible is None:
+            preemptible = bool(self.extra.get("preemptible", False))
+        instance = self.__acquire_pooled_instance(inst_name, nr_cpus, mem, disk_space, preemptible)
+        if instance is not None:
+            logging.info(f'({instance.get_name()}) Reusing idle instance for task "{task_id}"!')
+            return instance
+
+        # Wait in the resource queue until resources for the instance have been reserved
+        request = ResourceRequest(inst_name, nr_cpus, mem, disk_space, priority=kwargs.pop("priority", 0))
+        self.__reserve_resources(request)
+        if task_id is not None:
+            logging.debug(f'({inst_name}) Creating instance for task "{task_id}"!')
+        else:
+            logging.debug(f'({inst_name}) Creating instance!')
 
-            if not allocated:
-                logging.debug(f'({inst_name}) Platform fully loaded, we will wait for one minute and check again!')
-                time.sleep(60)
+        # Resources have already been allocated for the instance
+        kwargs["resources_reserved"] = True
 
         # Load cloud instance kwargs with platform variables
         kwargs.update({
@@ -215,6 +283,10 @@ class CloudPlatform(object, metaclass=abc.ABCMeta):
             self.instances[inst_name] = self.CloudInstanceClass(inst_name, nr_cpus, mem, disk_space,
                                                                 self.disk_image_obj, **kwargs)
 
+            # Make standard instance if preemptible instance was not requested
+            if not preemptible:
+                self.instances[inst_name].is_preemptible = False
+
             # Create instance
             self.instances[inst_name].create()
 
@@ -227,11 +299,68 @@ class CloudPlatform(object, metaclass=abc.ABCMeta):
             # TODO: Should we destroy the instance here?
 
             # Deallocate resources as no instance was created
-            self.deallocate_resources(nr_cpus, mem, disk_space)
+            if self.instances[inst_name] is None:
+                self.deallocate_resources(nr_cpus, mem, disk_space)
+            else:
+                self.instances[inst_name].release_resources()
 
             # Raise the actual exception
             raise
 
+    def record_instance_latency(self, stage, seconds):
+        # Record time an instance took to go through a stage of its life (create, ready, destroy)
+        with self.metrics_lock:
+            self.instance_latencies[stage]["count"] += 1
+            self.instance_latencies[stage]["sum"] += seconds
+
+    def get_metrics(self):
+        # Return metrics describing the resources and instances currently managed by the platform
+        resources = [("cpu", self.cpu, self.NR_CPUS), ("mem", self.mem, self.MEM), ("disk_space", self.disk_space, self.DISK_SPACE)]
+
+        # Instances are described by their last event (instances without events are still being created)
+        instance_states = {}
+        commands_in_flight = 0
+        for instance in list(self.instances.values()):
+            if instance is None or len(instance.history) == 0:
+                state = "CREATE_PENDING"
+            else:
+                state = instance.history[-1]["type"]
+            if instance is not None:
+                commands_in_flight += sum(1 for proc in list(instance.processes.values()) if not proc.is_complete())
+            instance_states[state] = instance_states.get(state, 0) + 1
+
+        with self.metrics_lock:
+            latencies = {stage: dict(latency) for stage, latency in self.instance_latencies.items()}
+
+        return [
+            MetricsServer.metric("cc_platform_resources_used", "gauge", "Resources currently allocated on the platform.",
+                                 [({"resource": name}, used) for name, used, _ in resources]),
+            MetricsServer.metric("cc_platform_resources_total", "gauge", "Maximum resources that can be allocated on the platform.",
+                                 [({"resource": name}, limits["TOTAL"]) for name, _, limits in resources]),
+            MetricsServer.metric("cc_platform_requests_waiting", "gauge", "Instance requests waiting for resources.",
+                                 len(self.resource_queue)),
+            MetricsServer.metric("cc_platform_capacity_waits_total", "counter", "Instance requests that had to wait for resources.",
+                                 self.capacity_waits),
+            MetricsServer.metric("cc_platform_capacity_wait_seconds_total", "counter", "Seconds instance requests waited for resources.",
+                                 self.capacity_wait_time),
+            MetricsServer.metric("cc_platform_instances", "gauge", "Instances managed by the platform, by their last event.",
+                                 [({"state": state}, count) for state, count in sorted(instance_states.items())]),
+            MetricsServer.metric("cc_platform_commands_in_flight", "gauge", "Commands currently running on instances.",
+                                 commands_in_flight),
+            MetricsServer.metric("cc_instance_latency_seconds_count", "counter", "Instances that went through each stage of their life.",
+                                 [({"stage": stage}, latency["count"]) for stage, latency in latencies.items()]),
+            MetricsServer.metric("cc_instance_latency_seconds_sum", "counter", "Seconds spent by instances in each stage of their life.",
+                                 [({"stage": stage}, latency["sum"]) for stage, latency in latencies.items()])
+        ]
+
+    def get_max_platform_nr_cpus(self):
+        return self.NR_CPUS["TOTAL"]
+
+    def get_available_nr_cpus(self):
+        # Return number of CPUs of the platform quota not allocated to any instance
+        with self.platform_lock:
+            return self.NR_CPUS["TOTAL"] - self.cpu
+
     def get_max_nr_cpus(self):
         return self.NR_CPUS["MAX"]
 
@@ -241,16 +370,96 @@ class CloudPlatform(object, metaclass=abc.ABCMeta):
     def get_max_disk_space(self):
         return self.DISK_SPACE["MAX"]
 
+    def get_idle_usage(self):
+        # Return total seconds instances were idle between tasks and their cost during that time
+        idle_time, idle_cost = 0, 0
+        with self.metrics_lock:
+            idle_periods = [list(period) for period in self.idle_periods]
+
+        for instance, start, end in idle_periods:
+            end = instance.get_stop_time() if end is None else end
+            idle_time += max(end - start, 0)
+            idle_cost += instance.compute_cost(start_time=start, end_time=end)
+        return idle_time, idle_cost
+
     def get_min_disk_space(self):
         return self.DISK_SPACE["MIN"]
 
     def get_final_output_dir(self):
         return self.final_output_dir
 
+    def release_instance(self, instance):
+        # Return instance that is no longer needed by its task
+        # Instance is kept for reuse by later tasks if possible, otherwise it is destroyed
+        if isinstance(instance, InstanceSlot):
+            instance.destroy()
+            return
+
+        # Instance is idle until another task acquires it
+        with self.metrics_lock:
+            self.idle_periods.append([instance, self.clock.now(), None])
+
+        # Keep instance holding output files of its task for the tasks that need them
+        # Everything else left on the instance by its tasks is removed, so it doesn't pile up along chains of tasks
+        if self.held_instances is not None and not self.__locked \
+                and instance.has_cached_files() and not instance.is_preemptible:
+            try:
+                instance.prune_workspace()
+                self.held_instances.release(None, instance)
+                logging.debug(f'({instance.get_name()}) Instance kept alive for tasks needing its files!')
+                return
+
+            except BaseException as e:
+                logging.warning(f'({instance.get_name()}) Unable to prune instance workspace! Instance will not be kept for its files.')
+                if str(e) != "":
+                    logging.warning(f"Received the following message:\n{e}")
+
+        self.__recycle_instance(instance)
+
+    def __recycle_instance(self, instance):
+        # Keep instance for reuse by later tasks if possible, otherwise destroy it
+        if self.instance_pool is not None and not self.__locked:
+            try:
+                instance.recycle()
+                self.instance_pool.release(instance.get_pool_key(), instance)
+                logging.debug(f'({instance.get_name()}) Instance added to pool of idle instances!')
+                return
+
+            except BaseException as e:
+                logging.warning(f'({instance.get_name()}) Unable to recycle instance! Destroying instance...')
+                if str(e) != "":
+                    logging.warning(f"Received the following message:\n{e}")
+
+        instance.destroy()
+
+    def hand_off_instance(self, task_id, instance):
+        # Keep instance of a finished task, together with its files, for the fused task that runs right after it
+        with self.platform_lock:
+            if not self.__locked:
+                self.handed_off_instances[task_id] = instance
+                logging.debug(f'({instance.get_name()}) Instance handed off to task "{task_id}"!')
+                return
+
+        # Nothing else is going to run on a locked platform
+        instance.destroy()
+
+    def claim_instance(self, task_id):
+        # Return instance handed off to a fused task (None if no instance was handed off to the task)
+        with self.platform_lock:
+            return self.handed_off_instances.pop(task_id, None)
+
     def lock(self):
         with self.platform_lock:
             self.__locked = True
 
+            # Wake up requests waiting for resources so they can fail
+            self.resources_released.notify_all()
+
+        # Stop keeping idle instances, they are destroyed with the rest of the instances on clean up
+        for idle_instances in [self.instance_pool, self.held_instances]:
+            if idle_instances is not None:
+                idle_instances.close()
+
     def unlock(self):
         with self.platform_lock:
             self.__locked = False
@@ -269,6 +478,233 @@ class CloudPlatform(object, metaclass=abc.ABCMeta):
             self.mem -= mem
             self.disk_space -= disk_space
 
+            # Wake up requests waiting for resources
+            self.resources_released.notify_all()
+
+    def release_slot(self, slot):
+        # Release resources of slot on its host and release the host once it has no slots left
+        try:
+            # Remove the slot workspaces so that their disk space can be used by other slots
+            if len(slot.get_workspaces()) > 0:
+                job_name = f"rm_slot_{self.generate_unique_id()}"
+                slot.get_host().run(job_name, f"sudo rm -rf {' '.join(slot.get_workspaces())}")
+                slot.get_host().wait_process(job_name)
+        except BaseException as e:
+            logging.warning(f"({slot.get_name()}) Unable to remove slot workspaces '{', '.join(slot.get_workspaces())}'!")
+            if str(e) != "":
+                logging.warning(f"Received the following message:\n{e}")
+
+        # Commands of the slot are removed from the agent of the host, as the slot won't submit any more commands
+        slot.get_host().remove_agent_owner(slot.agent_owner)
+
+        with self.packing_lock:
+            packed_host = slot.packed_host
+            packed_host.release(slot.nr_cpus, slot.mem, slot.disk_space)
+            host_is_empty = packed_host.nr_slots == 0
+            if host_is_empty:
+                self.packed_hosts.remove(packed_host)
+
+        # Release the host instance once it has no slots left
+        if host_is_empty:
+            logging.debug(f"({packed_host.instance.get_name()}) Shared host has no slots left!")
+            self.release_instance(packed_host.instance)
+
+    def __is_packable(self, nr_cpus, mem, disk_space):
+        # Determine whether instance can be a slot on a shared host
+        return self.packing \
+            and nr_cpus <= self.PACKING["TASK_MAX_NR_CPUS"] \
+            and mem <= self.PACKING["HOST_MEM"] \
+            and disk_space <= self.PACKING["HOST_DISK_SPACE"]
+
+    def __get_slot(self, task_id, nr_cpus, mem, disk_space, priority=0, avoid_processor=None):
+        # Reserve slot on a shared host that has room for it, creating a new host if none has room
+        # Host of the avoided processor is skipped, so that a failing host can't take down both copies of a task
+        avoid_host = avoid_processor.packed_host if isinstance(avoid_processor, InstanceSlot) else None
+
+        # Check if platform is locked
+        if self.__locked:
+            logging.error(f'({task_id}) Platform failed to reserve slot! Platform is currently locked!')
+            raise RuntimeError("Cannot create instance while platform is locked!")
+
+        with self.packing_lock:
+            packed_host = None
+            for curr_host in self.packed_hosts:
+                if curr_host is not avoid_host and curr_host.fits(nr_cpus, mem, disk_space):
+                    packed_host = curr_host
+                    break
+
+            # Register new host that will be created by the current request
+            create_host = packed_host is None
+            if create_host:
+                packed_host = PackedHost(self.PACKING["HOST_NR_CPUS"], self.PACKING["HOST_MEM"], self.PACKING["HOST_DISK_SPACE"])
+                self.packed_hosts.append(packed_host)
+
+            packed_host.reserve(nr_cpus, mem, disk_space)
+
+        if create_host:
+            try:
+                # Shared hosts are standard instances, as preemption would fail all tasks on it
+                instance = self.get_instance(self.PACKING["HOST_NR_CPUS"], self.PACKING["HOST_MEM"],
+                                             self.PACKING["HOST_DISK_SPACE"], task_id="packed-host",
+                                             priority=priority, packable=False, preemptible=False)
+            except BaseException:
+                with self.packing_lock:
+                    packed_host.failed = True
+                    packed_host.release(nr_cpus, mem, disk_space)
+                    self.packed_hosts.remove(packed_host)
+                    self.packing_lock.notify_all()
+                raise
+
+            with self.packing_lock:
+                packed_host.instance = instance
+                self.packing_lock.notify_all()
+
+        else:
+            # Wait for host to be created by another request
+            with self.packing_lock:
+                while not packed_host.is_ready():
+                    if packed_host.failed:
+                        packed_host.release(nr_cpus, mem, disk_space)
+                        logging.error(f"({task_id}) Shared host could not be created!")
+                        raise RuntimeError("Could not create shared host for slot!")
+                    self.packing_lock.wait()
+
+        slot_name = f"{packed_host.instance.get_name()}-{task_id[:25]}"
+        logging.info(f"({slot_name}) Slot reserved for task '{task_id}' with {nr_cpus} vCPUs and {mem} GB RAM!")
+        return InstanceSlot(slot_name, packed_host, nr_cpus, mem, disk_space, platform=self)
+
+    def __acquire_pooled_instance(self, inst_name, nr_cpus, mem, disk_space, preemptible):
+        # Return idle instance of the requested type from the pool (None if there isn't any)
+        if self.instance_pool is None:
+            return None
+
+        key = (nr_cpus, mem, disk_space, self.disk_image, preemptible)
+        instance = self.instance_pool.acquire(key)
+        if instance is not None:
+            # Free the name reserved for the new instance
+            with self.platform_lock:
+                self.instances.pop(inst_name, None)
+            self.__end_idle_period(instance)
+        return instance
+
+    def __acquire_held_instance(self, inst_name, nr_cpus, mem, disk_space, input_files):
+        # Return the held instance large enough for the request that holds the most input data (None if there isn't any)
+        if self.held_instances is None or not input_files:
+            return None
+
+        def cached_inputs(instance):
+            # Amount of input data held by the instance, ties are broken by the number of input files
+            if instance.nr_cpus < nr_cpus or instance.mem < mem:
+                return None
+
+            # Requested disk space includes the disk image, which is already on the instance
+            free_disk_space = instance.get_free_disk_space()
+            if free_disk_space is None or free_disk_space + self.get_disk_image_size() < disk_space:
+                return None
+            cached_sizes = [size for path, size in input_files.items() if instance.get_cached_file(path) is not None]
+            if len(cached_sizes) == 0:
+                return None
+            return sum(cached_sizes), len(cached_sizes)
+
+        instance = self.held_instances.acquire_best(cached_inputs)
+        if instance is not None:
+            # Free the name reserved for the new instance
+            with self.platform_lock:
+                self.instances.pop(inst_name, None)
+            self.__end_idle_period(instance)
+        return instance
+
+    def __end_idle_period(self, instance):
+        # Mark instance as used by a task again
+        with self.metrics_lock:
+            for period in reversed(self.idle_periods):
+                if period[0] is instance and period[2] is None:
+                    period[2] = self.clock.now()
+                    return
+
+    def __evict_idle_instances(self, request):
+        # Destroy idle instances until the request would fit once they are gone
+        # Instances from the pool are evicted before instances held for their files
+        # Must be called while holding the platform lock
+        idle_instances = [pool for pool in [self.instance_pool, self.held_instances] if pool is not None]
+        while not self.__fits(request, evicting=True):
+            instance = next((pool.pop_oldest() for pool in idle_instances if len(pool) > 0), None)
+            if instance is None:
+                return
+
+            logging.debug(f'({instance.get_name()}) Destroying idle instance to make room for "{request.get_name()}"!')
+            self.__evicting["cpu"] += instance.nr_cpus
+            self.__evicting["mem"] += instance.mem
+            self.__evicting["disk_space"] += instance.disk_space
+            threading.Thread(target=self.__destroy_evicted_instance, args=(instance,), daemon=True).start()
+
+    def __destroy_evicted_instance(self, instance):
+        try:
+            instance.destroy()
+        finally:
+            with self.platform_lock:
+                self.__evicting["cpu"] -= instance.nr_cpus
+                self.__evicting["mem"] -= instance.mem
+                self.__evicting["disk_space"] -= instance.disk_space
+
+    def __reserve_resources(self, request):
+        # Wait until request is next in the resource queue and fits on the platform, then allocate its resources
+        # Checking and allocating happen under the same lock so concurrent requests can't over-commit the platform
+        with self.resources_released:
+            self.resource_queue.add(request)
+            try:
+                waiting = False
+                wait_start = self.clock.now()
+                while True:
+
+                    if self.__locked:
+                        logging.error(f'({request.get_name()}) Platform failed to initialize instance! Platform is currently locked!')
+                        raise RuntimeError("Cannot create instance while platform is locked!")
+
+                    # Allocate resources if request is next in line and fits
+                    if self.resource_queue.get_next() is request:
+                        if self.__fits(request):
+                            self.cpu += request.nr_cpus
+                            self.mem += request.mem
+                            self.disk_space += request.disk_space
+                            if waiting:
+                                self.capacity_waits += 1
+                                self.capacity_wait_time += self.clock.now() - wait_start
+                            return
+
+                        # Make room by destroying idle instances
+                        self.__evict_idle_instances(request)
+
+                    if not waiting:
+                        logging.debug(f'({request.get_name()}) Platform fully loaded, we will wait for resources to be released! '
+                                      f'Requests waiting: {len(self.resource_queue)}')
+                        waiting = True
+
+                    self.resources_released.wait()
+
+            finally:
+                self.resource_queue.remove(request)
+
+                # Next request in line may now be able to reserve resources
+                self.resources_released.notify_all()
+
+    def __fits(self, request, evicting=False):
+        # Check whether request fits in the resources currently available on the platform
+        # Optionally, count resources of instances being evicted as already available
+        cpu, mem, disk_space = self.cpu, self.mem, self.disk_space
+        if evicting:
+            cpu -= self.__evicting["cpu"]
+            mem -= self.__evicting["mem"]
+            disk_space -= self.__evicting["disk_space"]
+
+        return cpu + request.nr_cpus <= self.NR_CPUS["TOTAL"] \
+            and mem + request.mem <= self.MEM["TOTAL"] \
+            and disk_space + request.disk_space <= self.DISK_SPACE["TOTAL"]
+
+    def get_clock(self):
+        # Platforms run on the wall clock unless they simulate time
+        return Clock()
+
     def get_api_sleep(self, attempt):
         temp = min(CloudPlatform.API_SLEEP_CAP, 4 * 2 ** attempt)
         return temp / 2 + random.randrange(0, temp/2)
@@ -12,7 +12,7 @@ class DockerHelper(object):
 
     def pull(self, image_name, job_name=None, log=True, **kwargs):
         # Pull docker image on local processor
-        cmd = "sudo docker pull %s" % image_name
+        cmd = self.get_pull_cmd(image_name)
 
         job_name = "pull_%s" % image_name if job_name is None else job_name
 
@@ -23,6 +23,11 @@ class DockerHelper(object):
         self.proc.run(job_name, cmd, **kwargs)
         return job_name
 
+    @staticmethod
+    def get_pull_cmd(image_name):
+        # Return command pulling docker image
+        return "sudo docker pull %s" % image_name
+
     def image_exists(self, image_name, job_name=None, **kwargs):
         # Return true if file exists, false otherwise
 
@@ -0,0 +1,110 @@
+import logging
+import threading
+from collections import OrderedDict
+
+from System.Platform.Clock import Clock
+
+
+class InstancePool(object):
+    # Pool of idle instances kept alive after their task finished so that they can be reused by later tasks
+    # Instances are matched by their pool key (nr_cpus, mem, disk_space, disk_image, is_preemptible)
+    # Instances idle for longer than the TTL are destroyed by a background thread
+
+    def __init__(self, ttl, on_expire=None, clock=None):
+
+        # Number of seconds an instance can stay idle before being destroyed
+        self.ttl = ttl
+
+        # Function called with instances that have been idle for too long (None = instances are destroyed)
+        self.on_expire = on_expire
+
+        # Clock used to measure idle times
+        self.clock = clock if clock is not None else Clock()
+
+        # Idle instances indexed by instance name, from least to most recently released
+        self.idle_instances = OrderedDict()
+        self.pool_lock = threading.Lock()
+
+        # Thread destroying expired instances
+        self.closed = threading.Event()
+        self.reaper = threading.Thread(target=self.__reap_expired, daemon=True)
+        self.reaper.start()
+
+    def acquire(self, key):
+        # Remove and return the most recently released idle instance matching the key (None if there isn't any)
+        with self.pool_lock:
+            for inst_name in reversed(self.idle_instances):
+                inst_key, instance, idle_since = self.idle_instances[inst_name]
+                if inst_key == key:
+                    self.idle_instances.pop(inst_name)
+                    return instance
+        return None
+
+    def acquire_best(self, score):
+        # Remove and return the idle instance with the highest score (None if there isn't any)
+        # Score function returns None for instances that cannot be used
+        with self.pool_lock:
+            best_name, best_score = None, None
+            for inst_name, (inst_key, instance, idle_since) in self.idle_instances.items():
+                inst_score = score(instance)
+                if inst_score is not None and (best_score is None or inst_score > best_score):
+                    best_name, best_score = inst_name, inst_score
+
+            if best_name is None:
+                return None
+            return self.idle_instances.pop(best_name)[1]
+
+    def release(self, key, instance):
+        # Add an idle instance to the pool
+        with self.pool_lock:
+            self.idle_instances[instance.get_name()] = (key, instance, self.clock.now())
+
+    def pop_oldest(self):
+        # Remove and return the least recently released idle instance (None if pool is empty)
+        with self.pool_lock:
+            if len(self.idle_instances) == 0:
+                return None
+            inst_key, instance, idle_since = self.idle_instances.popitem(last=False)[1]
+            return instance
+
+    def pop_all(self):
+        # Remove and return all idle instances
+        with self.pool_lock:
+            instances = [instance for inst_key, instance, idle_since in self.idle_instances.values()]
+            self.idle_instances.clear()
+            return instances
+
+    def close(self):
+        # Stop destroying expired instances
+        self.closed.set()
+
+    def __len__(self):
+        with self.pool_lock:
+            return len(self.idle_instances)
+
+    def __pop_expired(self):
+        # Remove and return instances that have been idle for longer than the TTL
+        expired = []
+        with self.pool_lock:
+            now = self.clock.now()
+            for inst_name in list(self.idle_instances):
+                inst_key, instance, idle_since = self.idle_instances[inst_name]
+                if now - idle_since >= self.ttl:
+                    expired.append(self.idle_instances.pop(inst_name)[1])
+        return expired
+
+    def __reap_expired(self):
+        # Periodically destroy expired instances until pool is closed
+        while not self.clock.wait(self.closed, timeout=min(max(self.ttl, 1), 30)):
+            for instance in self.__pop_expired():
+                try:
+                    if self.on_expire is not None:
+                        logging.debug("(%s) Instance has been idle for %s seconds!" % (instance.get_name(), self.ttl))
+                        self.on_expire(instance)
+                    else:
+                        logging.info("(%s) Instance has been idle for %s seconds. Destroying instance..." % (instance.get_name(), self.ttl))
+                        instance.destroy()
+                except BaseException as e:
+                    logging.error("(%s) Unable to destroy idle instance!" % instance.get_name())
+                    if str(e) != "":
+                        logging.error("Received the following message:\n%s" % e)
@@ -0,0 +1,222 @@
+import logging
+import re
+from collections import OrderedDict
+
+
+class PackedHost(object):
+    # Instance shared by several small tasks, each of them running in its own slot
+
+    def __init__(self, nr_cpus, mem, disk_space):
+
+        # Instance running the slots (None while the instance is being created)
+        self.instance = None
+
+        # Whether creating the instance failed
+        self.failed = False
+
+        # Resources of the instance not reserved by any slot
+        self.free_nr_cpus   = nr_cpus
+        self.free_mem       = mem
+        self.free_disk_space = disk_space
+
+        # Number of slots currently reserved on the instance
+        self.nr_slots = 0
+
+    def fits(self, nr_cpus, mem, disk_space):
+        return not self.failed \
+            and nr_cpus <= self.free_nr_cpus \
+            and mem <= self.free_mem \
+            and disk_space <= self.free_disk_space
+
+    def reserve(self, nr_cpus, mem, disk_space):
+        self.free_nr_cpus -= nr_cpus
+        self.free_mem -= mem
+        self.free_disk_space -= disk_space
+        self.nr_slots += 1
+
+    def release(self, nr_cpus, mem, disk_space):
+        self.free_nr_cpus += nr_cpus
+        self.free_mem += mem
+        self.free_disk_space += disk_space
+        self.nr_slots -= 1
+
+    def is_ready(self):
+        return self.instance is not None
+
+
+class InstanceSlot(object):
+    # Part of a packed host reserved for a single task
+    # Provides the processor interface used by task workers, while commands are run on the shared host
+    # Each slot has its own processes and its own workspace on the host
+
+    def __init__(self, name, packed_host, nr_cpus, mem, disk_space, platform):
+
+        self.name       = name
+        self.packed_host = packed_host
+        self.host       = packed_host.instance
+        self.nr_cpus    = nr_cpus
+        self.mem        = mem
+        self.disk_space = disk_space
+        self.platform   = platform
+
+        # Workspace of the slot on the host (set by the task)
+        self.wrk_dir        = None
+        self.wrk_log_dir    = None
+        self.wrk_out_dir    = None
+
+        # Every workspace used on the host by the tasks run in the slot (e.g. by a fused parent task and its child)
+        self.wrk_dirs       = []
+
+        # Owner of the agent commands of the slot, so that they are kept apart from the commands of the other slots
+        self.agent_owner = self.host.generate_agent_owner(name)
+
+        # Processes run by the slot
+        self.processes  = OrderedDict()
+        self.checkpoints = []
+
+        # Whether slot can still run commands
+        self.stopped    = False
+        self.released   = False
+
+        # Time window during which the slot was reserved
+        self.start_time = self.platform.clock.now()
+        self.stop_time  = None
+
+    def run(self, job_name, cmd, num_retries=None, docker_image=None):
+        if self.stopped:
+            logging.error("(%s) Cannot run process '%s' on a stopped slot!" % (self.name, job_name))
+            raise RuntimeError("(%s) Slot has been stopped!" % self.name)
+
+        self.processes[job_name] = self.host.start_process(job_name, cmd,
+                                                           num_retries=num_retries,
+                                                           docker_image=docker_image,
+                                                           wrk_dir=self.wrk_dir,
+                                                           wrk_log_dir=self.wrk_log_dir,
+                                                           log_name=self.name,
+                                                           nr_cpus=self.nr_cpus,
+                                                           mem=self.mem,
+                                                           owner=self.agent_owner)
+
+    def run_batch(self, jobs, num_retries=None):
+        if self.stopped:
+            logging.error("(%s) Cannot run processes on a stopped slot!" % self.name)
+            raise RuntimeError("(%s) Slot has been stopped!" % self.name)
+
+        self.processes.update(self.host.start_processes(jobs,
+                                                        num_retries=num_retries,
+                                                        wrk_dir=self.wrk_dir,
+                                                        wrk_log_dir=self.wrk_log_dir,
+                                                        log_name=self.name,
+                                                        nr_cpus=self.nr_cpus,
+                                                        mem=self.mem,
+                                                        owner=self.agent_owner))
+
+    def wait_process(self, proc_name):
+
+        # Get process from process list
+        proc_obj = self.processes[proc_name]
+
+        # Wait for process to finish
+        proc_obj.wait_completion()
+
+        # If process is complete with no failure return the output
+        if not proc_obj.has_failed():
+            logging.info(f"({self.name}) Process '{proc_name}' complete!")
+            return proc_obj.get_output()
+
+        # Retry process if it can be retried and slot hasn't been stopped
+        if not self.stopped and self.host.default_num_cmd_retries != 0 and proc_obj.get_num_retries() > 0:
+            logging.warning(f"({self.name}) Process '{proc_name}' failed but we will retry it!")
+            self.run(job_name=proc_name,
+                     cmd=proc_obj.get_command(),
+                     num_retries=proc_obj.get_num_retries()-1,
+                     docker_image=proc_obj.get_docker_image())
+            return self.wait_process(proc_name)
+
+        # Process still failing and cannot be retried anymore
+        logging.error(f"({self.name}) Process '{proc_name}' failed!")
+
+        # Log the output
+        stdout, stderr = proc_obj.get_output()
+        stderr = re.sub(r'@(.|\n)*attacks.', '', stderr)  # remove man-in-middle err
+        logging.debug(f"({self.name}) The following output/error was received:"
+                      f"\n\nSTDOUT:\n{stdout}"
+                      f"\n\nSTDERR:\n{stderr}")
+
+        # Raise an error
+        raise RuntimeError(f"({self.name}) Slot failed at process '{proc_name}'!")
+
+    def set_workspace(self, wrk_dir, wrk_log_dir, wrk_out_dir):
+        self.wrk_dir = wrk_dir
+        self.wrk_log_dir = wrk_log_dir
+        self.wrk_out_dir = wrk_out_dir
+        if wrk_dir is not None and wrk_dir not in self.wrk_dirs:
+            self.wrk_dirs.append(wrk_dir)
+
+    def get_workspaces(self):
+        return self.wrk_dirs
+
+    def add_checkpoint(self, clear_output=True):
+        # Slots don't survive host failures, so checkpoints are only recorded
+        self.checkpoints.append((next(reversed(self.processes)), clear_output))
+
+    def stop(self):
+        # Stop running commands of the slot, leaving the host and its other slots untouched
+        self.stopped = True
+        running_containers = False
+        for proc_name, proc_obj in list(self.processes.items()):
+            if proc_obj.poll() is None:
+                logging.debug(f"({self.name}) Killing process '{proc_name}'!")
+                proc_obj.kill()
+                running_containers = running_containers or proc_obj.get_docker_image() is not None
+
+        # Killing a command only kills its SSH client, so its container is killed on the host as well
+        # Otherwise the container would keep using the resources and workspace given back with the slot
+        if running_containers:
+            try:
+                self.host.kill_containers(self.agent_owner, log_name=self.name)
+            except BaseException as e:
+                logging.warning(f"({self.name}) Unable to kill the docker containers of the slot!")
+                if str(e) != "":
+                    logging.warning(f"Received the following message:\n{e}")
+
+    def destroy(self):
+        # Give the slot back to the platform, once its commands are stopped
+        if not self.released:
+            if not self.stopped:
+                self.stop()
+            self.released = True
+            self.stop_time = self.platform.clock.now()
+            self.platform.release_slot(self)
+
+    def cache_file(self, remote_path, local_path):
+        # Workspace of the slot is removed once the slot is released, so files are never cached
+        pass
+
+    def get_cached_file(self, remote_path):
+        return None
+
+    def has_cached_files(self):
+        return False
+
+    def compute_cost(self, start_time=None, end_time=None):
+        # Cost of the slot is the share of the host cost corresponding to the CPUs of the slot
+        start_time = self.start_time if start_time is None else max(start_time, self.start_time)
+        end_time = self.get_stop_time() if end_time is None else min(end_time, self.get_stop_time())
+        host_cost = self.host.compute_cost(start_time=start_time, end_time=end_time)
+        return host_cost * float(self.nr_cpus) / self.host.nr_cpus
+
+    def get_name(self):
+        return self.name
+
+    def get_host(self):
+        return self.host
+
+    def get_start_time(self):
+        return self.start_time
+
+    def get_stop_time(self):
+        return self.platform.clock.now() if self.stop_time is None else self.stop_time
+
+    def get_runtime(self):
+        return self.get_stop_time() - self.get_start_time()
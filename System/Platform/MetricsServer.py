@@ -0,0 +1,97 @@
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class MetricsServer(object):
+    # Local HTTP endpoint exposing the live state of the pipeline in the Prometheus text format
+    # Metrics are gathered from their sources (e.g. Scheduler, CloudPlatform) every time the endpoint is scraped
+    # Each source provides a get_metrics() method returning a list of metrics created by MetricsServer.metric()
+
+    def __init__(self, port, sources, host="127.0.0.1"):
+
+        # Address where the endpoint is served
+        self.host = host
+        self.port = port
+
+        # Objects providing the metrics
+        self.sources = sources
+
+        # HTTP server and the thread serving it
+        self.server = None
+        self.server_thread = None
+
+    def start(self):
+        metrics_server = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+
+            def do_GET(self):
+                if self.path.split("?")[0] not in ["/", "/metrics"]:
+                    self.send_error(404)
+                    return
+
+                body = metrics_server.render().encode("utf8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                # Scrapes are too frequent to be logged
+                pass
+
+        try:
+            self.server = ThreadingHTTPServer((self.host, self.port), MetricsHandler)
+        except BaseException as e:
+            # Metrics are only used for monitoring, so the pipeline runs without them
+            logging.warning("Unable to serve metrics on port %s! Pipeline will run without metrics." % self.port)
+            if str(e) != "":
+                logging.warning("Received the following message:\n%s" % e)
+            self.server = None
+            return
+
+        self.server.daemon_threads = True
+        self.server_thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.server_thread.start()
+        logging.info("Serving metrics at http://%s:%s/metrics" % (self.host, self.server.server_address[1]))
+
+    def stop(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+    def render(self):
+        # Return current metrics of all sources in the Prometheus text format
+        lines = []
+        for source in self.sources:
+            try:
+                metrics = source.get_metrics()
+            except BaseException as e:
+                logging.debug("Unable to collect metrics from %s: %s" % (source.__class__.__name__, e))
+                continue
+
+            for name, metric_type, description, samples in metrics:
+                lines.append("# HELP %s %s" % (name, description))
+                lines.append("# TYPE %s %s" % (name, metric_type))
+                for labels, value in samples:
+                    lines.append("%s%s %s" % (name, self.__format_labels(labels), float(value)))
+
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def metric(name, metric_type, description, samples):
+        # Create metric from its samples, given as (labels, value) pairs or as a single value without labels
+        if not isinstance(samples, list):
+            samples = [({}, samples)]
+        return name, metric_type, description, samples
+
+    @staticmethod
+    def __format_labels(labels):
+        if len(labels) == 0:
+            return ""
+        labels = ",".join('%s="%s"' % (key, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+                          for key, value in labels.items())
+        return "{%s}" % labels
@@ -2,6 +2,8 @@ import logging
 
 import subprocess as sp
 
+from System.Platform.ProcessSupervisor import ProcessSupervisor
+
 
 class Process(sp.Popen):
 
@@ -12,6 +14,9 @@ class Process(sp.Popen):
         self.num_retries = kwargs.pop("num_retries", 0)
         self.docker_image = kwargs.pop("docker_image", None)
 
+        # Maximum number of bytes of each output stream kept in memory (None = unbounded)
+        self.output_limit = kwargs.pop("output_limit", None)
+
         # Initialize process status
         self.complete = False
         self.to_rerun = False
@@ -20,8 +25,14 @@ class Process(sp.Popen):
         self.out = ""
         self.err = ""
 
+        # Whether part of the output or error was dropped to stay within the output limit
+        self.truncated = False
+
         super(Process, self).__init__(*args, **kwargs)
 
+        # Output is collected by the process supervisor, so no thread blocks on the process until its result is needed
+        self.future = ProcessSupervisor.get_supervisor().supervise(self, self.output_limit)
+
     def is_complete(self):
         return self.complete
 
@@ -32,11 +43,12 @@ class Process(sp.Popen):
             return
 
         # Wait for process to finish
-        out, err = self.communicate()
+        out, err = self.future.result()
 
-        # Save output and error
-        self.out = out.decode("utf8")
-        self.err = err.decode("utf8")
+        # Save output and error (truncated outputs might end in the middle of a character)
+        self.out = out.get_value().decode("utf8", errors="replace")
+        self.err = err.get_value().decode("utf8", errors="replace")
+        self.truncated = out.is_truncated() or err.is_truncated()
 
         # Set process to complete
         self.complete = True
@@ -49,6 +61,13 @@ class Process(sp.Popen):
         # Check if failure
         return ret_code is not None and ret_code != 0
 
+    def get_future(self):
+        # Return future resolved with the raw output and error (as BoundedOutput) once the process exits
+        return self.future
+
+    def is_truncated(self):
+        return self.truncated
+
     def get_command(self):
         return self.command
 
@@ -0,0 +1,171 @@
+import asyncio
+import concurrent.futures
+import logging
+import os
+import threading
+from collections import deque
+
+
+class BoundedOutput(object):
+    # Output of a process kept within a maximum number of bytes
+    # Once the limit is reached, the beginning and the end of the output are kept and the middle is dropped
+
+    def __init__(self, limit=None):
+
+        # Maximum number of bytes kept (None or 0 = unbounded)
+        self.limit = limit if limit else None
+
+        # Beginning of the output, end of the output and number of bytes dropped in between
+        self.head       = bytearray()
+        self.tail       = deque()
+        self.tail_size  = 0
+        self.dropped    = 0
+
+    def append(self, data):
+        if self.limit is None:
+            self.head += data
+            return
+
+        # Fill the beginning of the output first
+        head_limit = self.limit // 2
+        if len(self.head) < head_limit:
+            head_size = head_limit - len(self.head)
+            self.head += data[:head_size]
+            data = data[head_size:]
+
+        if len(data) == 0:
+            return
+
+        # Keep only the latest bytes at the end of the output
+        self.tail.append(bytes(data))
+        self.tail_size += len(data)
+        tail_limit = self.limit - head_limit
+        while self.tail_size > tail_limit:
+            excess = self.tail_size - tail_limit
+            if len(self.tail[0]) <= excess:
+                chunk = self.tail.popleft()
+                self.tail_size -= len(chunk)
+                self.dropped += len(chunk)
+            else:
+                self.tail[0] = self.tail[0][excess:]
+                self.tail_size -= excess
+                self.dropped += excess
+
+    def is_truncated(self):
+        return self.dropped > 0
+
+    def get_value(self):
+        if self.dropped == 0:
+            return bytes(self.head) + b"".join(self.tail)
+        return bytes(self.head) + (b"\n... [%d bytes truncated] ...\n" % self.dropped) + b"".join(self.tail)
+
+
+class ProcessSupervisor(object):
+    # Event loop running in a background thread, collecting output and exit status of local child processes
+    # Output pipes are read without blocking any thread, and the result of each process is delivered through a future
+    # A single supervisor is shared by all processes
+
+    # Number of bytes read from a pipe at once
+    READ_SIZE = 65536
+
+    # Seconds between two checks of the exit status of a process once its pipes are closed
+    MIN_POLL_INTERVAL = 0.05
+    MAX_POLL_INTERVAL = 1
+
+    # Supervisor shared by all processes
+    __supervisor        = None
+    __supervisor_lock   = threading.Lock()
+
+    def __init__(self):
+
+        # Event loop and thread running it
+        self.loop   = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.__run_loop, name="ProcessSupervisor", daemon=True)
+        self.thread.start()
+
+        # Number of processes currently supervised
+        self.nr_supervised = 0
+
+    @staticmethod
+    def get_supervisor():
+        # Return supervisor shared by all processes, started on first use
+        with ProcessSupervisor.__supervisor_lock:
+            if ProcessSupervisor.__supervisor is None:
+                ProcessSupervisor.__supervisor = ProcessSupervisor()
+            return ProcessSupervisor.__supervisor
+
+    def get_nr_supervised(self):
+        return self.nr_supervised
+
+    def supervise(self, proc, output_limit=None):
+        # Collect output of a process started with pipes and return future resolved once it exits
+        # Future result is the pair of BoundedOutput holding the stdout and stderr of the process
+        future = concurrent.futures.Future()
+        self.loop.call_soon_threadsafe(self.__watch, proc, output_limit, future)
+        return future
+
+    def __run_loop(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def __watch(self, proc, output_limit, future):
+        # Start reading the pipes of a process (runs in the event loop)
+        self.nr_supervised += 1
+        outputs = [BoundedOutput(output_limit), BoundedOutput(output_limit)]
+        pipes = [pipe for pipe in [proc.stdout, proc.stderr]]
+        state = {"open_pipes": 0, "poll_interval": self.MIN_POLL_INTERVAL}
+
+        try:
+            for pipe, output in zip(pipes, outputs):
+                if pipe is None:
+                    continue
+                os.set_blocking(pipe.fileno(), False)
+                self.loop.add_reader(pipe.fileno(), self.__read, proc, pipe, output, outputs, state, future)
+                state["open_pipes"] += 1
+        except BaseException as e:
+            self.__fail(future, e)
+            return
+
+        if state["open_pipes"] == 0:
+            self.__check_exit(proc, outputs, state, future)
+
+    def __read(self, proc, pipe, output, outputs, state, future):
+        # Read available output of a pipe (runs in the event loop)
+        try:
+            data = os.read(pipe.fileno(), self.READ_SIZE)
+        except BlockingIOError:
+            return
+        except BaseException as e:
+            data = b""
+            logging.debug("Unable to read output of process %s: %s" % (proc.pid, e))
+
+        if len(data) > 0:
+            output.append(data)
+            return
+
+        # Pipe is closed once the process and its children stopped writing to it
+        self.loop.remove_reader(pipe.fileno())
+        pipe.close()
+        state["open_pipes"] -= 1
+        if state["open_pipes"] == 0:
+            self.__check_exit(proc, outputs, state, future)
+
+    def __check_exit(self, proc, outputs, state, future):
+        # Resolve future once the process has exited, checking again later otherwise (runs in the event loop)
+        try:
+            returncode = proc.poll()
+        except BaseException as e:
+            self.__fail(future, e)
+            return
+
+        if returncode is None:
+            self.loop.call_later(state["poll_interval"], self.__check_exit, proc, outputs, state, future)
+            state["poll_interval"] = min(state["poll_interval"] * 2, self.MAX_POLL_INTERVAL)
+            return
+
+        self.nr_supervised -= 1
+        future.set_result((outputs[0], outputs[1]))
+
+    def __fail(self, future, e):
+        self.nr_supervised -= 1
+        future.set_exception(e)
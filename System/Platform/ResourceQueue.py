@@ -0,0 +1,75 @@
+import itertools
+import logging
+
+
+class ResourceRequest(object):
+    # Class for holding the resources requested by an instance waiting to be created
+
+    def __init__(self, name, nr_cpus, mem, disk_space, priority=0):
+        self.name       = name
+        self.nr_cpus    = nr_cpus
+        self.mem        = mem
+        self.disk_space = disk_space
+
+        # Higher priority requests are served first by the 'priority' policy
+        self.priority   = priority
+
+        # Position of the request in order of arrival (set by the queue)
+        self.arrival    = None
+
+    def get_name(self):
+        return self.name
+
+    def get_priority(self):
+        return self.priority
+
+
+class ResourceQueue(object):
+    # Queue of requests waiting for platform resources
+    # The policy decides which request is next in line to reserve resources:
+    #   fifo:       Order of arrival
+    #   smallest:   Smallest request (CPUs, then memory, then disk space) first
+    #   priority:   Highest priority first
+
+    POLICIES = ["fifo", "smallest", "priority"]
+
+    def __init__(self, policy="fifo"):
+
+        if policy not in self.POLICIES:
+            logging.error("Invalid resource queue policy '%s'! Available policies: %s" % (policy, ", ".join(self.POLICIES)))
+            raise RuntimeError("Invalid resource queue policy '%s'!" % policy)
+
+        self.policy = policy
+
+        # Requests currently waiting in the queue
+        self.requests = []
+
+        # Counter for recording order of arrival
+        self.__arrivals = itertools.count()
+
+    def add(self, request):
+        request.arrival = next(self.__arrivals)
+        self.requests.append(request)
+
+    def remove(self, request):
+        if request in self.requests:
+            self.requests.remove(request)
+
+    def get_next(self):
+        # Return the request that is next in line to reserve resources
+        if len(self.requests) == 0:
+            return None
+        return min(self.requests, key=self.__sort_key)
+
+    def get_policy(self):
+        return self.policy
+
+    def __len__(self):
+        return len(self.requests)
+
+    def __sort_key(self, request):
+        if self.policy == "smallest":
+            return request.nr_cpus, request.mem, request.disk_space, request.arrival
+        elif self.policy == "priority":
+            return -request.priority, request.arrival
+        return request.arrival,
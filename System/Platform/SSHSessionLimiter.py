@@ -0,0 +1,44 @@
+import threading
+
+
+class SSHSessionLimiter(object):
+    # Limits the number of SSH sessions sent at the same time through the master connection of an instance
+    # sshd refuses sessions beyond its MaxSessions setting (10 by default) and the client exits with code 255,
+    # so sessions beyond the limit open their own direct connection instead of going through the master connection
+
+    def __init__(self, control_path, max_sessions):
+
+        # Local socket of the master connection (None = sessions always open their own connection)
+        self.control_path = control_path
+
+        # Maximum number of sessions sent through the master connection at the same time
+        self.max_sessions = max_sessions
+
+        # Number of sessions currently sent through the master connection
+        self.nr_sessions    = 0
+        self.sessions_lock  = threading.Lock()
+
+    def acquire(self):
+        # Return SSH options sending a new session through the master connection ("" = direct connection)
+        # With ControlMaster=no, the session is opened directly whenever the master connection isn't available
+        if self.control_path is None:
+            return ""
+
+        with self.sessions_lock:
+            if self.nr_sessions >= self.max_sessions:
+                return ""
+            self.nr_sessions += 1
+
+        return f"-o ControlMaster=no -o ControlPath={self.control_path}"
+
+    def release(self, mux_options):
+        # Give back a session obtained from acquire() once the SSH command has exited
+        if mux_options == "":
+            return
+
+        with self.sessions_lock:
+            self.nr_sessions = max(self.nr_sessions - 1, 0)
+
+    def get_nr_sessions(self):
+        with self.sessions_lock:
+            return self.nr_sessions
@@ -0,0 +1,173 @@
+import logging
+import random
+from collections import OrderedDict
+
+from System.Platform import CloudInstance
+from System.Platform.Simulated import SimulatedProcess
+
+
+class SimulatedInstance(CloudInstance):
+    # Instance of a simulated platform
+    # Boot, SSH and destroy latencies are waited for on the simulation clock and commands are not actually run
+
+    def __init__(self, name, nr_cpus, mem, disk_space, disk_image, **kwargs):
+
+        super(SimulatedInstance, self).__init__(name, nr_cpus, mem, disk_space, disk_image, **kwargs)
+
+        # Parameters of the simulation
+        self.simulation = self.platform.SIMULATION
+
+        # Platform extra values are read from config as strings
+        self.is_preemptible = str(kwargs.get("preemptible", False)).lower() == "true"
+
+        # Current status of the instance
+        self.status = CloudInstance.OFF
+
+        # Number of times the instance was preempted
+        self.nr_preemptions = 0
+
+    def create(self):
+
+        # Allocate resources on the platform for current instance (unless already reserved)
+        if not self.resources_allocated:
+            self.platform.allocate_resources(self.nr_cpus, self.mem, self.disk_space)
+            self.resources_allocated = True
+
+        # Create the actual instance
+        self.external_IP = self.create_instance()
+        self.__add_history_event("CREATE")
+
+        # Wait until instance can be accessed through SSH
+        self.__wait_until_ready()
+
+        # Run post_startup_tasks
+        self.post_startup()
+
+        return self
+
+    def destroy(self):
+
+        # Nothing to do if instance doesn't exist anymore
+        if self.status in [CloudInstance.OFF, CloudInstance.TERMINATED] and len(self.history) > 0:
+            self.release_resources()
+            return
+
+        # Commands cannot run on a destroyed instance
+        for proc_obj in list(self.processes.values()):
+            proc_obj.kill()
+
+        self.destroy_instance()
+        self.release_resources()
+        self.__add_history_event("DESTROY")
+
+    def start(self):
+        self.__add_history_event("START")
+        self.external_IP = self.start_instance()
+        self.__wait_until_ready()
+
+    def stop(self):
+        self.stop_instance()
+        self.__add_history_event("STOP")
+
+    def check_ssh(self):
+        return self.status == CloudInstance.AVAILABLE
+
+    def prune_workspace(self):
+        # Simulated commands don't report disk usage, so only the disk image is assumed to take space afterwards
+        self.run("prune_workspace", "prune_workspace")
+        self.wait_process("prune_workspace")
+
+        self.processes = OrderedDict()
+        self.checkpoints = []
+        self.free_disk_space = self.disk_space - self.platform.get_disk_image_size()
+        self.set_workspace(wrk_dir="/data", wrk_log_dir="/data/log", wrk_out_dir="/data/output")
+
+    def start_process(self, job_name, cmd, num_retries=None, docker_image=None, wrk_dir=None, wrk_log_dir=None, log_name=None,
+                      nr_cpus=None, mem=None, owner=None):
+        # Start simulated process lasting as long as the command is expected to run
+        log_name = self.name if log_name is None else log_name
+        duration = self.platform.get_process_duration(job_name)
+
+        # Determine when the instance will be preempted (commands fail immediately on unavailable instances)
+        preempt_after = None
+        if self.status != CloudInstance.AVAILABLE:
+            preempt_after = 0
+        elif self.is_preemptible and self.simulation["PREEMPTION_RATE"] > 0:
+            preempt_after = random.expovariate(self.simulation["PREEMPTION_RATE"] / 3600.0)
+
+        logging.info("(%s) Process '%s' started!" % (log_name, job_name))
+        logging.debug("(%s) Process '%s' will run for %s simulated seconds and has the following command:\n    %s" %
+                      (log_name, job_name, round(duration), cmd))
+
+        return SimulatedProcess(cmd, duration, self.platform.clock,
+                                preempt_after=preempt_after,
+                                num_retries=self.default_num_cmd_retries if num_retries is None else num_retries,
+                                docker_image=docker_image)
+
+    def handle_failure(self, proc_name, proc_obj):
+        can_retry = super(SimulatedInstance, self).handle_failure(proc_name, proc_obj)
+
+        # Restart preempted instance before retrying the command
+        if proc_obj.returncode == SimulatedProcess.PREEMPTED_RETURN_CODE and self.is_preemptible:
+            logging.warning("(%s) Instance preempted! Resetting..." % self.name)
+            self.nr_preemptions += 1
+            self.stop()
+            self.start()
+
+        return can_retry
+
+    def create_instance(self):
+        self.status = CloudInstance.CREATING
+        self.platform.clock.sleep(self.simulation["BOOT_LATENCY"])
+        return self.__generate_ip()
+
+    def destroy_instance(self):
+        self.status = CloudInstance.DESTROYING
+        self.platform.clock.sleep(self.simulation["DESTROY_LATENCY"])
+        self.status = CloudInstance.TERMINATED
+
+    def start_instance(self):
+        self.status = CloudInstance.CREATING
+        self.platform.clock.sleep(self.simulation["BOOT_LATENCY"])
+        return self.__generate_ip()
+
+    def stop_instance(self):
+        for proc_obj in list(self.processes.values()):
+            proc_obj.kill()
+        self.status = CloudInstance.OFF
+
+    def get_status(self, log_status=False):
+        if log_status:
+            logging.debug(f"({self.name}) Current status is: {CloudInstance.STATUSES[self.status]}")
+        return self.status
+
+    def get_compute_price(self):
+        # Hourly price of the instance
+        price = self.simulation["CPU_PRICE"] * self.nr_cpus + self.simulation["MEM_PRICE"] * self.mem
+        if self.is_preemptible:
+            price *= self.simulation["PREEMPTIBLE_DISCOUNT"]
+        return price
+
+    def get_storage_price(self):
+        # Hourly price of the disk (storage price is given per month)
+        return self.simulation["STORAGE_PRICE"] / 730 * self.disk_space
+
+    def __wait_until_ready(self):
+        self.platform.clock.sleep(self.simulation["SSH_LATENCY"])
+        self.status = CloudInstance.AVAILABLE
+        self.ssh_ready = True
+        logging.debug(f'({self.name}) Instance can be accessed through SSH!')
+
+    def __add_history_event(self, _type):
+        self.history.append({
+            "type": _type,
+            "timestamp": self.platform.clock.now(),
+            "price": {
+                "compute": self.get_compute_price(),
+                "storage": self.get_storage_price()
+            }
+        })
+
+    @staticmethod
+    def __generate_ip():
+        return "10.%d.%d.%d" % (random.randint(0, 255), random.randint(0, 255), random.randint(1, 254))
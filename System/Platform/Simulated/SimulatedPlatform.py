@@ -0,0 +1,162 @@
+import json
+import logging
+import os
+import re
+from threading import Thread
+
+from System.Graph import RuntimeHistory
+from System.Platform import CloudPlatform
+from System.Platform.Simulated import SimulationClock, SimulatedInstance
+
+
+class SimulatedPlatform(CloudPlatform):
+    # Platform predicting the makespan and cost of a pipeline without running anything on the cloud
+    # Instances and commands are simulated on a virtual clock, which the scheduler and task workers wait on as well
+    # Command runtimes are taken from the reports of previous runs (see 'runtime_history' in the platform config)
+
+    # Commands transferring files, whose runtime is given by 'transfer_time'
+    TRANSFER_JOBS = ["load_input_", "link_input_", "save_output_", "docker_pull_", "return_logs", "mv_"]
+
+    def __init__(self, name, platform_config_file, final_output_dir):
+
+        # Initialize the base class
+        super(SimulatedPlatform, self).__init__(name, platform_config_file, final_output_dir)
+
+        # Obtain the simulation parameters (durations in simulated seconds, prices in dollars per hour)
+        self.SIMULATION = {
+            "BOOT_LATENCY"          : float(self.extra.get("boot_latency", 60)),
+            "SSH_LATENCY"           : float(self.extra.get("ssh_latency", 30)),
+            "DESTROY_LATENCY"       : float(self.extra.get("destroy_latency", 30)),
+            "PREEMPTION_RATE"       : float(self.extra.get("preemption_rate", 0)),
+            "TRANSFER_TIME"         : float(self.extra.get("transfer_time", 60)),
+            "COMMAND_TIME"          : float(self.extra.get("command_time", 1)),
+            "CPU_PRICE"             : float(self.extra.get("cpu_price", 0.033)),
+            "MEM_PRICE"             : float(self.extra.get("mem_price", 0.0045)),
+            "STORAGE_PRICE"         : float(self.extra.get("storage_price", 0.04)),
+            "PREEMPTIBLE_DISCOUNT"  : float(self.extra.get("preemptible_discount", 0.3)),
+            "DISK_IMAGE_SIZE"       : int(self.extra.get("disk_image_size", 10))
+        }
+
+        # Runtimes of the tasks in previous runs
+        self.runtime_history = RuntimeHistory(self.config.get("runtime_history", None))
+        if not self.runtime_history.has_history():
+            logging.warning("No runtime history provided to the simulated platform! "
+                            "Every task will run for %s seconds." % self.runtime_history.default_runtime)
+
+    def get_process_duration(self, job_name):
+        # Return simulated duration of a command based on its job name
+        if any(job_name.startswith(prefix) for prefix in self.TRANSFER_JOBS):
+            return self.SIMULATION["TRANSFER_TIME"]
+
+        # Task commands are named after their task, optionally followed by the number of the command
+        task_id = job_name
+        if task_id.split(".")[0] not in self.runtime_history.median_runtimes:
+            task_id = re.sub(r"_\d+$", "", task_id)
+        if task_id.split(".")[0] in self.runtime_history.median_runtimes:
+            return self.runtime_history.estimate_task_runtime(task_id)
+
+        # Remaining commands are infrastructure commands (mkdir, permissions, sizes, etc.)
+        return self.SIMULATION["COMMAND_TIME"]
+
+    def get_random_zone(self):
+        return f"{self.region}-simulated"
+
+    def get_clock(self):
+        return SimulationClock()
+
+    def get_disk_image_size(self):
+        return self.SIMULATION["DISK_IMAGE_SIZE"]
+
+    def get_cloud_instance_class(self):
+        return SimulatedInstance
+
+    def authenticate_platform(self):
+        # Nothing to authenticate against
+        pass
+
+    def validate(self):
+        # Nothing to validate, as instances are never created on a cloud
+        pass
+
+    @staticmethod
+    def standardize_instance(inst_name, nr_cpus, mem, disk_space):
+
+        # Ensure instance name does not contain weird characters
+        inst_name = inst_name.replace("_", "-").replace(".", "-").lower()
+
+        return inst_name, nr_cpus, mem, disk_space
+
+    def publish_report(self, report_path):
+
+        # Read the pipeline report
+        with open(report_path) as inp:
+            report = json.load(inp)
+
+        # Runtimes in the pipeline report are measured on the simulation clock
+        prediction = {
+            "pipeline_id"       : report.get("pipeline_id"),
+            "status"            : report.get("status"),
+            "makespan(sec)"     : report.get("total_runtime", 0),
+            "total_cost"        : report.get("total_cost", 0),
+            "total_proc_time"   : report.get("total_proc_time", 0),
+            "nr_instances"      : len([inst for inst in self.instances.values() if inst is not None]),
+            "nr_preemptions"    : sum(inst.nr_preemptions for inst in self.instances.values() if inst is not None),
+            "peak_resources"    : self.__get_peak_resources(),
+            "tasks"             : [{"name"          : task.get("name"),
+                                    "runtime(sec)"  : float(task.get("runtime(sec)") or 0),
+                                    "cost"          : task.get("cost")} for task in report.get("tasks", [])]
+        }
+
+        # Write the prediction next to the pipeline report
+        prediction_path = "%s_simulation.json" % os.path.splitext(report_path)[0]
+        with open(prediction_path, "w") as out:
+            json.dump(prediction, out, indent=4)
+
+        logging.info("Simulated run: makespan of %s hours and cost of $%s. Prediction saved to '%s'." %
+                     (round(prediction["makespan(sec)"] / 3600, 2), round(prediction["total_cost"], 2), prediction_path))
+
+    def push_log(self, log_path):
+        # Log stays local, as there is no final output directory on a simulated platform
+        pass
+
+    def clean_up(self):
+
+        # Initialize the list of threads
+        destroy_threads = []
+
+        # Launch the destroy process for each instance
+        for name, instance_obj in self.instances.items():
+            if instance_obj is None:
+                continue
+
+            thr = Thread(target=instance_obj.destroy, daemon=True)
+            thr.start()
+            destroy_threads.append(thr)
+
+        # Wait for all threads to finish
+        for _thread in destroy_threads:
+            _thread.join()
+
+    def __get_peak_resources(self):
+        # Return the maximum resources used at the same time by the simulated instances
+        events = []
+        for instance in self.instances.values():
+            if instance is None:
+                continue
+            for event in instance.history:
+                if event["type"] in ["CREATE", "START"]:
+                    events.append((event["timestamp"], 1, instance))
+                elif event["type"] in ["DESTROY", "STOP"]:
+                    events.append((event["timestamp"], -1, instance))
+
+        # Sweep over the events in time order, releasing resources before allocating new ones at the same time
+        peak = {"nr_cpus": 0, "mem": 0, "disk_space": 0}
+        curr = {"nr_cpus": 0, "mem": 0, "disk_space": 0}
+        for _, sign, instance in sorted(events, key=lambda event: (event[0], event[1])):
+            curr["nr_cpus"] += sign * instance.nr_cpus
+            curr["mem"] += sign * instance.mem
+            curr["disk_space"] += sign * instance.disk_space
+            for key in peak:
+                peak[key] = max(peak[key], curr[key])
+
+        return peak
@@ -0,0 +1,100 @@
+import threading
+
+
+class SimulatedProcess(object):
+    # Process "running" a command on a simulated instance for a given simulated duration
+    # Provides the interface of Process without running anything
+
+    # Return code of processes interrupted by a preemption of their instance (same as a dropped SSH connection)
+    PREEMPTED_RETURN_CODE   = 255
+
+    # Return code of killed processes
+    KILLED_RETURN_CODE      = -9
+
+    def __init__(self, cmd, duration, clock, preempt_after=None, num_retries=0, docker_image=None):
+
+        # Retrieve CloudConductor specific values
+        self.command = cmd
+        self.num_retries = num_retries
+        self.docker_image = docker_image
+
+        # Process is interrupted if its instance is preempted before the command finishes
+        self.preempted = preempt_after is not None and preempt_after < duration
+        self.duration = preempt_after if self.preempted else duration
+
+        # Simulated time when the process finishes
+        self.clock = clock
+        self.end_time = clock.now() + self.duration
+
+        # Event set when process is killed before finishing
+        self.killed = threading.Event()
+        self.returncode = None
+
+        # Initialize process status
+        self.complete = False
+        self.to_rerun = False
+
+        # Initialize output and err values
+        self.out = ""
+        self.err = ""
+
+    def poll(self):
+        # Return code of the process (None if process is still running)
+        if self.returncode is None and self.clock.now() >= self.end_time:
+            if self.preempted:
+                self.returncode = self.PREEMPTED_RETURN_CODE
+                self.err = "Connection closed by remote host (simulated preemption)"
+            else:
+                self.returncode = 0
+        return self.returncode
+
+    def kill(self):
+        if self.poll() is None:
+            self.returncode = self.KILLED_RETURN_CODE
+            self.killed.set()
+
+    def is_complete(self):
+        return self.complete
+
+    def wait_completion(self):
+
+        # Return immediately if process has already been set to complete
+        if self.complete:
+            return
+
+        # Wait for process to finish or to be killed
+        self.clock.wait(self.killed, timeout=max(self.end_time - self.clock.now(), 0))
+        self.poll()
+
+        # Set process to complete
+        self.complete = True
+
+    def has_failed(self):
+
+        # Obtain process return code
+        ret_code = self.poll()
+
+        # Check if failure
+        return ret_code is not None and ret_code != 0
+
+    def get_command(self):
+        return self.command
+
+    def get_num_retries(self):
+        return self.num_retries
+
+    def get_docker_image(self):
+        return self.docker_image
+
+    def get_output(self):
+        return self.out, self.err
+
+    def is_truncated(self):
+        # Output is never truncated
+        return False
+
+    def set_to_rerun(self):
+        self.to_rerun = True
+
+    def needs_rerun(self):
+        return self.to_rerun
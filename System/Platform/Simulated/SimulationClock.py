@@ -0,0 +1,97 @@
+import queue
+import threading
+import time
+
+from System.Platform.Clock import Clock
+
+
+class SimulationClock(Clock):
+    # Virtual clock of a simulated platform
+    # Time doesn't flow on its own: once every thread waiting on the clock is blocked and nothing else touched the clock
+    # for a short while, the clock jumps to the earliest deadline and wakes the threads waiting for it
+    # Simulated latencies, command runtimes and the polling of the scheduler therefore take no wall-clock time,
+    # while the work done between two waits is considered instantaneous
+
+    # Wall-clock seconds between two checks of the waiting threads
+    CHECK_INTERVAL = 0.01
+
+    # Wall-clock seconds without any thread using the clock after which the clock can move forward
+    QUIESCENCE = 0.05
+
+    def __init__(self):
+
+        # Simulation starts at the current wall-clock time, so that timestamps look like regular ones
+        self.start_time = time.time()
+        self.current_time = self.start_time
+
+        # Threads currently waiting, as [condition checked, deadline (None = no deadline)]
+        self.waiters = []
+        self.clock_lock = threading.Condition()
+
+        # Wall-clock time of the last use of the clock
+        self.last_activity = time.time()
+
+        # Thread moving the clock forward
+        self.driver = threading.Thread(target=self.__drive, name="SimulationClock", daemon=True)
+        self.driver.start()
+
+    def now(self):
+        self.last_activity = time.time()
+        return self.current_time
+
+    def get_elapsed_time(self):
+        # Return number of simulated seconds since the simulation started
+        return self.current_time - self.start_time
+
+    def sleep(self, duration):
+        self.__wait_until(lambda: False, self.now() + max(duration, 0))
+
+    def wait(self, event, timeout=None):
+        return self.__wait_until(event.is_set, None if timeout is None else self.now() + max(timeout, 0))
+
+    def get(self, _queue, timeout=None):
+        deadline = None if timeout is None else self.now() + max(timeout, 0)
+        while True:
+            try:
+                return _queue.get_nowait()
+            except queue.Empty:
+                if not self.__wait_until(lambda: not _queue.empty(), deadline):
+                    raise
+
+    def __wait_until(self, condition, deadline):
+        # Block until condition is met or the clock reaches the deadline, and return whether condition is met
+        waiter = [condition, deadline]
+        with self.clock_lock:
+            self.waiters.append(waiter)
+            self.last_activity = time.time()
+            try:
+                while not condition():
+                    if deadline is not None and self.current_time >= deadline:
+                        return False
+                    self.clock_lock.wait()
+                return True
+            finally:
+                self.waiters.remove(waiter)
+                self.last_activity = time.time()
+
+    def __drive(self):
+        # Move the clock forward whenever all waiting threads are blocked
+        while True:
+            time.sleep(self.CHECK_INTERVAL)
+            with self.clock_lock:
+
+                # Wake up threads whose condition was met by another thread (e.g. event set, item put in queue)
+                if any(condition() for condition, deadline in self.waiters):
+                    self.clock_lock.notify_all()
+                    continue
+
+                # Leave time to threads that are busy outside of the clock
+                if time.time() - self.last_activity < self.QUIESCENCE:
+                    continue
+
+                deadlines = [deadline for condition, deadline in self.waiters if deadline is not None]
+                if len(deadlines) == 0:
+                    continue
+
+                self.current_time = max(self.current_time, min(deadlines))
+                self.clock_lock.notify_all()
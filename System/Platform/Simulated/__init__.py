@@ -0,0 +1,4 @@
+from .SimulationClock import SimulationClock
+from .SimulatedProcess import SimulatedProcess
+from .SimulatedInstance import SimulatedInstance
+from .SimulatedPlatform import SimulatedPlatform
@@ -19,8 +19,7 @@ class StorageHelper(object):
     def mv(self, src_path, dest_path, job_name=None, log=True, wait=False, **kwargs):
         # Transfer file or dir from src_path to dest_path
         # Log the transfer unless otherwise specified
-        cmd_generator = StorageHelper.__get_storage_cmd_generator(src_path, dest_path)
-        cmd = cmd_generator.mv(src_path, dest_path)
+        cmd = self.get_mv_cmd(src_path, dest_path)
 
         job_name = f"mv_{CloudPlatform.generate_unique_id()}" if job_name is None else job_name
 
@@ -33,10 +32,54 @@ class StorageHelper(object):
             self.proc.wait_process(job_name)
         return job_name
 
+    def copy(self, src_path, dest_dir):
+        # Copy remote file or folder from src_path into remote directory dest_dir
+        # Transfer happens from the current process between storage locations without requiring a processor
+        if self.__get_file_protocol(src_path) == "Local" or self.__get_file_protocol(dest_dir) == "Local":
+            logging.error(f"Unable to copy '{src_path}' to '{dest_dir}' without a processor as one of the paths is local!")
+            raise RuntimeError("Local paths can only be transferred by a processor!")
+
+        # Path of file/folder after copy
+        dest_path = os.path.join(dest_dir, os.path.basename(src_path.rstrip("/")))
+
+        try:
+            _file = StorageFile(src_path)
+            if _file.exists():
+                _file.copy(dest_path)
+            else:
+                StorageFolder(src_path).copy(dest_path, contents_only=True)
+
+        except BaseException as e:
+            logging.error(f"Unable to copy path '{src_path}' to '{dest_dir}'")
+            if str(e) != "":
+                logging.error(f"Received the following msg:\n{e}")
+            raise
+
+        return dest_path
+
+    def upload(self, local_path, dest_path):
+        # Copy local file to dest_path in remote storage from the current process
+        try:
+            StorageFile(local_path).copy(dest_path)
+        except BaseException as e:
+            logging.error(f"Unable to upload '{local_path}' to '{dest_path}'")
+            if str(e) != "":
+                logging.error(f"Received the following msg:\n{e}")
+            raise
+
+    def download(self, src_path, local_path):
+        # Copy remote file src_path to a local file from the current process
+        try:
+            StorageFile(src_path).copy(local_path)
+        except BaseException as e:
+            logging.error(f"Unable to download '{src_path}' to '{local_path}'")
+            if str(e) != "":
+                logging.error(f"Received the following msg:\n{e}")
+            raise
+
     def mkdir(self, dir_path, job_name=None, log=False, wait=False, **kwargs):
         # Makes a directory if it doesn't already exists
-        cmd_generator = StorageHelper.__get_storage_cmd_generator(dir_path)
-        cmd = cmd_generator.mkdir(dir_path)
+        cmd = self.get_mkdir_cmd(dir_path)
 
         if cmd is None:
             return None
@@ -125,6 +168,16 @@ class StorageHelper(object):
             logging.error(f"Unable to delete path: {path}")
             raise
 
+    @staticmethod
+    def get_mv_cmd(src_path, dest_path):
+        # Return command transferring file or dir from src_path to dest_path
+        return StorageHelper.__get_storage_cmd_generator(src_path, dest_path).mv(src_path, dest_path)
+
+    @staticmethod
+    def get_mkdir_cmd(dir_path):
+        # Return command making a directory (None if the storage has no concept of directories)
+        return StorageHelper.__get_storage_cmd_generator(dir_path).mkdir(dir_path)
+
     @staticmethod
     def __get_storage_cmd_generator(src_path, dest_path=None):
         # Determine the class of file handler to use base on input file protocol types
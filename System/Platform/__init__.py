@@ -1,7 +1,11 @@
+from .ProcessSupervisor import ProcessSupervisor
 from .Process import Process
+from .Clock import Clock
 
 from .CloudPlatform import CloudPlatform
 from .CloudInstance import CloudInstance
 
 from .StorageHelper import StorageHelper
 from .DockerHelper import DockerHelper
+
+from .MetricsServer import MetricsServer
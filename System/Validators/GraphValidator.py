@@ -9,6 +9,10 @@ class GraphValidator(Validator):
         self.graph      = graph
         self.resources  = resource_kit
         self.samples    = sample_data
+
+        # Source of every task argument (e.g. Module_Output, Resource_Kit), indexed by task and argument
+        self.argument_sources = {}
+
         super(GraphValidator, self).__init__()
 
     def validate(self):
@@ -57,6 +61,9 @@ class GraphValidator(Validator):
 
         return has_errors
 
+    def get_argument_sources(self):
+        return self.argument_sources
+
     def __check_docker_image(self, task):
         # Check to make sure docker image declared in graph config actually exists in resource kit
         docker_image = task.get_docker_image_id()
@@ -141,6 +148,7 @@ class GraphValidator(Validator):
         args = task.module.get_arguments()
 
         # Check if each argument can be found in any of the sources
+        self.argument_sources[task_id] = {}
         for arg_key, arg_obj in args.items():
 
             # Priority of checking for argument
@@ -175,8 +183,10 @@ class GraphValidator(Validator):
                         task_id, arg_key, input_source_names[_source], fill=20, fill_large=30
                     ))
                     found = True
+                    self.argument_sources[task_id][arg_key] = input_source_names[_source]
                     break
             else:
+                self.argument_sources[task_id][arg_key] = "Default_Value ({0})".format(arg_obj.get_default_value())
                 if arg_obj.get_default_value() is not None:
                     logging.debug("Task: {0: >{fill}} | Key: {1: >{fill}} | Input Source: {2: >{fill_large}} |".format(
                         task_id, arg_key, "Default_Value ({0})".format(arg_obj.get_default_value()), fill=20, fill_large=30
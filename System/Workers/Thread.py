@@ -2,7 +2,6 @@ import threading
 import queue
 import logging
 import sys
-import time
 import abc
 
 
@@ -20,8 +19,7 @@ class Thread(threading.Thread, metaclass=abc.ABCMeta):
         self.err_msg = err_msg
 
         # Thread status
-        self.finished_lock  = threading.Lock()
-        self.finished = False
+        self.finished = threading.Event()
 
     def run(self):
         try:
@@ -35,21 +33,19 @@ class Thread(threading.Thread, metaclass=abc.ABCMeta):
         else:
             self.exception_queue.put(None)
         finally:
-            with self.finished_lock:
-                self.finished = True
+            self.finished.set()
 
     @abc.abstractmethod
     def work(self):
         pass
 
     def is_done(self):
-        with self.finished_lock:
-            return self.finished
+        return self.finished.is_set()
 
     def finalize(self):
 
-        while not self.is_done():
-            time.sleep(2)
+        # Block until the thread has finished working
+        self.finished.wait()
 
         # If exception queue is empty at this point, then the thread has been finalized already
         if not self.exception_queue.empty():
@@ -0,0 +1,107 @@
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+
+# CloudConductor packages are imported from the root of the repository
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import System
+from System.Platform.Agent import AgentClient
+
+
+class TestAgent(unittest.TestCase):
+    # Commands run by the local stand-in agent (empty transport), as instances sharing an agent would run them
+
+    def setUp(self):
+        self.agent_dir = tempfile.mkdtemp(prefix="cc_agent_test_")
+        self.client = AgentClient("local", transport="", agent_dir=self.agent_dir, python=sys.executable)
+        self.client.install()
+
+    def tearDown(self):
+        shutil.rmtree(self.agent_dir, ignore_errors=True)
+
+    def run_jobs(self, owner, *jobs):
+        # Submit (job name, command) pairs under an owner and return their processes
+        return self.client.submit([{"job_name": job_name, "cmd": cmd} for job_name, cmd in jobs], owner)
+
+    def test_output_and_exit_code(self):
+        proc = self.run_jobs("slot-a", ("job", "echo out; echo err >&2; exit 3"))[0]
+        proc.wait_completion()
+        self.assertEqual(proc.returncode, 3)
+        self.assertEqual(proc.get_output(), ("out\n", "err\n"))
+
+    def test_same_name_from_different_owners(self):
+        # Slots sharing a host submit commands with the same names (e.g. docker_pull_<image>, return_logs)
+        slow = self.run_jobs("slot-a", ("return_logs", "sleep 1; echo a"))[0]
+        fast = self.run_jobs("slot-b", ("return_logs", "echo b"))[0]
+
+        for proc in [slow, fast]:
+            proc.wait_completion()
+        self.assertEqual((slow.returncode, slow.get_output()[0]), (0, "a\n"))
+        self.assertEqual((fast.returncode, fast.get_output()[0]), (0, "b\n"))
+
+    def test_resubmission_from_same_owner_is_retry(self):
+        marker = os.path.join(self.agent_dir, "first_run_finished")
+        self.run_jobs("slot-a", ("job", "sleep 2; touch %s" % marker))
+        retry = self.run_jobs("slot-a", ("job", "echo retried"))[0]
+
+        retry.wait_completion()
+        self.assertEqual((retry.returncode, retry.get_output()[0]), (0, "retried\n"))
+
+        # Previous run is killed and replaced by the retry
+        time.sleep(3)
+        self.assertFalse(os.path.exists(marker))
+
+    def test_kill(self):
+        proc = self.run_jobs("slot-a", ("job", "sleep 30"))[0]
+        other = self.run_jobs("slot-b", ("job", "sleep 1; echo alive"))[0]
+        proc.kill()
+
+        proc.wait_completion()
+        other.wait_completion()
+        self.assertEqual(proc.returncode, -9)
+        self.assertEqual((other.returncode, other.get_output()[0]), (0, "alive\n"))
+
+    def test_kill_is_prompt(self):
+        proc = self.run_jobs("slot-a", ("job", "sleep 60"))[0]
+
+        start_time = time.time()
+        proc.kill()
+        proc.wait_completion()
+        self.assertEqual(proc.returncode, -9)
+        self.assertLess(time.time() - start_time, 5)
+
+        # Command itself is killed on the agent, which records its exit
+        run_dir = os.path.join(self.agent_dir, "jobs", "slot-a", "job")
+        with open(os.path.join(run_dir, "current")) as inp:
+            exit_code_path = os.path.join(run_dir, inp.read().strip(), "exit_code")
+        for _ in range(50):
+            if os.path.exists(exit_code_path):
+                break
+            time.sleep(0.1)
+        with open(exit_code_path) as inp:
+            self.assertEqual(inp.read().strip(), "-9")
+
+    def test_remove_owner(self):
+        # Commands of an owner done with the instance are removed, while other owners keep theirs
+        done = self.run_jobs("slot-a", ("done", "echo done"))[0]
+        running = self.run_jobs("slot-a", ("running", "sleep 60"))[0]
+        other = self.run_jobs("slot-b", ("other", "echo other"))[0]
+        for proc in [done, other]:
+            proc.wait_completion()
+
+        # Commands still running are killed, and their processes fail as their output is gone
+        start_time = time.time()
+        self.client.remove("slot-a")
+        running.wait_completion()
+        self.assertNotEqual(running.returncode, 0)
+        self.assertLess(time.time() - start_time, 5)
+        self.assertFalse(os.path.exists(os.path.join(self.agent_dir, "jobs", "slot-a")))
+        self.assertTrue(os.path.exists(os.path.join(self.agent_dir, "jobs", "slot-b", "other")))
+
+
+if __name__ == "__main__":
+    unittest.main()
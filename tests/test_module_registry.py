@@ -0,0 +1,50 @@
+import os
+import sys
+import time
+import unittest
+
+# CloudConductor packages are imported from the root of the repository
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Modules are imported after System, as done by CloudConductor
+import System
+from Modules import ModuleRegistry
+
+
+class TestModuleRegistry(unittest.TestCase):
+    # Startup cost of resolving task modules: building the manifest and resolving the first class
+
+    # Maximum number of seconds allowed to build the manifest and resolve the first class
+    MAX_STARTUP_TIME = 2.0
+
+    def test_startup_time(self):
+        start_time = time.time()
+        registry = ModuleRegistry()
+        manifest_time = time.time() - start_time
+
+        _class = registry.get_class("Samtools", "Flagstat")
+        startup_time = time.time() - start_time
+
+        print("Manifest built in %.3f seconds, first class resolved after %.3f seconds (%d module files)." %
+              (manifest_time, startup_time, len(registry.get_manifest())))
+
+        self.assertEqual(_class.__name__, "Flagstat")
+        self.assertLess(startup_time, self.MAX_STARTUP_TIME)
+
+    def test_manifest_does_not_import_modules(self):
+        registry = ModuleRegistry()
+        self.assertIn("Samtools", registry.get_manifest())
+        self.assertEqual(len(registry.modules), 0)
+
+        # Only the module file of the requested class is imported
+        registry.get_class("Samtools", "Flagstat")
+        self.assertEqual(list(registry.modules), ["Samtools"])
+
+    def test_unknown_module(self):
+        registry = ModuleRegistry()
+        with self.assertRaises(IOError):
+            registry.get_class("NotAModule")
+
+
+if __name__ == "__main__":
+    unittest.main()